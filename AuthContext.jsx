@@ -154,6 +154,9 @@ export const AuthProvider = ({ children }) => {
       const data = await response.json();
 
       if (response.ok) {
+        // Os tokens anteriores são revogados ao trocar a senha
+        setToken(data.token);
+        localStorage.setItem('token', data.token);
         return { success: true, message: data.message };
       } else {
         return { success: false, message: data.message };
@@ -1,10 +1,13 @@
 import { useState, useEffect } from 'react'
+import { useAuth } from '../contexts/AuthContext'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card'
 import { Badge } from '@/components/ui/badge'
 import { Button } from '@/components/ui/button'
 import { Target, Trophy, Zap, TrendingUp, Calendar, Award } from 'lucide-react'
 
 const Dashboard = () => {
+  const { token } = useAuth()
+  const authHeaders = { 'Authorization': `Bearer ${token}` }
   const [stats, setStats] = useState({
     general: {
       total_sessions: 0,
@@ -22,25 +25,13 @@ const Dashboard = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        // Buscar estatísticas de treinamento
-        const statsRes = await fetch('/api/training-sessions/stats')
-        const statsData = await statsRes.json()
-        if (statsData.success) {
-          setStats(statsData.data)
-        }
-
-        // Buscar progresso do usuário
-        const progressRes = await fetch('/api/progress')
-        const progressData = await progressRes.json()
-        if (progressData.success) {
-          setProgress(progressData.data)
-        }
-
-        // Buscar sessões recentes
-        const sessionsRes = await fetch('/api/training-sessions/recent?limit=5')
-        const sessionsData = await sessionsRes.json()
-        if (sessionsData.success) {
-          setRecentSessions(sessionsData.data)
+        // Buscar estatísticas, progresso e sessões recentes em uma única requisição
+        const dashboardRes = await fetch('/api/dashboard?limit=5', { headers: authHeaders })
+        const dashboardData = await dashboardRes.json()
+        if (dashboardData.success) {
+          setStats(dashboardData.data.stats)
+          setProgress(dashboardData.data.progress)
+          setRecentSessions(dashboardData.data.recent_sessions)
         }
       } catch (error) {
         console.error('Erro ao carregar dados do dashboard:', error)
@@ -217,9 +208,9 @@ const Dashboard = () => {
                       </div>
                     </div>
                     <div className="text-right">
-                      <p className="font-semibold">{session.accuracy?.toFixed(1)}%</p>
+                      <p className="font-semibold">{session.accuracy != null ? `${session.accuracy.toFixed(1)}%` : '-'}</p>
                       <p className="text-sm text-gray-600">
-                        {session.hits}/{session.shots_fired} acertos
+                        {session.hits ?? '-'}/{session.shots_fired} acertos
                       </p>
                     </div>
                   </div>
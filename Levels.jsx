@@ -1,4 +1,5 @@
 import { useState, useEffect } from 'react'
+import { useAuth } from '../contexts/AuthContext'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
 import { Badge } from '@/components/ui/badge'
@@ -6,6 +7,8 @@ import { Progress } from '@/components/ui/progress'
 import { Award, TrendingUp, Target, Star, Trophy, Zap } from 'lucide-react'
 
 const Levels = () => {
+  const { token } = useAuth()
+  const authHeaders = { 'Authorization': `Bearer ${token}` }
   const [levels, setLevels] = useState([])
   const [progress, setProgress] = useState(null)
   const [nextLevelInfo, setNextLevelInfo] = useState(null)
@@ -17,25 +20,13 @@ const Levels = () => {
 
   const fetchData = async () => {
     try {
-      // Buscar níveis
-      const levelsRes = await fetch('/api/levels')
-      const levelsData = await levelsRes.json()
-      if (levelsData.success) {
-        setLevels(levelsData.data)
-      }
-
-      // Buscar progresso do usuário
-      const progressRes = await fetch('/api/progress')
-      const progressData = await progressRes.json()
-      if (progressData.success) {
-        setProgress(progressData.data)
-      }
-
-      // Buscar informações do próximo nível
-      const nextLevelRes = await fetch('/api/progress/next-level')
-      const nextLevelData = await nextLevelRes.json()
-      if (nextLevelData.success) {
-        setNextLevelInfo(nextLevelData.data)
+      // Buscar níveis, progresso e próximo nível em uma única requisição
+      const overviewRes = await fetch('/api/levels/overview', { headers: authHeaders })
+      const overviewData = await overviewRes.json()
+      if (overviewData.success) {
+        setLevels(overviewData.data.levels)
+        setProgress(overviewData.data.progress)
+        setNextLevelInfo(overviewData.data.next_level)
       }
     } catch (error) {
       console.error('Erro ao carregar dados de níveis:', error)
@@ -50,6 +41,7 @@ const Levels = () => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...authHeaders,
         },
       })
       const data = await response.json()
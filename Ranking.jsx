@@ -1,4 +1,5 @@
 import { useState, useEffect } from 'react'
+import { useAuth } from '../contexts/AuthContext'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
 import { Badge } from '@/components/ui/badge'
@@ -6,9 +7,15 @@ import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs'
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, BarChart, Bar } from 'recharts'
 import { Trophy, TrendingUp, Award, Target, Calendar } from 'lucide-react'
 
+// Pontos do gráfico de evolução (a série é reduzida no servidor)
+const EVOLUTION_POINTS = 200
+
 const Ranking = () => {
+  const { token } = useAuth()
+  const authHeaders = { 'Authorization': `Bearer ${token}` }
   const [competitions, setCompetitions] = useState([])
   const [ranking, setRanking] = useState({})
+  const [rankingPagination, setRankingPagination] = useState({})
   const [stats, setStats] = useState({})
   const [selectedCompetition, setSelectedCompetition] = useState(null)
   const [evolutionData, setEvolutionData] = useState([])
@@ -28,14 +35,15 @@ const Ranking = () => {
       }
 
       // Buscar ranking geral
-      const rankingRes = await fetch('/api/competitions/ranking')
+      const rankingRes = await fetch('/api/competitions/ranking', { headers: authHeaders })
       const rankingData = await rankingRes.json()
       if (rankingData.success) {
         setRanking(rankingData.data)
+        setRankingPagination(rankingData.pagination || {})
       }
 
       // Buscar estatísticas
-      const statsRes = await fetch('/api/competitions/stats')
+      const statsRes = await fetch('/api/competitions/stats', { headers: authHeaders })
       const statsData = await statsRes.json()
       if (statsData.success) {
         setStats(statsData.data)
@@ -49,7 +57,7 @@ const Ranking = () => {
 
   const fetchEvolution = async (competitionId) => {
     try {
-      const response = await fetch(`/api/competitions/${competitionId}/evolution`)
+      const response = await fetch(`/api/competitions/${competitionId}/evolution?points=${EVOLUTION_POINTS}`, { headers: authHeaders })
       const data = await response.json()
       if (data.success) {
         setEvolutionData(data.data.evolution)
@@ -60,14 +68,19 @@ const Ranking = () => {
     }
   }
 
+  // Resumo por competição (total, média e melhor pontuação de todo o histórico)
+  const summaryByName = Object.fromEntries(
+    (stats.by_competition || []).map(summary => [summary.name, summary])
+  )
+
   const formatRankingData = () => {
     return Object.entries(ranking).map(([competition, scores]) => ({
       competition: competition.length > 20 ? competition.substring(0, 20) + '...' : competition,
       fullName: competition,
-      latestScore: scores.length > 0 ? scores[scores.length - 1].score : 0,
-      totalParticipations: scores.length,
-      bestScore: Math.max(...scores.map(s => s.score)),
-      avgScore: scores.reduce((acc, s) => acc + s.score, 0) / scores.length
+      latestScore: scores.length > 0 ? scores[0].score : 0,
+      totalParticipations: summaryByName[competition]?.scores ?? rankingPagination[competition]?.total ?? scores.length,
+      bestScore: summaryByName[competition]?.best_score ?? Math.max(...scores.map(s => s.score)),
+      avgScore: summaryByName[competition]?.average_score ?? scores.reduce((acc, s) => acc + s.score, 0) / scores.length
     }))
   }
 
@@ -247,8 +260,10 @@ const Ranking = () => {
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
             {competitions.map((competition) => {
               const competitionScores = ranking[competition.name] || []
-              const latestScore = competitionScores.length > 0 ? competitionScores[competitionScores.length - 1] : null
-              const bestScore = competitionScores.length > 0 ? Math.max(...competitionScores.map(s => s.score)) : 0
+              const latestScore = competitionScores.length > 0 ? competitionScores[0] : null
+              const totalStages = summaryByName[competition.name]?.scores ?? rankingPagination[competition.name]?.total ?? competitionScores.length
+              const bestScore = summaryByName[competition.name]?.best_score
+                ?? (competitionScores.length > 0 ? Math.max(...competitionScores.map(s => s.score)) : 0)
               
               return (
                 <Card key={competition.id} className="hover:shadow-lg transition-shadow">
@@ -258,7 +273,7 @@ const Ranking = () => {
                         <Trophy className="h-6 w-6 text-yellow-600" />
                       </div>
                       <Badge variant="secondary">
-                        {competitionScores.length} etapas
+                        {totalStages} etapas
                       </Badge>
                     </div>
                     <CardTitle className="text-lg">{competition.name}</CardTitle>
@@ -1,4 +1,5 @@
 import { useState, useEffect } from 'react'
+import { useAuth } from '../contexts/AuthContext'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
 import { Badge } from '@/components/ui/badge'
@@ -10,8 +11,15 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs'
 import { Zap, Plus, Target, Clock, Calendar, TrendingUp, Edit, Trash2 } from 'lucide-react'
 
+// Sessões por página; as páginas seguintes usam o cursor next_cursor
+const SESSIONS_PER_PAGE = 20
+
 const Training = () => {
+  const { token } = useAuth()
+  const authHeaders = { 'Authorization': `Bearer ${token}` }
   const [sessions, setSessions] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [weapons, setWeapons] = useState([])
   const [stats, setStats] = useState({})
   const [loading, setLoading] = useState(true)
@@ -31,13 +39,19 @@ const Training = () => {
     fetchData()
   }, [])
 
+  const fetchSessionsPage = async (after = '') => {
+    const params = new URLSearchParams({ after, per_page: SESSIONS_PER_PAGE })
+    const response = await fetch(`/api/training-sessions?${params}`, { headers: authHeaders })
+    return response.json()
+  }
+
   const fetchData = async () => {
     try {
-      // Buscar sessões de treinamento
-      const sessionsRes = await fetch('/api/training-sessions?per_page=20')
-      const sessionsData = await sessionsRes.json()
+      // Buscar a primeira página de sessões de treinamento
+      const sessionsData = await fetchSessionsPage()
       if (sessionsData.success) {
         setSessions(sessionsData.data.sessions)
+        setNextCursor(sessionsData.data.pagination.next_cursor)
       }
 
       // Buscar armas
@@ -48,7 +62,7 @@ const Training = () => {
       }
 
       // Buscar estatísticas
-      const statsRes = await fetch('/api/training-sessions/stats')
+      const statsRes = await fetch('/api/training-sessions/stats', { headers: authHeaders })
       const statsData = await statsRes.json()
       if (statsData.success) {
         setStats(statsData.data)
@@ -60,6 +74,21 @@ const Training = () => {
     }
   }
 
+  const loadMoreSessions = async () => {
+    setLoadingMore(true)
+    try {
+      const sessionsData = await fetchSessionsPage(nextCursor)
+      if (sessionsData.success) {
+        setSessions([...sessions, ...sessionsData.data.sessions])
+        setNextCursor(sessionsData.data.pagination.next_cursor)
+      }
+    } catch (error) {
+      console.error('Erro ao carregar mais sessões:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleAddSession = async () => {
     try {
       const sessionData = {
@@ -75,6 +104,7 @@ const Training = () => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...authHeaders,
         },
         body: JSON.stringify(sessionData),
       })
@@ -105,6 +135,7 @@ const Training = () => {
         method: 'PUT',
         headers: {
           'Content-Type': 'application/json',
+          ...authHeaders,
         },
         body: JSON.stringify(session),
       })
@@ -124,6 +155,7 @@ const Training = () => {
       try {
         const response = await fetch(`/api/training-sessions/${sessionId}`, {
           method: 'DELETE',
+          headers: authHeaders,
         })
         const data = await response.json()
         if (data.success) {
@@ -352,13 +384,13 @@ const Training = () => {
                     <div className="text-right">
                       <div className="flex items-center space-x-4">
                         <div>
-                          <p className="font-semibold">{session.accuracy?.toFixed(1)}%</p>
+                          <p className="font-semibold">{session.accuracy != null ? `${session.accuracy.toFixed(1)}%` : '-'}</p>
                           <p className="text-sm text-gray-600">
-                            {session.hits}/{session.shots_fired}
+                            {session.hits ?? '-'}/{session.shots_fired}
                           </p>
                         </div>
                         <Badge variant="secondary">
-                          {session.score} pts
+                          {session.score ?? '-'} pts
                         </Badge>
                       </div>
                     </div>
@@ -400,15 +432,15 @@ const Training = () => {
                         <div className="flex items-center space-x-6">
                           <div>
                             <p className="text-sm text-gray-600">Precisão</p>
-                            <p className="font-semibold text-lg">{session.accuracy?.toFixed(1)}%</p>
+                            <p className="font-semibold text-lg">{session.accuracy != null ? `${session.accuracy.toFixed(1)}%` : '-'}</p>
                           </div>
                           <div>
                             <p className="text-sm text-gray-600">Acertos</p>
-                            <p className="font-semibold text-lg">{session.hits}/{session.shots_fired}</p>
+                            <p className="font-semibold text-lg">{session.hits ?? '-'}/{session.shots_fired}</p>
                           </div>
                           <div>
                             <p className="text-sm text-gray-600">Pontuação</p>
-                            <p className="font-semibold text-lg">{session.score}</p>
+                            <p className="font-semibold text-lg">{session.score ?? '-'}</p>
                           </div>
                         </div>
                       </div>
@@ -440,6 +472,14 @@ const Training = () => {
             ))}
           </div>
 
+          {nextCursor && (
+            <div className="flex justify-center">
+              <Button variant="outline" onClick={loadMoreSessions} disabled={loadingMore}>
+                {loadingMore ? 'Carregando...' : 'Carregar mais'}
+              </Button>
+            </div>
+          )}
+
           {sessions.length === 0 && (
             <div className="text-center py-12">
               <Zap className="h-16 w-16 mx-auto mb-4 text-gray-400" />
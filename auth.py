@@ -1,9 +1,16 @@
-from flask import Blueprint, request, jsonify, current_app
-from werkzeug.security import generate_password_hash
+from flask import Blueprint, request, jsonify, current_app, g
 from src.models.user import db, User
+from src.utils.auth_cache import auth_cache, authenticate_token, revoke_tokens
+from src.utils.password_hashing import PasswordHashingBusy
+from src.utils.last_login import last_logins
+from src.utils.validation import validate_email, validate_password
+from src.models.provisioning import MAX_MEMBERS, MAX_REQUEST_BYTES, iter_json_members, provision_members
+from src.models.training_import import iter_csv
+from src.utils.rate_limit import rate_limited
+from werkzeug.exceptions import RequestEntityTooLarge
 from datetime import datetime
-import re
 from functools import wraps
+from itertools import islice
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -25,32 +32,29 @@ def token_required(f):
             return jsonify({'message': 'Token não fornecido'}), 401
         
         try:
-            current_user = User.verify_token(token)
+            # Campos de autenticação em cache por (usuário, época do token)
+            current_user = authenticate_token(token)
             if not current_user:
                 return jsonify({'message': 'Token inválido'}), 401
         except:
             return jsonify({'message': 'Token inválido'}), 401
         
+        if not current_user.is_active:
+            return jsonify({'message': 'Conta desativada'}), 401
+        
+        g.current_user = current_user
         return f(current_user, *args, **kwargs)
     
     return decorated
 
-def validate_email(email):
-    """Valida formato do email"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
-
-def validate_password(password):
-    """Valida força da senha"""
-    if len(password) < 6:
-        return False, "Senha deve ter pelo menos 6 caracteres"
-    if not re.search(r'[A-Za-z]', password):
-        return False, "Senha deve conter pelo menos uma letra"
-    if not re.search(r'[0-9]', password):
-        return False, "Senha deve conter pelo menos um número"
-    return True, "Senha válida"
+def busy_response(error):
+    """503 imediato quando a fila de hashing de senhas está cheia"""
+    response = jsonify({'message': str(error)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limited('register')
 def register():
     """Cadastro de novo usuário"""
     try:
@@ -109,11 +113,15 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return busy_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limited('login')
 def login():
     """Login do usuário"""
     try:
@@ -136,19 +144,29 @@ def login():
         if not user.is_active:
             return jsonify({'message': 'Conta desativada'}), 401
         
-        # Atualizar último login
-        user.last_login = datetime.utcnow()
-        db.session.commit()
+        # Regravar o hash se os parâmetros configurados mudaram
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+        
+        # Último login gravado em lote pelo buffer write-behind
+        login_at = datetime.utcnow()
+        last_logins.record(user.id, login_at)
         
         # Gerar token
         token = user.generate_token()
+        user_data = user.to_dict()
+        user_data['last_login'] = login_at.isoformat()
         
         return jsonify({
             'message': 'Login realizado com sucesso',
             'token': token,
-            'user': user.to_dict()
+            'user': user_data
         }), 200
         
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return busy_response(e)
     except Exception as e:
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
@@ -190,6 +208,7 @@ def update_profile(current_user):
             current_user.email = new_email
         
         db.session.commit()
+        auth_cache.invalidate(current_user.id)
         
         return jsonify({
             'message': 'Perfil atualizado com sucesso',
@@ -202,6 +221,7 @@ def update_profile(current_user):
 
 @auth_bp.route('/change-password', methods=['POST'])
 @token_required
+@rate_limited('change-password')
 def change_password(current_user):
     """Alterar senha do usuário"""
     try:
@@ -222,12 +242,96 @@ def change_password(current_user):
         if not is_valid:
             return jsonify({'message': password_message}), 400
         
-        # Atualizar senha
+        # Atualizar senha e revogar os tokens emitidos com a senha anterior
         current_user.set_password(new_password)
+        revoke_tokens(current_user.user)
         db.session.commit()
+        auth_cache.invalidate(current_user.id)
+        
+        return jsonify({
+            'message': 'Senha alterada com sucesso',
+            'token': current_user.generate_token()
+        }), 200
+        
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return busy_response(e)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+@auth_bp.route('/users/<int:user_id>/status', methods=['PUT'])
+@token_required
+def update_user_status(current_user, user_id):
+    """Ativar ou desativar um usuário (administradores)
+
+    Desativar também revoga os tokens já emitidos para o usuário.
+    """
+    try:
+        if not current_user.is_admin:
+            return jsonify({'message': 'Acesso restrito a administradores'}), 403
+        
+        data = request.get_json()
+        if not isinstance(data.get('is_active'), bool):
+            return jsonify({'message': 'Campo is_active (booleano) é obrigatório'}), 400
         
-        return jsonify({'message': 'Senha alterada com sucesso'}), 200
+        user = db.session.get(User, user_id)
+        if not user:
+            return jsonify({'message': 'Usuário não encontrado'}), 404
         
+        user.is_active = data['is_active']
+        if not user.is_active:
+            revoke_tokens(user)
+        db.session.commit()
+        auth_cache.invalidate(user.id)
+        
+        return jsonify({
+            'message': 'Usuário ativado' if user.is_active else 'Usuário desativado',
+            'user': user.to_dict()
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+@auth_bp.route('/users/bulk', methods=['POST'])
+@token_required
+def bulk_provision_users(current_user):
+    """Cadastrar membros em lote (administradores)
+
+    Aceita uma lista JSON de membros ou um CSV (text/csv) com cabeçalho
+    username,email,full_name[,password,phone,registration_number,club,category].
+    Membros sem senha recebem um código de convite como senha provisória.
+    """
+    try:
+        if not current_user.is_admin:
+            return jsonify({'message': 'Acesso restrito a administradores'}), 403
+        
+        # O corpo é lido no máximo até MAX_REQUEST_BYTES, e a leitura para
+        # no primeiro membro além de MAX_MEMBERS
+        request.max_content_length = MAX_REQUEST_BYTES
+        try:
+            if request.mimetype in ('text/csv', 'application/csv'):
+                records = list(islice(iter_csv(request.stream), MAX_MEMBERS + 1))
+            else:
+                records = list(islice(iter_json_members(request.get_json()), MAX_MEMBERS + 1))
+        except RequestEntityTooLarge:
+            return jsonify({'message': f'Máximo de {MAX_MEMBERS} membros por requisição'}), 413
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        if not records:
+            return jsonify({'message': 'Nenhum membro enviado'}), 400
+        if len(records) > MAX_MEMBERS:
+            return jsonify({'message': f'Máximo de {MAX_MEMBERS} membros por requisição'}), 400
+        
+        result = provision_members(records)
+        
+        return jsonify(result), 201 if result['created'] else 400
+        
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return busy_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
@@ -0,0 +1,149 @@
+from flask import current_app
+from collections import OrderedDict
+import threading
+import time
+import jwt
+from src.models.user import db, User
+
+class AuthenticatedUser:
+    """Usuário autenticado montado a partir do cache
+
+    id, is_active e is_admin vêm do cache, sem consultar o banco; qualquer
+    outro atributo (to_dict, check_password, email...) carrega a linha
+    completa na primeira leitura e passa a valer para o restante da requisição.
+    """
+    __slots__ = ('id', 'is_active', 'is_admin', 'token_epoch', '_user')
+
+    def __init__(self, user_id, is_active, is_admin, token_epoch):
+        object.__setattr__(self, 'id', user_id)
+        object.__setattr__(self, 'is_active', is_active)
+        object.__setattr__(self, 'is_admin', is_admin)
+        object.__setattr__(self, 'token_epoch', token_epoch)
+        object.__setattr__(self, '_user', None)
+
+    @property
+    def user(self):
+        """Linha completa do usuário (uma consulta por chave primária)"""
+        if self._user is None:
+            object.__setattr__(self, '_user', db.session.get(User, self.id))
+        return self._user
+
+    def __getattr__(self, name):
+        return getattr(self.user, name)
+
+    def __setattr__(self, name, value):
+        if name in ('is_active', 'is_admin', 'token_epoch'):
+            object.__setattr__(self, name, value)
+        setattr(self.user, name, value)
+
+class AuthCache:
+    """Cache LRU com TTL dos campos usados na autenticação
+
+    A chave é (user_id, época do token), então um token emitido antes da
+    revogação nunca encontra a entrada atual. Tokens revogados também ficam
+    em cache (como None) para não consultar o banco a cada tentativa.
+    """
+
+    def __init__(self, maxsize=4096, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (user_id, época) -> (expira_em, campos ou None)
+        self._by_user = {}  # user_id -> {chaves}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _remove(self, key):
+        self._entries.pop(key)
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+
+    def get(self, user_id, epoch):
+        """(encontrado, campos); campos None indica token revogado ou usuário inexistente"""
+        key = (user_id, epoch)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, user_id, epoch, fields):
+        key = (user_id, epoch)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, fields)
+            self._by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        """Remove todas as entradas do usuário (qualquer época)"""
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+auth_cache = AuthCache()
+
+def authenticate_token(token):
+    """Valida o JWT e retorna o AuthenticatedUser, ou None se inválido ou revogado
+
+    Só consulta o banco quando (user_id, época) não está em cache.
+    """
+    try:
+        payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return None
+    user_id, epoch = payload['user_id'], payload.get('epoch', 0)
+
+    found, fields = auth_cache.get(user_id, epoch)
+    if not found:
+        row = db.session.query(
+            User.is_active, User.is_admin, User.token_epoch
+        ).filter(User.id == user_id).first()
+        fields = (bool(row.is_active), bool(row.is_admin)) if row and row.token_epoch == epoch else None
+        auth_cache.put(user_id, epoch, fields)
+
+    if fields is None:
+        return None
+    return AuthenticatedUser(user_id, fields[0], fields[1], epoch)
+
+def revoke_tokens(user):
+    """Invalida todos os tokens já emitidos do usuário (efetivo após o commit)"""
+    user.token_epoch = (user.token_epoch or 0) + 1
+
+def init_auth_cache(app):
+    """Aplica o tamanho e o TTL configurados (AUTH_CACHE_SIZE/AUTH_CACHE_TTL)"""
+    auth_cache.maxsize = app.config.get('AUTH_CACHE_SIZE', auth_cache.maxsize)
+    auth_cache.ttl = app.config.get('AUTH_CACHE_TTL', auth_cache.ttl)
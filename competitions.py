@@ -1,11 +1,34 @@
 from flask import Blueprint, request, jsonify
 from src.models.shooting import db, Competition, CompetitionScore
+from src.models.serialization import eager
+from src.models.rollups import apply_competition_score_rollups, competition_series, parse_range
+from src.models.leaderboard import METRICS, CompetitionLeaderboard, apply_competition_score, leaderboard_data
+from src.routes.auth import token_required
+from src.utils.conditional import conditional
+from src.utils.response_cache import cached
+from src.utils.downsample import lttb
 from datetime import datetime
-from sqlalchemy import desc
+from sqlalchemy import desc, func
 
 competitions_bp = Blueprint('competitions', __name__)
 
+# Pontuações por competição no ranking (?limit_per_competition=)
+DEFAULT_RANKING_LIMIT = 10
+MAX_RANKING_LIMIT = 100
+
+RANKING_ORDERS = ('latest', 'best')
+
+# Leaderboard: quantidade no topo e vizinhos acima/abaixo do usuário
+DEFAULT_LEADERBOARD_LIMIT = 10
+MAX_LEADERBOARD_LIMIT = 100
+MAX_LEADERBOARD_RADIUS = 25
+
+# Limites de ?points= na evolução reduzida
+MIN_EVOLUTION_POINTS = 3
+MAX_EVOLUTION_POINTS = 1000
+
 @competitions_bp.route('/competitions', methods=['GET'])
+@conditional('competition')
 def get_competitions():
     """Listar todas as competições"""
     try:
@@ -53,11 +76,15 @@ def create_competition():
         }), 500
 
 @competitions_bp.route('/competitions/<int:competition_id>/scores', methods=['GET'])
-def get_competition_scores(competition_id):
-    """Obter pontuações de uma competição"""
+@token_required
+@conditional('competition', 'competition_score', per_user=True)
+def get_competition_scores(current_user, competition_id):
+    """Obter pontuações do usuário em uma competição"""
     try:
         competition = Competition.query.get_or_404(competition_id)
-        scores = CompetitionScore.query.filter_by(competition_id=competition_id).order_by(desc(CompetitionScore.date)).all()
+        scores = eager(CompetitionScore.query, CompetitionScore).filter_by(
+            user_id=current_user.id, competition_id=competition_id
+        ).order_by(desc(CompetitionScore.date)).all()
         
         return jsonify({
             'success': True,
@@ -73,7 +100,8 @@ def get_competition_scores(competition_id):
         }), 500
 
 @competitions_bp.route('/competitions/<int:competition_id>/scores', methods=['POST'])
-def add_competition_score(competition_id):
+@token_required
+def add_competition_score(current_user, competition_id):
     """Adicionar pontuação a uma competição"""
     try:
         competition = Competition.query.get_or_404(competition_id)
@@ -87,6 +115,7 @@ def add_competition_score(competition_id):
         
         score = CompetitionScore(
             competition_id=competition_id,
+            user_id=current_user.id,
             score=float(data['score']),
             stage=int(data['stage']),
             notes=data.get('notes', ''),
@@ -94,6 +123,8 @@ def add_competition_score(competition_id):
         )
         
         db.session.add(score)
+        apply_competition_score_rollups(current_user.id, competition_id, score.score, score.date)
+        apply_competition_score(current_user.id, competition_id, score.score)
         db.session.commit()
         
         return jsonify({
@@ -109,25 +140,52 @@ def add_competition_score(competition_id):
         }), 500
 
 @competitions_bp.route('/competitions/ranking', methods=['GET'])
-def get_ranking():
-    """Obter ranking geral de todas as competições"""
+@token_required
+@conditional('competition', 'competition_score', per_user=True)
+@cached('competition', 'competition_score', per_user=True)
+def get_ranking(current_user):
+    """Obter ranking do usuário em todas as competições
+
+    Retorna as N pontuações mais recentes (ou melhores, com ?order=best) de
+    cada competição, numeradas no banco com ROW_NUMBER() por competição.
+    """
     try:
-        # Obter últimas pontuações de cada competição
-        latest_scores = db.session.query(
+        order = request.args.get('order', 'latest')
+        if order not in RANKING_ORDERS:
+            return jsonify({
+                'success': False,
+                'error': 'Parâmetro order deve ser latest ou best'
+            }), 400
+        
+        limit = request.args.get('limit_per_competition', DEFAULT_RANKING_LIMIT, type=int)
+        limit = max(1, min(limit, MAX_RANKING_LIMIT))
+        offset = max(0, request.args.get('offset', 0, type=int))
+        competition_id = request.args.get('competition_id', type=int)
+        
+        ranked = ranking_query(current_user.id, order, competition_id).subquery()
+        rows = db.session.query(
             Competition.name,
-            CompetitionScore.score,
-            CompetitionScore.stage,
-            CompetitionScore.date
-        ).join(CompetitionScore).order_by(
-            Competition.name, 
-            desc(CompetitionScore.date)
-        ).all()
+            ranked.c.score,
+            ranked.c.stage,
+            ranked.c.date,
+            ranked.c.total
+        ).join(ranked, ranked.c.competition_id == Competition.id).filter(
+            ranked.c.position > offset,
+            ranked.c.position <= offset + limit
+        ).order_by(Competition.name, ranked.c.position).all()
         
         # Agrupar por competição
         ranking_data = {}
-        for comp_name, score, stage, date in latest_scores:
+        pagination = {}
+        for comp_name, score, stage, date, total in rows:
             if comp_name not in ranking_data:
                 ranking_data[comp_name] = []
+                pagination[comp_name] = {
+                    'total': total,
+                    'offset': offset,
+                    'limit': limit,
+                    'next_offset': offset + limit if offset + limit < total else None
+                }
             ranking_data[comp_name].append({
                 'score': score,
                 'stage': stage,
@@ -136,7 +194,8 @@ def get_ranking():
         
         return jsonify({
             'success': True,
-            'data': ranking_data
+            'data': ranking_data,
+            'pagination': pagination
         })
         
     except Exception as e:
@@ -145,28 +204,117 @@ def get_ranking():
             'error': str(e)
         }), 500
 
+def ranking_query(user_id, order='latest', competition_id=None):
+    """Pontuações do usuário com a posição (position) e o total (total) em cada competição"""
+    if order == 'best':
+        ordering = (desc(CompetitionScore.score), desc(CompetitionScore.date), desc(CompetitionScore.id))
+    else:
+        ordering = (desc(CompetitionScore.date), desc(CompetitionScore.id))
+    query = db.session.query(
+        CompetitionScore.competition_id,
+        CompetitionScore.score,
+        CompetitionScore.stage,
+        CompetitionScore.date,
+        func.row_number().over(
+            partition_by=CompetitionScore.competition_id, order_by=ordering
+        ).label('position'),
+        func.count().over(partition_by=CompetitionScore.competition_id).label('total')
+    ).filter(CompetitionScore.user_id == user_id)
+    if competition_id:
+        query = query.filter(CompetitionScore.competition_id == competition_id)
+    return query
+
+@competitions_bp.route('/competitions/<int:competition_id>/leaderboard', methods=['GET'])
+@token_required
+@conditional('competition_leaderboard', per_user=True)
+def get_competition_leaderboard(current_user, competition_id):
+    """Obter a posição do usuário entre todos os atiradores de uma competição"""
+    try:
+        competition = Competition.query.get_or_404(competition_id)
+        
+        metric = request.args.get('metric', 'best')
+        if metric not in METRICS:
+            return jsonify({
+                'success': False,
+                'error': 'Parâmetro metric deve ser best ou total'
+            }), 400
+        
+        limit = request.args.get('limit', DEFAULT_LEADERBOARD_LIMIT, type=int)
+        limit = max(1, min(limit, MAX_LEADERBOARD_LIMIT))
+        radius = request.args.get('radius', 2, type=int)
+        radius = max(0, min(radius, MAX_LEADERBOARD_RADIUS))
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'competition': competition.to_dict(),
+                **leaderboard_data(competition_id, current_user.id, metric, limit, radius)
+            }
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @competitions_bp.route('/competitions/<int:competition_id>/evolution', methods=['GET'])
-def get_competition_evolution(competition_id):
-    """Obter evolução de pontuações de uma competição"""
+@token_required
+@conditional('competition', 'competition_score', per_user=True)
+@cached('competition', 'competition_score', per_user=True)
+def get_competition_evolution(current_user, competition_id):
+    """Obter evolução de pontuações do usuário em uma competição"""
     try:
         competition = Competition.query.get_or_404(competition_id)
-        scores = CompetitionScore.query.filter_by(
-            competition_id=competition_id
-        ).order_by(CompetitionScore.date).all()
-        
-        evolution_data = []
-        for score in scores:
-            evolution_data.append({
-                'date': score.date.isoformat() if score.date else None,
-                'score': score.score,
-                'stage': score.stage
+        
+        # Série agregada por bucket (?from=&to=&bucket=), lida das tabelas de rollup
+        if any(arg in request.args for arg in ('bucket', 'from', 'to')):
+            try:
+                bucket, start, end = parse_range(request.args, default_days=365)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+            return jsonify({
+                'success': True,
+                'data': {
+                    'competition': competition.to_dict(),
+                    'bucket': bucket,
+                    'from': start.isoformat(),
+                    'to': end.isoformat(),
+                    'evolution': competition_series(current_user.id, competition_id, bucket, start, end)
+                }
             })
         
+        scores = db.session.query(
+            CompetitionScore.date, CompetitionScore.score, CompetitionScore.stage
+        ).filter(
+            CompetitionScore.user_id == current_user.id,
+            CompetitionScore.competition_id == competition_id
+        ).order_by(CompetitionScore.date, CompetitionScore.id).all()
+        total_points = len(scores)
+        
+        # ?points=N: reduz a série a N pontos com LTTB, preservando picos e vales
+        points = request.args.get('points', type=int)
+        if points is not None:
+            points = max(MIN_EVOLUTION_POINTS, min(points, MAX_EVOLUTION_POINTS))
+            if total_points > points:
+                xs = [score_date.toordinal() if score_date else 0 for score_date, _, _ in scores]
+                ys = [score for _, score, _ in scores]
+                scores = [scores[index] for index in lttb(xs, ys, points)]
+        
+        evolution_data = [{
+            'date': score_date.isoformat() if score_date else None,
+            'score': score,
+            'stage': stage
+        } for score_date, score, stage in scores]
+        
         return jsonify({
             'success': True,
             'data': {
                 'competition': competition.to_dict(),
-                'evolution': evolution_data
+                'evolution': evolution_data,
+                'total_points': total_points
             }
         })
         
@@ -177,41 +325,65 @@ def get_competition_evolution(competition_id):
         }), 500
 
 @competitions_bp.route('/competitions/stats', methods=['GET'])
-def get_competitions_stats():
-    """Obter estatísticas gerais das competições"""
+@token_required
+@conditional('competition', 'competition_score', 'competition_leaderboard', per_user=True)
+@cached('competition', 'competition_score', 'competition_leaderboard', per_user=True)
+def get_competitions_stats(current_user):
+    """Obter estatísticas do usuário nas competições
+
+    Uma única leitura: cada competição com a linha de resumo do usuário
+    (quantidade, soma e melhor pontuação) mantida pelo leaderboard.
+    """
     try:
-        total_competitions = Competition.query.count()
-        total_scores = CompetitionScore.query.count()
-        
-        # Média geral de pontuações
-        avg_score = db.session.query(db.func.avg(CompetitionScore.score)).scalar()
-        
-        # Melhor pontuação
-        best_score = db.session.query(
-            CompetitionScore.score,
-            Competition.name
-        ).join(Competition).order_by(desc(CompetitionScore.score)).first()
-        
-        # Competição com mais participações
-        most_active = db.session.query(
+        rows = db.session.query(
+            Competition.id,
             Competition.name,
-            db.func.count(CompetitionScore.id).label('count')
-        ).join(CompetitionScore).group_by(Competition.name).order_by(desc('count')).first()
+            CompetitionLeaderboard.scores,
+            CompetitionLeaderboard.total_score,
+            CompetitionLeaderboard.best_score
+        ).outerjoin(CompetitionLeaderboard, db.and_(
+            CompetitionLeaderboard.competition_id == Competition.id,
+            CompetitionLeaderboard.user_id == current_user.id
+        )).order_by(Competition.name).all()
+        
+        by_competition = []
+        total_scores = 0
+        score_sum = 0.0
+        best = None
+        most_active = None
+        for competition_id, name, scores, total, best_score in rows:
+            scores = scores or 0
+            by_competition.append({
+                'competition_id': competition_id,
+                'name': name,
+                'scores': scores,
+                'average_score': round(total / scores, 2) if scores else None,
+                'best_score': best_score if scores else None
+            })
+            if not scores:
+                continue
+            total_scores += scores
+            score_sum += total
+            if best is None or best_score > best[0]:
+                best = (best_score, name)
+            if most_active is None or scores > most_active[1]:
+                most_active = (name, scores)
         
         return jsonify({
             'success': True,
             'data': {
-                'total_competitions': total_competitions,
+                'total_competitions': len(rows),
                 'total_scores': total_scores,
-                'average_score': round(avg_score, 2) if avg_score else 0,
+                'average_score': round(score_sum / total_scores, 2) if total_scores else 0,
                 'best_score': {
-                    'score': best_score[0] if best_score else 0,
-                    'competition': best_score[1] if best_score else None
+                    'score': best[0] if best else 0,
+                    'competition': best[1] if best else None
                 },
                 'most_active_competition': {
                     'name': most_active[0] if most_active else None,
                     'participations': most_active[1] if most_active else 0
-                }
+                },
+                'by_competition': by_competition
             }
         })
         
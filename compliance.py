@@ -0,0 +1,170 @@
+from src.models.user import db
+from src.models.shooting import TrainingSession, Weapon
+from sqlalchemy.dialects.sqlite import insert
+from datetime import date, datetime, timedelta
+import click
+
+# Habitualidade: treinos exigidos por calibre na janela móvel de meses
+WINDOW_MONTHS = 12
+MIN_SESSIONS = 8
+
+class UserWeaponMonthlySessions(db.Model):
+    """Quantidade de sessões de cada usuário por arma e mês (índice de habitualidade)
+
+    O calibre é resolvido pela arma na consulta, então editar o calibre de
+    uma arma não deixa o índice desatualizado.
+    """
+    __tablename__ = 'user_weapon_monthly_sessions'
+    __table_args__ = (
+        # Avaliação em lote: todos os usuários numa janela de meses
+        db.Index('ix_user_weapon_monthly_sessions_month', 'month'),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    weapon_id = db.Column(db.Integer, db.ForeignKey('weapon.id', ondelete='CASCADE'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)  # primeiro dia do mês
+    sessions = db.Column(db.Integer, nullable=False, default=0)
+
+def month_start(day):
+    """Primeiro dia do mês da data"""
+    if isinstance(day, datetime):
+        day = day.date()
+    return day.replace(day=1)
+
+def add_months(month, count):
+    """Soma meses a um primeiro dia de mês"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def apply_habitualidade(values_list, sign=1):
+    """Soma (ou subtrai) sessões no índice mensal na transação corrente"""
+    counts = {}
+    for values in values_list:
+        key = (values['user_id'], values['weapon_id'], month_start(values['date']))
+        counts[key] = counts.get(key, 0) + sign
+    table = UserWeaponMonthlySessions.__table__
+    for (user_id, weapon_id, month), sessions in counts.items():
+        stmt = insert(table).values(user_id=user_id, weapon_id=weapon_id, month=month, sessions=sessions)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'weapon_id', 'month'],
+            set_={'sessions': table.c.sessions + stmt.excluded.sessions}
+        )
+        db.session.execute(stmt)
+
+def rebuild_habitualidade():
+    """Reconstrói o índice mensal a partir das sessões
+
+    A contagem é feita no SQLite (GROUP BY usuário, arma e mês) e gravada
+    com um único INSERT ... SELECT, sem trazer as sessões para o Python.
+    """
+    UserWeaponMonthlySessions.query.delete()
+    month = db.func.strftime('%Y-%m-01', TrainingSession.date)
+    counts = db.select(
+        TrainingSession.user_id, TrainingSession.weapon_id, month, db.func.count(TrainingSession.id)
+    ).group_by(TrainingSession.user_id, TrainingSession.weapon_id, month)
+    db.session.execute(insert(UserWeaponMonthlySessions.__table__).from_select(
+        ['user_id', 'weapon_id', 'month', 'sessions'], counts
+    ))
+    db.session.commit()
+
+def ensure_habitualidade():
+    """Popula o índice na primeira execução sobre um banco existente"""
+    if UserWeaponMonthlySessions.query.first() is None and TrainingSession.query.first() is not None:
+        rebuild_habitualidade()
+
+def _monthly_counts(as_of, user_id=None):
+    """{user_id: {calibre: {mês: sessões}}} na janela que termina no mês de as_of"""
+    last = month_start(as_of)
+    query = db.session.query(
+        UserWeaponMonthlySessions.user_id,
+        Weapon.caliber,
+        UserWeaponMonthlySessions.month,
+        db.func.sum(UserWeaponMonthlySessions.sessions)
+    ).join(Weapon, Weapon.id == UserWeaponMonthlySessions.weapon_id).filter(
+        UserWeaponMonthlySessions.month >= add_months(last, 1 - WINDOW_MONTHS),
+        UserWeaponMonthlySessions.month <= last
+    )
+    if user_id is not None:
+        query = query.filter(UserWeaponMonthlySessions.user_id == user_id)
+    counts = {}
+    for row_user_id, caliber, month, sessions in query.group_by(
+        UserWeaponMonthlySessions.user_id, Weapon.caliber, UserWeaponMonthlySessions.month
+    ):
+        if sessions:
+            counts.setdefault(row_user_id, {}).setdefault(caliber, {})[month] = sessions
+    return counts
+
+def evaluate_caliber(by_month, as_of):
+    """Situação de um calibre a partir das sessões por mês da janela
+
+    Sem novos treinos, a janela perde um mês antigo por vez; o primeiro mês
+    em que o total fica abaixo do mínimo é a data de vencimento.
+    """
+    last = month_start(as_of)
+    first = add_months(last, 1 - WINDOW_MONTHS)
+    months = [by_month.get(add_months(first, i), 0) for i in range(WINDOW_MONTHS)]
+    total = sum(months)
+    compliant = total >= MIN_SESSIONS
+
+    lapses_on = None
+    if compliant:
+        remaining = total
+        for shift, sessions in enumerate(months, start=1):
+            remaining -= sessions
+            if remaining < MIN_SESSIONS:
+                lapses_on = add_months(last, shift)
+                break
+
+    return {
+        'sessions': total,
+        'required': MIN_SESSIONS,
+        'compliant': compliant,
+        'missing': max(MIN_SESSIONS - total, 0),
+        'lapses_on': lapses_on.isoformat() if lapses_on else None,
+        'window_start': first.isoformat(),
+        'window_end': (add_months(last, 1) - timedelta(days=1)).isoformat()
+    }
+
+def evaluate_user(user_id, as_of):
+    """Habitualidade do usuário por calibre na data informada"""
+    by_caliber = _monthly_counts(as_of, user_id).get(user_id, {})
+    return _summary({
+        caliber: evaluate_caliber(by_month, as_of)
+        for caliber, by_month in sorted(by_caliber.items())
+    })
+
+def evaluate_all(as_of):
+    """Avalia todos os usuários com uma única consulta ao índice"""
+    return {
+        user_id: _summary({
+            caliber: evaluate_caliber(by_month, as_of)
+            for caliber, by_month in sorted(by_caliber.items())
+        })
+        for user_id, by_caliber in sorted(_monthly_counts(as_of).items())
+    }
+
+def _summary(calibers):
+    """Em dia apenas se todos os calibres treinados na janela estiverem em dia"""
+    lapses = [status['lapses_on'] for status in calibers.values() if status['lapses_on']]
+    return {
+        'compliant': bool(calibers) and all(status['compliant'] for status in calibers.values()),
+        'next_lapse': min(lapses) if lapses else None,
+        'calibers': calibers
+    }
+
+@click.command('rebuild-habitualidade')
+def rebuild_habitualidade_command():
+    """Recalcula o índice mensal de habitualidade"""
+    rebuild_habitualidade()
+    click.echo('Índice de habitualidade reconstruído.')
+
+@click.command('check-habitualidade')
+@click.option('--date', 'as_of', default=None, help='Data de referência (AAAA-MM-DD)')
+def check_habitualidade_command(as_of):
+    """Lista a habitualidade de todos os usuários por calibre"""
+    as_of = date.fromisoformat(as_of) if as_of else datetime.utcnow().date()
+    for user_id, status in evaluate_all(as_of).items():
+        for caliber, caliber_status in status['calibers'].items():
+            state = 'OK   ' if caliber_status['compliant'] else 'FALTA'
+            lapse = f" vence em {caliber_status['lapses_on']}" if caliber_status['lapses_on'] else ''
+            click.echo(f"{state} user {user_id} {caliber}: {caliber_status['sessions']}/{MIN_SESSIONS}{lapse}")
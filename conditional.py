@@ -0,0 +1,44 @@
+from flask import g, request
+from functools import wraps
+from hashlib import sha1
+from src.models.versions import get_versions
+
+def _etag(tables_versions, user_id):
+    key = '|'.join([request.path, request.query_string.decode('latin-1'), str(user_id)] + [
+        f'{name}:{version}' for name, version in sorted(tables_versions.items())
+    ])
+    return sha1(key.encode('utf-8')).hexdigest()
+
+def conditional(*tables, per_user=False):
+    """Responde 304 quando as versões das tabelas lidas não mudaram
+
+    O ETag é derivado das versões das tabelas (e do usuário, em rotas
+    por usuário); com If-None-Match válido a view nem é executada.
+    Em rotas autenticadas, deve ficar abaixo de @token_required.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            user_id = g.current_user.id if per_user else None
+            versions, last_modified = get_versions(tables)
+            etag = _etag(versions, user_id)
+            
+            if etag in request.if_none_match:
+                return '', 304, {'ETag': f'"{etag}"'}
+            
+            g.written_tables = set()
+            response = f(*args, **kwargs)
+            
+            # A própria view pode ter escrito (ex.: criar progresso inicial)
+            if g.written_tables & set(tables):
+                versions, last_modified = get_versions(tables)
+                etag = _etag(versions, user_id)
+            
+            if isinstance(response, tuple) or response.status_code != 200:
+                return response
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            return response
+        return decorated
+    return decorator
@@ -0,0 +1,38 @@
+from flask import Blueprint, request, jsonify
+from src.models.shooting import db
+from src.routes.auth import token_required
+from src.routes.training import EVOLUTION_SESSIONS, recent_sessions_query, training_stats_data
+from src.routes.levels import get_or_create_progress
+from src.utils.conditional import conditional
+from src.utils.response_cache import cached
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+@dashboard_bp.route('/dashboard', methods=['GET'])
+@token_required
+@conditional('training_session', 'weapon', 'user_progress', 'level', per_user=True)
+@cached('training_session', 'weapon', 'user_progress', 'level', per_user=True)
+def get_dashboard(current_user):
+    """Obter estatísticas, progresso e sessões recentes em uma única requisição"""
+    try:
+        limit = request.args.get('limit', 5, type=int)
+        
+        # Uma única consulta atende o gráfico de evolução e as sessões recentes
+        sessions = recent_sessions_query(current_user.id).limit(max(limit, EVOLUTION_SESSIONS)).all()
+        progress = get_or_create_progress(current_user.id)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'stats': training_stats_data(current_user.id, sessions[:EVOLUTION_SESSIONS]),
+                'progress': progress.to_dict() if progress else None,
+                'recent_sessions': [session.to_dict() for session in sessions[:limit]]
+            }
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
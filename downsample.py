@@ -0,0 +1,38 @@
+def lttb(xs, ys, threshold):
+    """Índices escolhidos pelo Largest-Triangle-Three-Buckets
+
+    Reduz a série (xs, ys) a threshold pontos preservando picos e vales:
+    mantém o primeiro e o último ponto e, em cada bucket intermediário,
+    o ponto que forma o maior triângulo com o ponto escolhido no bucket
+    anterior e a média do bucket seguinte. xs deve estar em ordem crescente.
+    """
+    length = len(xs)
+    if threshold >= length:
+        return list(range(length))
+    if threshold < 3:
+        raise ValueError('LTTB exige pelo menos 3 pontos')
+
+    every = (length - 2) / (threshold - 2)
+    selected = [0]
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        stop = int((bucket + 1) * every) + 1
+
+        # Média do próximo bucket (o último ponto serve de âncora no final)
+        next_start, next_stop = stop, min(int((bucket + 2) * every) + 1, length)
+        count = next_stop - next_start
+        avg_x = sum(xs[next_start:next_stop]) / count
+        avg_y = sum(ys[next_start:next_stop]) / count
+
+        ax, ay = xs[previous], ys[previous]
+        best, best_area = start, -1.0
+        for index in range(start, stop):
+            area = abs((ax - avg_x) * (ys[index] - ay) - (ax - xs[index]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = index, area
+        selected.append(best)
+        previous = best
+
+    selected.append(length - 1)
+    return selected
@@ -0,0 +1,104 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from src.models.shooting import db, Competition, CompetitionScore, TrainingSession, Weapon
+from src.routes.auth import token_required
+from src.utils.streaming import FORMATS
+from datetime import datetime
+from sqlalchemy import desc, select
+
+export_bp = Blueprint('export', __name__)
+
+# Linhas buscadas do cursor por vez
+YIELD_PER = 1000
+
+TRAINING_COLUMNS = (
+    'id', 'date', 'weapon_id', 'weapon_name', 'shots_fired', 'hits', 'score',
+    'accuracy', 'duration_minutes', 'notes', 'created_at'
+)
+
+COMPETITION_COLUMNS = (
+    'id', 'date', 'competition_id', 'competition_name', 'score', 'stage', 'notes', 'created_at'
+)
+
+def _iter_rows(statement, transform=None):
+    """Itera as linhas de uma consulta em blocos de YIELD_PER, sem carregar tudo"""
+    result = db.session.execute(statement.execution_options(yield_per=YIELD_PER))
+    for row in result.mappings():
+        yield transform(row) if transform else row
+
+def _training_row(row):
+    row = dict(row)
+    row['weapon_name'] = f"{row.pop('weapon')} - {row.pop('caliber')}"
+    if row['hits'] is None:
+        row['accuracy'] = None
+    else:
+        row['accuracy'] = (row['hits'] / row['shots_fired']) * 100 if row['shots_fired'] else 0
+    return row
+
+def _export_response(name, columns, rows):
+    """Resposta em streaming no formato pedido em ?format= (csv, ndjson ou xlsx)"""
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in FORMATS:
+        return jsonify({
+            'success': False,
+            'error': 'Formato deve ser csv, ndjson ou xlsx'
+        }), 400
+    stream, mimetype, extension = FORMATS[export_format]
+    filename = f"{name}-{datetime.utcnow().strftime('%Y%m%d')}.{extension}"
+    return Response(
+        stream_with_context(stream(columns, rows)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@export_bp.route('/export/training-sessions', methods=['GET'])
+@token_required
+def export_training_sessions(current_user):
+    """Exportar todas as sessões de treinamento do usuário"""
+    try:
+        weapon_id = request.args.get('weapon_id', type=int)
+
+        statement = select(
+            TrainingSession.id, TrainingSession.date, TrainingSession.weapon_id,
+            Weapon.name.label('weapon'), Weapon.caliber,
+            TrainingSession.shots_fired, TrainingSession.hits, TrainingSession.score,
+            TrainingSession.duration_minutes, TrainingSession.notes, TrainingSession.created_at
+        ).join(Weapon, Weapon.id == TrainingSession.weapon_id).filter(
+            TrainingSession.user_id == current_user.id
+        )
+        if weapon_id:
+            statement = statement.filter(TrainingSession.weapon_id == weapon_id)
+        statement = statement.order_by(desc(TrainingSession.date), desc(TrainingSession.id))
+
+        return _export_response(
+            'treinos', TRAINING_COLUMNS, _iter_rows(statement, _training_row)
+        )
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@export_bp.route('/export/competition-scores', methods=['GET'])
+@token_required
+def export_competition_scores(current_user):
+    """Exportar as pontuações do usuário em competições"""
+    try:
+        competition_id = request.args.get('competition_id', type=int)
+
+        statement = select(
+            CompetitionScore.id, CompetitionScore.date, CompetitionScore.competition_id,
+            Competition.name.label('competition_name'), CompetitionScore.score,
+            CompetitionScore.stage, CompetitionScore.notes, CompetitionScore.created_at
+        ).join(Competition, Competition.id == CompetitionScore.competition_id).filter(
+            CompetitionScore.user_id == current_user.id
+        )
+        if competition_id:
+            statement = statement.filter(CompetitionScore.competition_id == competition_id)
+        statement = statement.order_by(desc(CompetitionScore.date), desc(CompetitionScore.id))
+
+        return _export_response('competicoes', COMPETITION_COLUMNS, _iter_rows(statement))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
@@ -0,0 +1,107 @@
+from flask import Blueprint, request, jsonify
+from src.models.shooting import db
+from src.models.compliance import MIN_SESSIONS, WINDOW_MONTHS, evaluate_all, evaluate_user
+from src.models.workbook_import import import_workbook
+from src.routes.auth import token_required
+from datetime import date, datetime
+
+habitualidade_bp = Blueprint('habitualidade', __name__)
+
+def _as_of():
+    """Data de referência em ?date= (padrão: hoje)"""
+    value = request.args.get('date')
+    return date.fromisoformat(value) if value else datetime.utcnow().date()
+
+@habitualidade_bp.route('/habitualidade', methods=['GET'])
+@token_required
+def get_habitualidade(current_user):
+    """Situação de habitualidade do usuário por calibre"""
+    try:
+        try:
+            as_of = _as_of()
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Parâmetro date deve estar no formato AAAA-MM-DD'
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'date': as_of.isoformat(),
+                'window_months': WINDOW_MONTHS,
+                'min_sessions': MIN_SESSIONS,
+                **evaluate_user(current_user.id, as_of)
+            }
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@habitualidade_bp.route('/habitualidade/all', methods=['GET'])
+@token_required
+def get_habitualidade_all(current_user):
+    """Situação de habitualidade de todos os usuários (administradores)"""
+    try:
+        if not current_user.is_admin:
+            return jsonify({
+                'success': False,
+                'error': 'Acesso restrito a administradores'
+            }), 403
+
+        try:
+            as_of = _as_of()
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Parâmetro date deve estar no formato AAAA-MM-DD'
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'date': as_of.isoformat(),
+                'window_months': WINDOW_MONTHS,
+                'min_sessions': MIN_SESSIONS,
+                'users': evaluate_all(as_of)
+            }
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@habitualidade_bp.route('/habitualidade/import', methods=['POST'])
+@token_required
+def import_habitualidade(current_user):
+    """Importar a planilha HABITUALIDADE (.xlsx) enviada no campo file
+
+    A aba Níveis só é importada por administradores.
+    """
+    try:
+        upload = request.files.get('file')
+        if upload is None or not upload.filename:
+            return jsonify({
+                'success': False,
+                'error': 'Arquivo da planilha é obrigatório'
+            }), 400
+
+        result = import_workbook(upload.stream, current_user.id, include_levels=current_user.is_admin)
+        
+        failed = result['training_sessions']['failed'] + result['competition_scores']['failed']
+        if result['levels']:
+            failed += result['levels']['failed']
+        
+        return jsonify({
+            'success': failed == 0,
+            'data': result
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
@@ -0,0 +1,83 @@
+from sqlalchemy import bindparam
+import threading
+import atexit
+from src.models.user import db, User
+
+class LastLoginBuffer:
+    """Buffer write-behind dos horários de último login
+
+    O login só registra o horário em memória; uma thread grava os horários
+    pendentes a cada interval segundos num único UPDATE em lote, fora do
+    caminho crítico do login. O restante é gravado no encerramento do processo.
+    """
+
+    def __init__(self, interval=5):
+        self.interval = interval
+        self.app = None
+        self._pending = {}  # user_id -> último horário
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def record(self, user_id, when):
+        with self._lock:
+            if self._pending.get(user_id) is None or self._pending[user_id] < when:
+                self._pending[user_id] = when
+            if self._thread is None and self.app is not None:
+                self._thread = threading.Thread(target=self._run, name='last-login-flush', daemon=True)
+                self._thread.start()
+
+    def pending(self, user_id):
+        with self._lock:
+            return self._pending.get(user_id)
+
+    def flush(self):
+        """Grava os horários pendentes e retorna quantos usuários foram atualizados"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            table = User.__table__
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(
+                        table.update().where(
+                            table.c.id == bindparam('user_id'),
+                            (table.c.last_login.is_(None)) | (table.c.last_login < bindparam('login_at'))
+                        ).values(last_login=bindparam('login_at')),
+                        [{'user_id': user_id, 'login_at': when} for user_id, when in pending.items()]
+                    )
+            except Exception:
+                # Devolve ao buffer para a próxima tentativa, sem sobrescrever logins mais novos
+                with self._lock:
+                    for user_id, when in pending.items():
+                        if self._pending.get(user_id) is None or self._pending[user_id] < when:
+                            self._pending[user_id] = when
+                raise
+            return len(pending)
+
+    def _flush_in_app(self):
+        with self.app.app_context():
+            return self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._flush_in_app()
+            except Exception as e:
+                self.app.logger.warning('Falha ao gravar último login: %s', e)
+
+    def shutdown(self):
+        self._stop.set()
+        if self.app is not None:
+            self._flush_in_app()
+
+last_logins = LastLoginBuffer()
+
+def init_last_login(app):
+    """Liga o buffer à aplicação (intervalo em LAST_LOGIN_FLUSH_INTERVAL)"""
+    last_logins.app = app
+    last_logins.interval = app.config.get('LAST_LOGIN_FLUSH_INTERVAL', last_logins.interval)
+    atexit.register(last_logins.shutdown)
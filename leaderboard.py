@@ -0,0 +1,242 @@
+from src.models.user import db, User
+from src.models.shooting import CompetitionScore
+from src.models.versions import TableVersion, bump, get_versions
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from bisect import bisect_left, insort
+from datetime import datetime
+import threading
+import click
+
+# Métricas do leaderboard: melhor pontuação ou soma das pontuações
+METRICS = ('best', 'total')
+
+# Versão extra incrementada a cada reconstrução completa
+REBUILD_VERSION = 'competition_leaderboard:rebuild'
+
+
+class CompetitionLeaderboard(db.Model):
+    """Melhor pontuação e soma das pontuações de cada usuário por competição"""
+    __tablename__ = 'competition_leaderboard'
+    __table_args__ = (
+        db.Index('ix_competition_leaderboard_seq', 'seq'),
+    )
+
+    competition_id = db.Column(db.Integer, db.ForeignKey('competition.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    best_score = db.Column(db.Float, nullable=False)
+    total_score = db.Column(db.Float, nullable=False, default=0.0)
+    scores = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    seq = db.Column(db.Integer, nullable=False, default=0)  # Sequência da última escrita
+
+def _write_seq():
+    """Sequência da escrita: a versão da tabela, já incrementada nesta transação
+
+    O SQLite serializa as transações de escrita, então a sequência cresce na
+    ordem de commit e a sincronização incremental não perde linhas.
+    """
+    return select(TableVersion.version).where(
+        TableVersion.name == CompetitionLeaderboard.__tablename__
+    ).scalar_subquery()
+
+def apply_competition_score(user_id, competition_id, score):
+    """Soma uma pontuação nova ao leaderboard na transação corrente (sem commit)"""
+    table = CompetitionLeaderboard.__table__
+    now = datetime.utcnow()
+    bump(CompetitionLeaderboard.__tablename__, user_id=user_id)
+    stmt = insert(table).values(
+        competition_id=competition_id, user_id=user_id,
+        best_score=score, total_score=score, scores=1, updated_at=now, seq=_write_seq()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['competition_id', 'user_id'],
+        set_={
+            'best_score': db.func.max(table.c.best_score, stmt.excluded.best_score),
+            'total_score': table.c.total_score + stmt.excluded.total_score,
+            'scores': table.c.scores + 1,
+            'updated_at': now,
+            'seq': stmt.excluded.seq
+        }
+    )
+    db.session.execute(stmt)
+
+def refresh_competition_score(user_id, competition_id):
+    """Recalcula a linha do usuário após alterar ou remover pontuações"""
+    best, total, count = db.session.query(
+        db.func.max(CompetitionScore.score),
+        db.func.coalesce(db.func.sum(CompetitionScore.score), 0.0),
+        db.func.count(CompetitionScore.id)
+    ).filter(
+        CompetitionScore.user_id == user_id,
+        CompetitionScore.competition_id == competition_id
+    ).one()
+    # Sem pontuações, a linha fica com scores = 0 e sai do leaderboard
+    table = CompetitionLeaderboard.__table__
+    now = datetime.utcnow()
+    bump(CompetitionLeaderboard.__tablename__, user_id=user_id)
+    stmt = insert(table).values(
+        competition_id=competition_id, user_id=user_id,
+        best_score=best or 0.0, total_score=total, scores=count, updated_at=now, seq=_write_seq()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['competition_id', 'user_id'],
+        set_={
+            'best_score': best or 0.0, 'total_score': total, 'scores': count,
+            'updated_at': now, 'seq': stmt.excluded.seq
+        }
+    )
+    db.session.execute(stmt)
+
+class Ranking:
+    """Lista ordenada de (-valor, user_id) com busca de posição por bisect
+
+    Posição, top-K e vizinhos custam O(log n); atualizar custa O(log n)
+    para localizar mais o deslocamento da lista.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._values = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def update(self, user_id, value):
+        self.remove(user_id)
+        self._values[user_id] = value
+        insort(self._keys, (-value, user_id))
+
+    def remove(self, user_id):
+        value = self._values.pop(user_id, None)
+        if value is not None:
+            index = bisect_left(self._keys, (-value, user_id))
+            del self._keys[index]
+
+    def rank(self, user_id):
+        """Posição (1 = primeiro) do usuário, ou None se ele não pontuou"""
+        value = self._values.get(user_id)
+        if value is None:
+            return None
+        # Empates ficam com a mesma posição
+        return bisect_left(self._keys, (-value,)) + 1
+
+    def entries(self, start, stop):
+        """[(posição, user_id, valor)] entre os índices start e stop"""
+        return [
+            (bisect_left(self._keys, (value,)) + 1, user_id, -value)
+            for value, user_id in self._keys[max(start, 0):stop]
+        ]
+
+    def top(self, count):
+        return self.entries(0, count)
+
+    def around(self, user_id, radius):
+        """Vizinhos do usuário (radius acima e abaixo), incluindo ele"""
+        value = self._values.get(user_id)
+        if value is None:
+            return []
+        index = bisect_left(self._keys, (-value, user_id))
+        return self.entries(index - radius, index + radius + 1)
+
+class LeaderboardIndex:
+    """Rankings em memória por (competição, métrica), sincronizados com a tabela
+
+    A cada consulta, as versões da tabela são comparadas numa única leitura;
+    se mudaram, apenas as linhas com seq maior que a última lida são
+    relidas. Uma reconstrução completa descarta os rankings carregados.
+    """
+
+    def __init__(self):
+        self._rankings = {}
+        self._versions = None
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        self._rankings = {}
+        self._seq = 0
+        self._apply(CompetitionLeaderboard.query.all())
+
+    def _apply(self, rows):
+        for row in rows:
+            self._seq = max(self._seq, row.seq)
+            for metric in METRICS:
+                ranking = self._rankings.setdefault((row.competition_id, metric), Ranking())
+                if row.scores:
+                    ranking.update(row.user_id, row.best_score if metric == 'best' else row.total_score)
+                else:
+                    ranking.remove(row.user_id)
+
+    def sync(self):
+        versions, _ = get_versions([CompetitionLeaderboard.__tablename__, REBUILD_VERSION])
+        with self._lock:
+            if versions == self._versions:
+                return
+            if self._versions is None or versions[REBUILD_VERSION] != self._versions[REBUILD_VERSION]:
+                self._load()
+            else:
+                self._apply(CompetitionLeaderboard.query.filter(CompetitionLeaderboard.seq > self._seq).all())
+            self._versions = versions
+
+    def query(self, competition_id, user_id, metric='best', limit=10, radius=2):
+        """(total de usuários, posição, top-K, vizinhos) de uma competição"""
+        self.sync()
+        with self._lock:
+            ranking = self._rankings.get((competition_id, metric)) or Ranking()
+            return len(ranking), ranking.rank(user_id), ranking.top(limit), ranking.around(user_id, radius)
+
+leaderboards = LeaderboardIndex()
+
+def leaderboard_data(competition_id, user_id, metric='best', limit=10, radius=2):
+    """Top-K, posição do usuário e vizinhos, com os nomes numa única consulta"""
+    total, rank, top, around = leaderboards.query(competition_id, user_id, metric, limit, radius)
+    user_ids = {entry[1] for entry in top + around}
+    names = dict(db.session.query(User.id, User.full_name).filter(User.id.in_(user_ids))) if user_ids else {}
+
+    def serialize(entries):
+        return [{
+            'rank': position,
+            'user_id': entry_user_id,
+            'name': names.get(entry_user_id),
+            'value': value,
+            'is_current_user': entry_user_id == user_id
+        } for position, entry_user_id, value in entries]
+
+    return {
+        'metric': metric,
+        'total_users': total,
+        'rank': rank,
+        'top': serialize(top),
+        'around': serialize(around)
+    }
+
+def rebuild_leaderboards():
+    """Reconstrói o leaderboard a partir das pontuações"""
+    CompetitionLeaderboard.query.delete()
+    now = datetime.utcnow()
+    rows = db.session.query(
+        CompetitionScore.competition_id,
+        CompetitionScore.user_id,
+        db.func.max(CompetitionScore.score),
+        db.func.sum(CompetitionScore.score),
+        db.func.count(CompetitionScore.id)
+    ).group_by(CompetitionScore.competition_id, CompetitionScore.user_id).all()
+    bump(CompetitionLeaderboard.__tablename__, REBUILD_VERSION)
+    if rows:
+        db.session.execute(CompetitionLeaderboard.__table__.insert().values(seq=_write_seq()), [{
+            'competition_id': competition_id, 'user_id': user_id, 'best_score': best,
+            'total_score': total, 'scores': count, 'updated_at': now
+        } for competition_id, user_id, best, total, count in rows])
+    db.session.commit()
+
+def ensure_leaderboards():
+    """Popula o leaderboard na primeira execução sobre um banco existente"""
+    if CompetitionLeaderboard.query.first() is None and CompetitionScore.query.first() is not None:
+        rebuild_leaderboards()
+
+@click.command('rebuild-leaderboards')
+def rebuild_leaderboards_command():
+    """Recalcula o leaderboard de todas as competições"""
+    rebuild_leaderboards()
+    click.echo('Leaderboards reconstruídos.')
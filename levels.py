@@ -1,17 +1,20 @@
 from flask import Blueprint, request, jsonify
-from src.models.shooting import db, Level, UserProgress, TrainingSession
-from datetime import datetime
+from src.models.shooting import db, Level, UserProgress
+from src.models.serialization import eager
+from src.models.progress import DEFAULT_CHUNK_SIZE, level_thresholds, reconcile_progress, recompute_all_progress
+from src.routes.auth import token_required
+from src.utils.conditional import conditional
 
 levels_bp = Blueprint('levels', __name__)
 
 @levels_bp.route('/levels', methods=['GET'])
+@conditional('level')
 def get_levels():
     """Listar todos os níveis"""
     try:
-        levels = Level.query.order_by(Level.order).all()
         return jsonify({
             'success': True,
-            'data': [level.to_dict() for level in levels]
+            'data': level_thresholds.all()
         })
     except Exception as e:
         return jsonify({
@@ -53,20 +56,48 @@ def create_level():
             'error': str(e)
         }), 500
 
+def get_or_create_progress(user_id):
+    """Obtém o progresso do usuário, criando-o no primeiro nível se não existir"""
+    progress = eager(UserProgress.query, UserProgress).filter_by(user_id=user_id).first()
+    
+    if not progress:
+        # Criar progresso inicial se não existir
+        first_level = level_thresholds.first()
+        if first_level:
+            progress = UserProgress(user_id=user_id, current_level_id=first_level['id'])
+            db.session.add(progress)
+            db.session.commit()
+    
+    return progress
+
+def next_level_data(progress):
+    """Monta as informações do próximo nível a partir do progresso"""
+    current_level = progress.current_level
+    next_level = level_thresholds.after(current_level.order)
+    
+    if next_level:
+        # Calcular progresso para o próximo nível
+        score_needed = next_level['min_score'] - progress.average_score
+        progress_percentage = min(100, (progress.average_score / next_level['min_score']) * 100) if next_level['min_score'] > 0 else 100
+    else:
+        score_needed = 0
+        progress_percentage = 100
+    
+    return {
+        'current_level': current_level.to_dict(),
+        'next_level': next_level,
+        'score_needed': max(0, score_needed),
+        'progress_percentage': progress_percentage,
+        'is_max_level': next_level is None
+    }
+
 @levels_bp.route('/progress', methods=['GET'])
-def get_user_progress():
+@token_required
+@conditional('user_progress', 'level', per_user=True)
+def get_user_progress(current_user):
     """Obter progresso do usuário"""
     try:
-        # Para simplicidade, assumimos um único usuário
-        progress = UserProgress.query.first()
-        
-        if not progress:
-            # Criar progresso inicial se não existir
-            first_level = Level.query.order_by(Level.order).first()
-            if first_level:
-                progress = UserProgress(current_level_id=first_level.id)
-                db.session.add(progress)
-                db.session.commit()
+        progress = get_or_create_progress(current_user.id)
         
         return jsonify({
             'success': True,
@@ -80,50 +111,61 @@ def get_user_progress():
         }), 500
 
 @levels_bp.route('/progress/update', methods=['POST'])
-def update_user_progress():
-    """Atualizar progresso do usuário"""
+@token_required
+def update_user_progress(current_user):
+    """Reconciliar o progresso do usuário com as sessões de treinamento
+
+    O progresso já é mantido a cada sessão criada, alterada ou removida;
+    aqui ele é recalculado do zero e as divergências corrigidas são retornadas.
+    """
     try:
-        # Recalcular estatísticas baseadas nas sessões de treino
-        total_sessions = TrainingSession.query.count()
-        
-        if total_sessions > 0:
-            total_shots = db.session.query(db.func.sum(TrainingSession.shots_fired)).scalar() or 0
-            total_hits = db.session.query(db.func.sum(TrainingSession.hits)).scalar() or 0
-            avg_score = db.session.query(db.func.avg(TrainingSession.score)).scalar() or 0
-            last_session = TrainingSession.query.order_by(TrainingSession.date.desc()).first()
-            
-            # Determinar nível baseado na pontuação média
-            current_level = Level.query.filter(
-                Level.min_score <= avg_score
-            ).order_by(Level.min_score.desc()).first()
-            
-            if not current_level:
-                current_level = Level.query.order_by(Level.order).first()
-        else:
-            total_shots = total_hits = avg_score = 0
-            last_session = None
-            current_level = Level.query.order_by(Level.order).first()
-        
-        # Atualizar ou criar progresso
-        progress = UserProgress.query.first()
-        if not progress:
-            progress = UserProgress()
-            db.session.add(progress)
+        progress, drift = reconcile_progress(current_user.id)
         
-        if current_level:
-            progress.current_level_id = current_level.id
-        progress.total_sessions = total_sessions
-        progress.total_shots = total_shots
-        progress.total_hits = total_hits
-        progress.average_score = avg_score
-        progress.last_session_date = last_session.date if last_session else None
-        progress.updated_at = datetime.utcnow()
+        return jsonify({
+            'success': True,
+            'data': progress.to_dict() if progress else None,
+            'drift': drift
+        })
         
-        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@levels_bp.route('/progress/recompute', methods=['POST'])
+@token_required
+def recompute_progress(current_user):
+    """Recalcular o progresso de todos os usuários (administradores)
+
+    Aceita workers, chunk_size e resume (continuar a execução interrompida).
+    """
+    try:
+        if not current_user.is_admin:
+            return jsonify({
+                'success': False,
+                'error': 'Acesso restrito a administradores'
+            }), 403
+        
+        data = request.get_json(silent=True) or {}
+        try:
+            workers = int(data['workers']) if data.get('workers') else None
+            chunk_size = int(data.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'workers e chunk_size devem ser inteiros'
+            }), 400
+        if chunk_size < 1 or (workers is not None and workers < 1):
+            return jsonify({
+                'success': False,
+                'error': 'workers e chunk_size devem ser positivos'
+            }), 400
         
         return jsonify({
             'success': True,
-            'data': progress.to_dict()
+            'data': recompute_all_progress(workers, chunk_size, bool(data.get('resume')))
         })
         
     except Exception as e:
@@ -134,43 +176,49 @@ def update_user_progress():
         }), 500
 
 @levels_bp.route('/progress/next-level', methods=['GET'])
-def get_next_level_info():
+@token_required
+@conditional('user_progress', 'level', per_user=True)
+def get_next_level_info(current_user):
     """Obter informações sobre o próximo nível"""
     try:
-        progress = UserProgress.query.first()
+        progress = eager(UserProgress.query, UserProgress).filter_by(user_id=current_user.id).first()
         if not progress:
             return jsonify({
                 'success': False,
                 'error': 'Progresso não encontrado'
             }), 404
         
-        current_level = progress.current_level
-        next_level = Level.query.filter(
-            Level.order > current_level.order
-        ).order_by(Level.order).first()
+        return jsonify({
+            'success': True,
+            'data': next_level_data(progress)
+        })
         
-        if next_level:
-            # Calcular progresso para o próximo nível
-            score_needed = next_level.min_score - progress.average_score
-            progress_percentage = min(100, (progress.average_score / next_level.min_score) * 100) if next_level.min_score > 0 else 100
-        else:
-            score_needed = 0
-            progress_percentage = 100
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@levels_bp.route('/levels/overview', methods=['GET'])
+@token_required
+@conditional('user_progress', 'level', per_user=True)
+def get_levels_overview(current_user):
+    """Obter níveis, progresso e próximo nível em uma única requisição"""
+    try:
+        progress = get_or_create_progress(current_user.id)
         
         return jsonify({
             'success': True,
             'data': {
-                'current_level': current_level.to_dict(),
-                'next_level': next_level.to_dict() if next_level else None,
-                'score_needed': max(0, score_needed),
-                'progress_percentage': progress_percentage,
-                'is_max_level': next_level is None
+                'levels': level_thresholds.all(),
+                'progress': progress.to_dict() if progress else None,
+                'next_level': next_level_data(progress) if progress else None
             }
         })
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
-
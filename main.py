@@ -3,20 +3,59 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory, jsonify
+from flask import Flask, jsonify
 from flask_cors import CORS
 from src.models.user import db
 from src.models.shooting import Weapon, Competition, CompetitionScore, Level, TrainingSession, UserProgress
+from src.models.training_stats import ensure_training_stats, rebuild_training_stats_command
+from src.models.rollups import ensure_rollups, rebuild_rollups_command
+from src.models.compliance import ensure_habitualidade, rebuild_habitualidade_command, check_habitualidade_command
+from src.models.leaderboard import ensure_leaderboards, rebuild_leaderboards_command
+from src.models.progress import rebuild_progress_command, recompute_progress_command
+from src.models.workbook_import import import_habitualidade_command
+from src.models.provisioning import provision_members_command
+from src.models.migrations import run_migrations, db_migrate_command, check_query_plans_command
 from src.routes.user import user_bp
-from src.routes.auth import auth_bp
+from src.routes.auth import auth_bp, token_required
 from src.routes.weapons import weapons_bp
 from src.routes.competitions import competitions_bp
 from src.routes.levels import levels_bp
 from src.routes.training import training_bp
+from src.routes.dashboard import dashboard_bp
+from src.routes.export import export_bp
+from src.routes.habitualidade import habitualidade_bp
+from src.utils.query_counter import init_query_counter
+from src.utils.response_cache import response_cache, init_response_cache
+from src.utils.auth_cache import auth_cache, init_auth_cache
+from src.utils.password_hashing import init_password_hashing
+from src.utils.last_login import init_last_login
+from src.utils.rate_limit import init_rate_limit
+from src.utils.static_assets import StaticManifest, serve_asset
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'shooting-sports-secret-key-2024-secure'
 
+# Threads de requisição do processo (--threads do gunicorn)
+app.config['SERVER_THREADS'] = int(os.environ.get('SERVER_THREADS', 8))
+
+# Custo do hash de senhas e limites do executor, ajustáveis por implantação.
+# A fila de hashing deixa threads de requisição livres para as demais rotas,
+# e a espera curta faz um servidor sobrecarregado responder 503 logo.
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get(
+    'PASSWORD_HASH_MAX_PENDING', max(1, app.config['SERVER_THREADS'] - 2)))
+app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 3))
+
+# Limite de tentativas nas rotas de autenticação; 'sqlite' compartilha os
+# limites entre os workers do gunicorn no mesmo host
+app.config['RATE_LIMIT_BACKEND'] = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+app.config['RATE_LIMIT_SQLITE_PATH'] = os.environ.get(
+    'RATE_LIMIT_SQLITE_PATH', os.path.join(os.path.dirname(__file__), '..', 'instance', 'rate_limit.db'))
+# Proxies reversos confiáveis à frente da aplicação (0 = acesso direto); o
+# IP do cliente é o endereço acrescentado ao X-Forwarded-For pelo mais externo
+app.config['RATE_LIMIT_PROXY_HOPS'] = int(os.environ.get('RATE_LIMIT_PROXY_HOPS', 0))
+
 # Habilitar CORS para todas as rotas
 CORS(app, origins=['http://localhost:5173', 'http://localhost:3000'])
 
@@ -27,11 +66,31 @@ app.register_blueprint(weapons_bp, url_prefix='/api')
 app.register_blueprint(competitions_bp, url_prefix='/api')
 app.register_blueprint(levels_bp, url_prefix='/api')
 app.register_blueprint(training_bp, url_prefix='/api')
+app.register_blueprint(dashboard_bp, url_prefix='/api')
+app.register_blueprint(export_bp, url_prefix='/api')
+app.register_blueprint(habitualidade_bp, url_prefix='/api')
 
 # Configuração do banco de dados
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), '..', 'instance', 'database.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
+init_query_counter(app)
+init_response_cache(app)
+init_auth_cache(app)
+init_password_hashing(app)
+init_last_login(app)
+init_rate_limit(app)
+app.cli.add_command(rebuild_training_stats_command)
+app.cli.add_command(rebuild_rollups_command)
+app.cli.add_command(rebuild_habitualidade_command)
+app.cli.add_command(check_habitualidade_command)
+app.cli.add_command(import_habitualidade_command)
+app.cli.add_command(provision_members_command)
+app.cli.add_command(rebuild_leaderboards_command)
+app.cli.add_command(rebuild_progress_command)
+app.cli.add_command(recompute_progress_command)
+app.cli.add_command(db_migrate_command)
+app.cli.add_command(check_query_plans_command)
 
 # Health check para monitoramento
 @app.route('/api/health')
@@ -43,26 +102,46 @@ def health_check():
         'version': '1.0.0'
     }), 200
 
+@app.route('/api/cache/stats')
+@token_required
+def cache_stats(current_user):
+    """Contadores do cache de respostas (acertos, falhas, expulsões, invalidações)"""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Acesso restrito a administradores'}), 403
+    return jsonify({'success': True, 'data': response_cache.stats()}), 200
+
+@app.route('/api/cache/auth-stats')
+@token_required
+def auth_cache_stats(current_user):
+    """Contadores do cache de autenticação"""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Acesso restrito a administradores'}), 403
+    return jsonify({'success': True, 'data': auth_cache.stats()}), 200
+
 # Criar tabelas do banco de dados
 with app.app_context():
     db.create_all()
+    run_migrations()
+    ensure_training_stats()
+    ensure_rollups()
+    ensure_habitualidade()
+    ensure_leaderboards()
+
+# Manifesto dos arquivos do frontend, montado uma vez na inicialização
+static_manifest = StaticManifest()
+static_manifest.build(app.static_folder)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    """Servir arquivos estáticos do frontend"""
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
+    """Servir arquivos estáticos do frontend a partir do manifesto em memória"""
+    asset = static_manifest.get(path) if path else None
+    if asset is None:
+        # Rotas do SPA caem no index.html
+        asset = static_manifest.get('index.html')
+        if asset is None:
             return "index.html not found", 404
+    return serve_asset(asset)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,223 @@
+from src.models.user import db, User
+from src.models.shooting import Weapon, Competition, CompetitionScore, Level, TrainingSession, UserProgress
+from src.models.rollups import TrainingRollup, CompetitionScoreRollup
+from src.models.compliance import UserWeaponMonthlySessions
+from src.models.leaderboard import CompetitionLeaderboard
+from sqlalchemy import desc, func, select
+from datetime import date
+import re
+import click
+
+def add_column(table, column, ddl):
+    """Migração que adiciona a coluna se ela ainda não existir
+
+    Em bancos novos, create_all já cria a tabela com a coluna.
+    """
+    def migrate(connection):
+        columns = {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info({table})')}
+        if column not in columns:
+            connection.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}')
+    return migrate
+
+def drop_not_null(table, *columns):
+    """Migração que torna as colunas anuláveis, recriando a tabela
+
+    O SQLite não altera a restrição de colunas existentes: a tabela é
+    recriada pelo seu CREATE TABLE sem os NOT NULL, os dados são copiados e
+    os índices recriados. Em bancos novos as colunas já são anuláveis.
+    """
+    def migrate(connection):
+        required = {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info({table})') if row[3]}
+        if not required & set(columns):
+            return
+        create = connection.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).scalar()
+        indexes = [sql for sql, in connection.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+        )]
+        for column in columns:
+            create = re.sub(rf'("?{column}"?\s+\w+(?:\([^)]*\))?)\s+NOT NULL', r'\1', create, count=1)
+        connection.exec_driver_sql(create.replace(table, f'{table}__new', 1))
+        connection.exec_driver_sql(f'INSERT INTO {table}__new SELECT * FROM {table}')
+        connection.exec_driver_sql(f'DROP TABLE {table}')
+        connection.exec_driver_sql(f'ALTER TABLE {table}__new RENAME TO {table}')
+        for sql in indexes:
+            connection.exec_driver_sql(sql)
+    return migrate
+
+# Migrações versionadas, aplicadas em ordem sobre bancos existentes.
+# A versão do esquema fica em PRAGMA user_version do SQLite.
+MIGRATIONS = [
+    (1, 'Índices para as consultas das rotas', [
+        'CREATE INDEX IF NOT EXISTS ix_training_session_date_id ON training_session (date, id)',
+        'CREATE INDEX IF NOT EXISTS ix_training_session_weapon_date_id ON training_session (weapon_id, date, id)',
+        'CREATE INDEX IF NOT EXISTS ix_competition_score_competition_date '
+        'ON competition_score (competition_id, date, score, stage)',
+        'CREATE INDEX IF NOT EXISTS ix_weapon_caliber ON weapon (caliber)',
+        'CREATE INDEX IF NOT EXISTS ix_weapon_owner ON weapon (owner)',
+        'CREATE INDEX IF NOT EXISTS ix_level_order ON level ("order")',
+        'CREATE INDEX IF NOT EXISTS ix_level_min_score ON level (min_score)',
+    ]),
+    (2, 'Estatísticas e índices por usuário', [
+        # Agregados globais substituídos pelas tabelas user_* (recriadas e
+        # populadas na inicialização a partir das tabelas de origem)
+        'DROP TABLE IF EXISTS training_totals',
+        'DROP TABLE IF EXISTS weapon_training_totals',
+        'DROP TABLE IF EXISTS training_rollup',
+        'DROP TABLE IF EXISTS competition_score_rollup',
+        'DROP INDEX IF EXISTS ix_training_session_date_id',
+        'DROP INDEX IF EXISTS ix_training_session_weapon_date_id',
+        'DROP INDEX IF EXISTS ix_competition_score_competition_date',
+        'CREATE INDEX IF NOT EXISTS ix_training_session_user_date_id ON training_session (user_id, date, id)',
+        'CREATE INDEX IF NOT EXISTS ix_training_session_user_weapon_date_id '
+        'ON training_session (user_id, weapon_id, date, id)',
+        'CREATE INDEX IF NOT EXISTS ix_competition_score_user_competition_date '
+        'ON competition_score (user_id, competition_id, date, score, stage)',
+        'CREATE INDEX IF NOT EXISTS ix_user_progress_user_id ON user_progress (user_id)',
+    ]),
+    (3, 'Época dos tokens para revogação', [
+        add_column('users', 'token_epoch', 'INTEGER NOT NULL DEFAULT 0'),
+    ]),
+    (4, 'Sequência de escrita do leaderboard', [
+        # Linhas existentes ficam com seq 0 e entram na carga completa do índice
+        add_column('competition_leaderboard', 'seq', 'INTEGER NOT NULL DEFAULT 0'),
+        'DROP INDEX IF EXISTS ix_competition_leaderboard_updated_at',
+        'CREATE INDEX IF NOT EXISTS ix_competition_leaderboard_seq ON competition_leaderboard (seq)',
+    ]),
+    (5, 'Sessões sem pontuação', [
+        # Sessões importadas sem acertos ou pontuação gravam NULL
+        drop_not_null('training_session', 'hits', 'score'),
+        add_column('user_training_totals', 'scored_sessions', 'INTEGER NOT NULL DEFAULT 0'),
+        add_column('user_training_totals', 'scored_shots', 'INTEGER NOT NULL DEFAULT 0'),
+        add_column('user_weapon_training_totals', 'scored_sessions', 'INTEGER NOT NULL DEFAULT 0'),
+        add_column('user_weapon_training_totals', 'scored_shots', 'INTEGER NOT NULL DEFAULT 0'),
+        add_column('user_training_rollup', 'scored_sessions', 'INTEGER NOT NULL DEFAULT 0'),
+        add_column('user_training_rollup', 'scored_shots', 'INTEGER NOT NULL DEFAULT 0'),
+        add_column('user_progress', 'scored_shots', 'INTEGER DEFAULT 0'),
+        # Agregados repopulados na inicialização a partir das sessões
+        'DELETE FROM user_weapon_training_totals',
+        'DELETE FROM user_training_totals',
+        'DELETE FROM user_training_rollup',
+        # Até aqui toda sessão tinha acertos registrados
+        'UPDATE user_progress SET scored_shots = total_shots',
+    ]),
+]
+
+def get_schema_version(connection):
+    return connection.exec_driver_sql('PRAGMA user_version').scalar()
+
+def run_migrations():
+    """Aplica as migrações pendentes e retorna as versões aplicadas"""
+    applied = []
+    with db.engine.begin() as connection:
+        current = get_schema_version(connection)
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            for statement in statements:
+                if callable(statement):
+                    statement(connection)
+                else:
+                    connection.exec_driver_sql(statement)
+            connection.exec_driver_sql(f'PRAGMA user_version = {int(version)}')
+            applied.append((version, description))
+    return applied
+
+def route_queries():
+    """Consultas representativas de cada rota, com os filtros e ordenações reais"""
+    today = date.today()
+    return {
+        'GET /training-sessions': select(TrainingSession).filter_by(user_id=1).order_by(
+            desc(TrainingSession.date), desc(TrainingSession.id)).limit(10),
+        'GET /training-sessions?weapon_id': select(TrainingSession).filter_by(user_id=1, weapon_id=1).order_by(
+            desc(TrainingSession.date), desc(TrainingSession.id)).limit(10),
+        'GET /training-sessions?after': select(TrainingSession).filter(
+            TrainingSession.user_id == 1, TrainingSession.date < today).order_by(
+            desc(TrainingSession.date), desc(TrainingSession.id)).limit(10),
+        'GET /training-sessions/recent': select(TrainingSession).filter_by(user_id=1).order_by(
+            desc(TrainingSession.date)).limit(5),
+        'GET /training-sessions/evolution': select(TrainingRollup).filter(
+            TrainingRollup.user_id == 1, TrainingRollup.bucket == 'week',
+            TrainingRollup.bucket_start >= today, TrainingRollup.bucket_start <= today),
+        'GET /competitions/<id>/scores': select(CompetitionScore).filter_by(user_id=1, competition_id=1).order_by(
+            desc(CompetitionScore.date)),
+        'GET /competitions/<id>/evolution': select(CompetitionScore).filter_by(user_id=1, competition_id=1).order_by(
+            CompetitionScore.date),
+        'GET /competitions/<id>/evolution?bucket': select(CompetitionScoreRollup).filter(
+            CompetitionScoreRollup.user_id == 1, CompetitionScoreRollup.competition_id == 1,
+            CompetitionScoreRollup.bucket == 'week',
+            CompetitionScoreRollup.bucket_start >= today, CompetitionScoreRollup.bucket_start <= today),
+        'GET /competitions/ranking': select(
+            CompetitionScore.competition_id, CompetitionScore.score, CompetitionScore.stage, CompetitionScore.date,
+            func.row_number().over(
+                partition_by=CompetitionScore.competition_id,
+                order_by=(desc(CompetitionScore.date), desc(CompetitionScore.id))
+            )
+        ).filter(CompetitionScore.user_id == 1),
+        'GET /competitions/stats': select(
+            Competition.name, CompetitionLeaderboard.scores, CompetitionLeaderboard.best_score
+        ).outerjoin(CompetitionLeaderboard, db.and_(
+            CompetitionLeaderboard.competition_id == Competition.id, CompetitionLeaderboard.user_id == 1
+        )).order_by(Competition.name),
+        'GET /competitions/<id>/leaderboard (sincronização)': select(CompetitionLeaderboard).filter(
+            CompetitionLeaderboard.seq > 0),
+        'GET /habitualidade': select(
+            UserWeaponMonthlySessions.month, Weapon.caliber, UserWeaponMonthlySessions.sessions
+        ).join(Weapon, Weapon.id == UserWeaponMonthlySessions.weapon_id).filter(
+            UserWeaponMonthlySessions.user_id == 1,
+            UserWeaponMonthlySessions.month >= today, UserWeaponMonthlySessions.month <= today),
+        'GET /progress': select(UserProgress).filter_by(user_id=1).limit(1),
+        'POST /progress/update': select(
+            func.count(TrainingSession.id), func.sum(TrainingSession.score), func.max(TrainingSession.date)
+        ).filter(TrainingSession.user_id == 1),
+        'DELETE /training-sessions/<id> (última sessão)': select(func.max(TrainingSession.date)).filter(
+            TrainingSession.user_id == 1),
+        'GET /weapons/by-caliber/<caliber>': select(Weapon).filter_by(caliber='9mm'),
+        'GET /weapons/by-owner/<owner>': select(Weapon).filter_by(owner='Fer'),
+        'GET /weapons/stats (calibre)': select(Weapon.caliber, db.func.count(Weapon.id)).group_by(Weapon.caliber),
+        'GET /weapons/stats (proprietário)': select(Weapon.owner, db.func.count(Weapon.id)).group_by(Weapon.owner),
+        'GET /levels': select(Level).order_by(Level.order),
+        'POST /auth/login': select(User).filter((User.username == 'demo') | (User.email == 'demo')).limit(1),
+    }
+
+# "SCAN tabela" sem índice; "SCAN tabela USING [COVERING] INDEX" e a leitura
+# de subconsultas ("SCAN (subquery-N)") são aceitos
+TABLE_SCAN = re.compile(r'^SCAN (?!\()(?!.*\bUSING\b)')
+
+def explain(statement):
+    """Retorna as linhas de EXPLAIN QUERY PLAN de uma consulta"""
+    compiled = statement.compile(dialect=db.engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params).all()
+    return [row[3] for row in rows]
+
+def check_query_plans():
+    """Verifica o plano de cada rota; retorna {rota: (ok, plano)}"""
+    results = {}
+    for route, statement in route_queries().items():
+        plan = explain(statement)
+        results[route] = (not any(TABLE_SCAN.match(line) for line in plan), plan)
+    return results
+
+@click.command('db-migrate')
+def db_migrate_command():
+    """Aplica as migrações de esquema pendentes"""
+    applied = run_migrations()
+    for version, description in applied:
+        click.echo(f'Migração {version} aplicada: {description}')
+    if not applied:
+        click.echo('Esquema já está atualizado.')
+
+@click.command('check-query-plans')
+def check_query_plans_command():
+    """Falha se alguma consulta de rota fizer varredura completa de tabela"""
+    failed = False
+    for route, (ok, plan) in check_query_plans().items():
+        click.echo(f"{'OK  ' if ok else 'SCAN'} {route}")
+        for line in plan:
+            click.echo(f'       {line}')
+        failed = failed or not ok
+    if failed:
+        raise SystemExit(1)
@@ -0,0 +1,51 @@
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    """Cursor de paginação malformado ou adulterado"""
+
+
+def encode_cursor(*values):
+    """Gera cursor opaco a partir dos valores da chave de ordenação"""
+    payload = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, *types):
+    """Decodifica cursor opaco convertendo cada valor para o tipo esperado"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise InvalidCursor('Cursor inválido')
+        values = []
+        for value, kind in zip(payload, types):
+            if kind is date:
+                values.append(date.fromisoformat(value))
+            elif kind is datetime:
+                values.append(datetime.fromisoformat(value))
+            else:
+                values.append(kind(value))
+        return values
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor('Cursor inválido')
+
+
+def keyset_after(columns, values):
+    """Filtro para linhas depois da chave (colunas em ordem decrescente)
+
+    Equivale a ``(c1, c2, ...) < (v1, v2, ...)`` escrito de forma que o
+    SQLite consiga usar o índice composto.
+    """
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        prefix = [c == v for c, v in zip(columns[:i], values[:i])]
+        clauses.append(and_(*prefix, column < value))
+    return or_(*clauses)
@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+import threading
+
+class PasswordHashingBusy(Exception):
+    """Fila de hashing cheia: a requisição deve ser recusada com 503"""
+
+class PasswordHasher:
+    """Hashing de senhas num executor dedicado e limitado
+
+    O scrypt/pbkdf2 do hashlib libera o GIL, então poucas threads dedicadas
+    usam a CPU sem ocupar as threads de requisição do gunicorn. Acima de
+    max_pending hashes em andamento ou na fila, novas chamadas falham na hora
+    com PasswordHashingBusy em vez de esperar.
+    """
+
+    def __init__(self, method='scrypt', workers=2, max_pending=6, timeout=3):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self.configure(method, workers, max_pending, timeout)
+
+    def configure(self, method, workers, max_pending, timeout):
+        with self._lock:
+            # Prefixo gravado no hash com todos os parâmetros (ex.: scrypt:32768:8:1)
+            self.prefix = generate_password_hash('', method).split('$', 1)[0]
+            self.method = method
+            self.workers = workers
+            self.max_pending = max_pending
+            self.timeout = timeout
+            previous, self._executor = self._executor, None
+            self._slots = threading.BoundedSemaphore(max_pending)
+        if previous is not None:
+            previous.shutdown(wait=False)
+
+    def _current(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+            return self._executor, self._slots
+
+    def _submit(self, function, *args):
+        executor, slots = self._current()
+        if not slots.acquire(blocking=False):
+            raise PasswordHashingBusy('Servidor ocupado, tente novamente em instantes')
+        try:
+            future = executor.submit(function, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            raise PasswordHashingBusy('Servidor ocupado, tente novamente em instantes')
+
+    def hash(self, password):
+        return self._submit(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._submit(check_password_hash, password_hash, password)
+
+    def hash_many(self, passwords):
+        """Hashes de uma lista de senhas, na mesma ordem, no executor dedicado
+
+        Para cadastros em lote: no máximo workers hashes do lote ocupam a
+        fila ao mesmo tempo, e o restante das vagas fica para logins e
+        cadastros individuais. Sem vaga em timeout segundos, falha com
+        PasswordHashingBusy.
+        """
+        executor, slots = self._current()
+        window = threading.BoundedSemaphore(self.workers)
+        futures = []
+
+        def release(_):
+            slots.release()
+            window.release()
+
+        try:
+            for password in passwords:
+                window.acquire()
+                if not slots.acquire(timeout=self.timeout):
+                    window.release()
+                    raise PasswordHashingBusy('Servidor ocupado, tente novamente em instantes')
+                try:
+                    future = executor.submit(generate_password_hash, password, self.method)
+                except BaseException:
+                    release(None)
+                    raise
+                future.add_done_callback(release)
+                futures.append(future)
+            return [future.result(self.timeout) for future in futures]
+        except TimeoutError:
+            raise PasswordHashingBusy('Servidor ocupado, tente novamente em instantes')
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def needs_rehash(self, password_hash):
+        """Indica se o hash foi gerado com parâmetros diferentes dos configurados"""
+        return password_hash.split('$', 1)[0] != self.prefix
+
+password_hasher = PasswordHasher()
+
+def init_password_hashing(app):
+    """Aplica o método e os limites configurados
+
+    PASSWORD_HASH_METHOD (formato do werkzeug, ex.: scrypt:65536:8:1 ou
+    pbkdf2:sha256:600000), PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+    e PASSWORD_HASH_TIMEOUT. Cada hash pendente prende uma thread de
+    requisição, então MAX_PENDING precisa ficar abaixo de SERVER_THREADS.
+    """
+    threads = app.config.get('SERVER_THREADS')
+    max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', password_hasher.max_pending)
+    if threads is not None and max_pending >= threads:
+        raise ValueError(
+            f'PASSWORD_HASH_MAX_PENDING ({max_pending}) deve ser menor que SERVER_THREADS ({threads}) '
+            'para sobrarem threads para as demais rotas'
+        )
+    password_hasher.configure(
+        app.config.get('PASSWORD_HASH_METHOD', password_hasher.method),
+        app.config.get('PASSWORD_HASH_WORKERS', password_hasher.workers),
+        max_pending,
+        app.config.get('PASSWORD_HASH_TIMEOUT', password_hasher.timeout)
+    )
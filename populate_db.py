@@ -20,6 +20,11 @@ def load_initial_data():
     from src.main import app
     from src.models.user import db, User
     from src.models.shooting import Weapon, Competition, CompetitionScore, Level, TrainingSession, UserProgress
+    from src.models.training_stats import rebuild_training_stats
+    from src.models.rollups import rebuild_rollups
+    from src.models.compliance import rebuild_habitualidade
+    from src.models.leaderboard import rebuild_leaderboards
+    from src.models.progress import rebuild_progress
     
     with app.app_context():
         # Criar todas as tabelas
@@ -174,6 +179,7 @@ def load_initial_data():
             total_sessions=20,
             total_shots=1500,
             total_hits=1200,
+            scored_shots=1500,
             average_score=125.5,
             last_session_date=datetime.now().date() - timedelta(days=1)
         )
@@ -182,6 +188,15 @@ def load_initial_data():
         print("✓ Progresso do usuário criado")
         
         db.session.commit()
+        
+        # 8. Recalcular tabelas agregadas de estatísticas
+        rebuild_training_stats()
+        rebuild_rollups()
+        rebuild_habitualidade()
+        rebuild_leaderboards()
+        rebuild_progress()
+        print("✓ Estatísticas de treino recalculadas")
+        
         print("\n🎯 Banco de dados populado com sucesso!")
         
         # Mostrar estatísticas
@@ -0,0 +1,379 @@
+from src.models.user import db, User
+from src.models.shooting import Level, TrainingSession, UserProgress
+from src.models.versions import bump, get_versions, write_listeners
+from flask import g
+from sqlalchemy import bindparam, create_engine, select, func
+from concurrent.futures import ProcessPoolExecutor
+from bisect import bisect_right
+from datetime import datetime
+import multiprocessing
+import threading
+import time
+import os
+import click
+
+# Campos comparados na reconciliação
+FIELDS = (
+    'total_sessions', 'total_shots', 'total_hits', 'scored_shots', 'average_score',
+    'last_session_date', 'current_level_id'
+)
+
+# Usuários por lote no recálculo em massa
+DEFAULT_CHUNK_SIZE = 500
+
+class ProgressRecomputeRun(db.Model):
+    """Execução do recálculo em massa, com o último usuário concluído para retomada"""
+    __tablename__ = 'progress_recompute_run'
+
+    id = db.Column(db.Integer, primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    last_user_id = db.Column(db.Integer, nullable=False, default=0)
+    users_done = db.Column(db.Integer, nullable=False, default=0)
+
+class LevelTable:
+    """Níveis ordenados por Level.order e por pontuação mínima (somente leitura)"""
+
+    def __init__(self, levels):
+        self.levels = [level.to_dict() for level in levels]
+        self._orders = [level['order'] for level in self.levels]
+        # (min_score, posição em levels), crescente
+        self._min_scores = sorted((level['min_score'], index) for index, level in enumerate(self.levels))
+
+    def first(self):
+        return self.levels[0] if self.levels else None
+
+    def for_score(self, average_score):
+        """Nível de maior pontuação mínima alcançada pela média
+
+        Sem média (usuário sem sessões) ou abaixo de todos, o primeiro nível.
+        """
+        if average_score is not None:
+            position = bisect_right(self._min_scores, (average_score, len(self.levels)))
+            if position:
+                return self.levels[self._min_scores[position - 1][1]]
+        return self.first()
+
+    def after(self, order):
+        """Nível seguinte à ordem informada, ou None no último nível"""
+        position = bisect_right(self._orders, order)
+        return self.levels[position] if position < len(self.levels) else None
+
+class LevelThresholds:
+    """Tabela de níveis em memória
+
+    A tabela só é relida quando a sua versão muda (create_level ou a
+    importação da aba Níveis); o nível de uma média é achado por bisect.
+    A versão é conferida uma vez por contexto da aplicação (requisição ou
+    comando), para ver escritas de outros processos; as escritas deste
+    processo invalidam a tabela pelo listener de escrita.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._table = LevelTable([])
+        self._lock = threading.Lock()
+
+    def current(self):
+        with self._lock:
+            if self._version is not None and g.get('level_version_checked'):
+                return self._table
+        versions, _ = get_versions([Level.__tablename__])
+        with self._lock:
+            if versions[Level.__tablename__] != self._version:
+                self._table = LevelTable(Level.query.order_by(Level.order).all())
+                self._version = versions[Level.__tablename__]
+            g.level_version_checked = True
+            return self._table
+
+    def invalidate(self, written):
+        """Listener de escrita: descarta a tabela após um commit em level"""
+        if any(name == Level.__tablename__ for name, _ in written):
+            with self._lock:
+                self._version = None
+
+    def all(self):
+        """Níveis (dicionários) na ordem de Level.order"""
+        return self.current().levels
+
+    def first(self):
+        return self.current().first()
+
+    def for_score(self, average_score):
+        return self.current().for_score(average_score)
+
+    def after(self, order):
+        return self.current().after(order)
+
+level_thresholds = LevelThresholds()
+write_listeners.append(level_thresholds.invalidate)
+
+def _last_session_date(user_id):
+    """Data da última sessão do usuário (índice em (user_id, date))"""
+    return db.session.query(db.func.max(TrainingSession.date)).filter(
+        TrainingSession.user_id == user_id
+    ).scalar()
+
+def progress_values(totals, last_session_date, levels=None):
+    """Campos de UserProgress a partir dos totais (sessions, shots, hits,
+    score_sum, scored_sessions, scored_shots)
+
+    A média considera só as sessões com pontuação; sem nenhuma, o usuário
+    fica no primeiro nível. levels (LevelTable) evita conferir a versão dos
+    níveis a cada usuário.
+    """
+    sessions, shots, hits, score_sum, scored_sessions, scored_shots = totals
+    average_score = score_sum / scored_sessions if scored_sessions else 0
+    level = (levels or level_thresholds.current()).for_score(average_score if scored_sessions else None)
+    values = {
+        'total_sessions': sessions,
+        'total_shots': shots,
+        'total_hits': hits,
+        'scored_shots': scored_shots,
+        'average_score': average_score,
+        'last_session_date': last_session_date,
+        'updated_at': datetime.utcnow()
+    }
+    if level:
+        values['current_level_id'] = level['id']
+    return values
+
+def apply_progress(user_id, totals, newest=None):
+    """Grava o progresso do usuário na transação corrente (sem commit)
+
+    totals são os totais do usuário já com as sessões aplicadas. newest é
+    a data mais recente entre as sessões somadas; None quando sessões foram
+    removidas, caso em que a última data é relida pelo índice.
+    """
+    table = UserProgress.__table__
+    if newest is None:
+        last_session_date = _last_session_date(user_id)
+    else:
+        newest = db.literal(newest, table.c.last_session_date.type)
+        last_session_date = db.func.max(db.func.coalesce(table.c.last_session_date, newest), newest)
+    values = progress_values(totals, last_session_date)
+
+    updated = db.session.execute(
+        table.update().where(table.c.user_id == user_id).values(**values)
+    ).rowcount
+    if not updated and 'current_level_id' in values:
+        if newest is not None:
+            values['last_session_date'] = _last_session_date(user_id)
+        db.session.execute(table.insert().values(user_id=user_id, **values))
+    bump(UserProgress.__tablename__, user_id=user_id)
+
+def _total_columns(table):
+    """Agregados das sessões na ordem esperada por progress_values"""
+    return (
+        func.count(table.c.id),
+        func.coalesce(func.sum(table.c.shots_fired), 0),
+        func.coalesce(func.sum(table.c.hits), 0),
+        func.coalesce(func.sum(table.c.score), 0.0),
+        func.count(table.c.score),
+        func.coalesce(func.sum(db.case((table.c.hits.isnot(None), table.c.shots_fired), else_=0)), 0),
+    )
+
+def compute_progress(user_id):
+    """Recalcula os campos de progresso a partir das sessões do usuário"""
+    *totals, last_session_date = db.session.query(
+        *_total_columns(TrainingSession.__table__),
+        db.func.max(TrainingSession.date)
+    ).filter(TrainingSession.user_id == user_id).one()
+    return progress_values(tuple(totals), last_session_date)
+
+def _drift(expected, progress):
+    """Campos divergentes entre o progresso recalculado e o armazenado"""
+    diffs = {}
+    for name in FIELDS:
+        want = expected.get(name)
+        have = getattr(progress, name, None) if progress else None
+        if isinstance(want, float) or isinstance(have, float):
+            differs = abs((want or 0) - (have or 0)) > 1e-6
+        else:
+            differs = want != have
+        if differs:
+            diffs[name] = {
+                'stored': have.isoformat() if hasattr(have, 'isoformat') else have,
+                'expected': want.isoformat() if hasattr(want, 'isoformat') else want
+            }
+    return diffs
+
+def reconcile_progress(user_id):
+    """Recalcula o progresso do usuário e retorna (progresso, divergências)"""
+    values = compute_progress(user_id)
+    progress = UserProgress.query.filter_by(user_id=user_id).first()
+    drift = _drift(values, progress)
+    if progress is None:
+        if 'current_level_id' not in values:
+            return None, drift
+        progress = UserProgress(user_id=user_id)
+        db.session.add(progress)
+    for name, value in values.items():
+        setattr(progress, name, value)
+    db.session.commit()
+    return progress, drift
+
+def rebuild_progress():
+    """Reconcilia o progresso de todos os usuários com sessões ou progresso"""
+    user_ids = {user_id for user_id, in db.session.query(TrainingSession.user_id).distinct()}
+    user_ids |= {user_id for user_id, in db.session.query(UserProgress.user_id)}
+    drift = {}
+    for user_id in sorted(user_ids):
+        _, diffs = reconcile_progress(user_id)
+        if diffs:
+            drift[user_id] = diffs
+    return drift
+
+# Engine do processo trabalhador, criada uma vez por processo
+_worker_engine = None
+
+def _init_worker(database_uri):
+    global _worker_engine
+    _worker_engine = create_engine(database_uri)
+
+def _aggregate(execute, user_ids):
+    """Totais de um lote de usuários numa única consulta agrupada
+
+    Retorna [(user_id, totais de progress_values, última data)],
+    incluindo com totais zerados os usuários sem sessões.
+    """
+    table = TrainingSession.__table__
+    rows = {row[0]: row for row in execute(
+        select(
+            table.c.user_id,
+            *_total_columns(table),
+            func.max(table.c.date)
+        ).where(table.c.user_id.in_(user_ids)).group_by(table.c.user_id)
+    )}
+    return [
+        (user_id, tuple(rows[user_id][1:-1]), rows[user_id][-1]) if user_id in rows
+        else (user_id, (0, 0, 0, 0.0, 0, 0), None)
+        for user_id in user_ids
+    ]
+
+def _aggregate_in_worker(user_ids):
+    with _worker_engine.connect() as connection:
+        return _aggregate(connection.execute, user_ids)
+
+def _write_chunk(results):
+    """Grava o progresso de um lote com um UPDATE e um INSERT em lote (executemany)"""
+    table = UserProgress.__table__
+    levels = level_thresholds.current()
+    user_ids = [user_id for user_id, _, _ in results]
+    existing = {user_id for user_id, in db.session.execute(
+        select(table.c.user_id).where(table.c.user_id.in_(user_ids))
+    )}
+    updates, inserts = [], []
+    for user_id, totals, last_session_date in results:
+        values = progress_values(totals, last_session_date, levels)
+        if user_id in existing:
+            updates.append({'target_user_id': user_id, **values})
+        elif 'current_level_id' in values:
+            inserts.append({'user_id': user_id, **values})
+    if updates:
+        db.session.execute(
+            table.update().where(table.c.user_id == bindparam('target_user_id')),
+            updates
+        )
+    if inserts:
+        db.session.execute(table.insert(), inserts)
+
+def recompute_all_progress(workers=None, chunk_size=DEFAULT_CHUNK_SIZE, resume=False, report=None):
+    """Recalcula o progresso de todos os usuários em lotes, em paralelo
+
+    Os lotes de usuários são distribuídos por um pool de processos, cada um
+    com uma consulta agrupada por lote; as gravações ficam no processo atual,
+    já que o SQLite aceita um único escritor, e são confirmadas lote a lote
+    junto com o último usuário concluído. resume=True continua a última
+    execução interrompida. report(lotes, total de lotes, usuários, segundos)
+    é chamado após cada lote.
+    """
+    run = None
+    if resume:
+        run = ProgressRecomputeRun.query.filter(
+            ProgressRecomputeRun.finished_at.is_(None)
+        ).order_by(ProgressRecomputeRun.id.desc()).first()
+    if run is None:
+        run = ProgressRecomputeRun()
+        db.session.add(run)
+        db.session.commit()
+    resumed_from = run.last_user_id
+
+    user_ids = [user_id for user_id, in db.session.query(User.id).filter(
+        User.id > run.last_user_id
+    ).order_by(User.id)]
+    chunks = [user_ids[index:index + chunk_size] for index in range(0, len(user_ids), chunk_size)]
+
+    workers = workers or os.cpu_count() or 1
+    database_uri = db.engine.url.render_as_string(hide_password=False)
+    # Banco em memória não é visível a outros processos
+    parallel = workers > 1 and len(chunks) > 1 and db.engine.url.database not in (None, '', ':memory:')
+
+    started = time.monotonic()
+    users = 0
+    executor = None
+    try:
+        if parallel:
+            executor = ProcessPoolExecutor(
+                max_workers=min(workers, len(chunks)),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(database_uri,)
+            )
+            results = executor.map(_aggregate_in_worker, chunks)
+        else:
+            results = (_aggregate(db.session.execute, chunk) for chunk in chunks)
+
+        # map preserva a ordem dos lotes, então last_user_id é uma marca d'água válida
+        for done, chunk_results in enumerate(results, 1):
+            _write_chunk(chunk_results)
+            users += len(chunk_results)
+            run.last_user_id = chunk_results[-1][0]
+            run.users_done += len(chunk_results)
+            bump(UserProgress.__tablename__)
+            db.session.commit()
+            if report:
+                report(done, len(chunks), users, time.monotonic() - started)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    run.finished_at = datetime.utcnow()
+    db.session.commit()
+    seconds = time.monotonic() - started
+    return {
+        'run_id': run.id,
+        'resumed_from_user_id': resumed_from or None,
+        'users': users,
+        'chunks': len(chunks),
+        'workers': min(workers, len(chunks)) if parallel else 1,
+        'seconds': round(seconds, 3),
+        'users_per_second': round(users / seconds, 1) if seconds else None
+    }
+
+@click.command('rebuild-progress')
+def rebuild_progress_command():
+    """Recalcula o progresso dos usuários e mostra as divergências"""
+    drift = rebuild_progress()
+    if not drift:
+        click.echo('Progresso consistente.')
+        return
+    for user_id, fields in drift.items():
+        for name, diffs in fields.items():
+            click.echo(f"user {user_id}.{name}: armazenado={diffs['stored']} esperado={diffs['expected']}")
+    click.echo('Progresso reconstruído.')
+
+@click.command('recompute-progress')
+@click.option('--workers', type=int, default=None, help='Processos do pool (padrão: número de CPUs)')
+@click.option('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, show_default=True, help='Usuários por lote')
+@click.option('--resume', is_flag=True, help='Continuar a última execução interrompida')
+def recompute_progress_command(workers, chunk_size, resume):
+    """Recalcula o progresso de todos os usuários em paralelo"""
+    def report(done, total, users, seconds):
+        rate = users / seconds if seconds else 0
+        click.echo(f'lote {done}/{total}: {users} usuários em {seconds:.1f}s ({rate:.0f} usuários/s)')
+
+    result = recompute_all_progress(workers, chunk_size, resume, report)
+    if result['resumed_from_user_id']:
+        click.echo(f"Retomado após o usuário {result['resumed_from_user_id']}.")
+    click.echo(f"Progresso recalculado: {result['users']} usuários em {result['seconds']}s.")
@@ -0,0 +1,189 @@
+from src.models.user import db, User
+from src.models.versions import bump
+from src.models.training_import import iter_csv
+from src.utils.password_hashing import password_hasher
+from src.utils.validation import validate_email, validate_password
+from sqlalchemy import select, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+import secrets
+import json
+import click
+
+# Usuários inseridos por lote
+DEFAULT_CHUNK_SIZE = 200
+
+# Limite de membros por requisição
+MAX_MEMBERS = 2000
+
+# Limite do corpo da requisição de cadastro em lote (até 1 KB por membro)
+MAX_REQUEST_BYTES = MAX_MEMBERS * 1024
+
+OPTIONAL_FIELDS = ('phone', 'registration_number', 'club', 'category')
+
+def _text(record, field):
+    value = record.get(field)
+    return str(value).strip() if value is not None else ''
+
+def parse_member(record):
+    """Valida um membro e retorna (valores do INSERT sem hash, senha, código de convite)"""
+    username = _text(record, 'username')
+    email = _text(record, 'email').lower()
+    full_name = _text(record, 'full_name')
+    for field, value in (('username', username), ('email', email), ('full_name', full_name)):
+        if not value:
+            raise ValueError(f'Campo {field} é obrigatório')
+    if len(username) < 3:
+        raise ValueError('Nome de usuário deve ter pelo menos 3 caracteres')
+    if not validate_email(email):
+        raise ValueError('Email inválido')
+
+    password = record.get('password')
+    invite_code = None
+    if password:
+        is_valid, message = validate_password(str(password))
+        if not is_valid:
+            raise ValueError(message)
+    else:
+        # Senha provisória entregue como código de convite
+        invite_code = secrets.token_urlsafe(9) + str(secrets.randbelow(10))
+        password = invite_code
+
+    values = {'username': username, 'email': email, 'full_name': full_name}
+    for field in OPTIONAL_FIELDS:
+        values[field] = _text(record, field) or None
+    return values, str(password), invite_code
+
+def _existing(usernames, emails):
+    """Usernames e emails já cadastrados, numa única consulta"""
+    taken_usernames, taken_emails = set(), set()
+    if not usernames and not emails:
+        return taken_usernames, taken_emails
+    for username, email in db.session.execute(
+        select(User.username, User.email).where(User.username.in_(usernames) | User.email.in_(emails))
+    ):
+        taken_usernames.add(username)
+        taken_emails.add(email)
+    return taken_usernames, taken_emails
+
+def _insert_chunk(rows):
+    """Insere um lote e retorna os ids na ordem das linhas (None nas recusadas)
+
+    Se outro cadastro gravou o mesmo usuário ou email depois da verificação,
+    o lote inteiro falha; ele é então refeito linha a linha, ignorando só as
+    linhas em conflito. Os lotes anteriores já confirmados são mantidos.
+    """
+    table = User.__table__
+    try:
+        ids = db.session.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+    except IntegrityError:
+        db.session.rollback()
+        ids = [
+            db.session.execute(
+                sqlite_insert(table).values(**row).on_conflict_do_nothing().returning(table.c.id)
+            ).scalar_one_or_none()
+            for row in rows
+        ]
+    bump(User.__tablename__)
+    db.session.commit()
+    return ids
+
+def provision_members(records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Cadastra membros em lote e retorna o resultado de cada linha
+
+    records são pares (número da linha, registro). Usuários e emails
+    repetidos (no banco ou no próprio lote) são recusados por linha; as
+    senhas passam pelo executor de hashing (PASSWORD_HASH_WORKERS) e as
+    inserções são feitas em lotes de chunk_size. Cada membro criado recebe um token e, se veio sem senha,
+    um código de convite (a senha provisória).
+    """
+    results = []
+    accepted = []
+    for line_number, record in records:
+        if isinstance(record, Exception):
+            results.append({'line': line_number, 'status': 'error', 'error': str(record)})
+            continue
+        try:
+            values, password, invite_code = parse_member(record)
+        except ValueError as e:
+            results.append({'line': line_number, 'username': record.get('username'), 'status': 'error', 'error': str(e)})
+            continue
+        accepted.append((line_number, values, password, invite_code))
+
+    taken_usernames, taken_emails = _existing(
+        {values['username'] for _, values, _, _ in accepted},
+        {values['email'] for _, values, _, _ in accepted}
+    )
+    members = []
+    for line_number, values, password, invite_code in accepted:
+        if values['username'] in taken_usernames:
+            error = 'Nome de usuário já existe'
+        elif values['email'] in taken_emails:
+            error = 'Email já cadastrado'
+        else:
+            taken_usernames.add(values['username'])
+            taken_emails.add(values['email'])
+            members.append((line_number, values, password, invite_code))
+            continue
+        results.append({'line': line_number, 'username': values['username'], 'status': 'error', 'error': error})
+
+    hashes = password_hasher.hash_many([password for _, _, password, _ in members])
+
+    now = datetime.utcnow()
+    for start in range(0, len(members), chunk_size):
+        chunk = members[start:start + chunk_size]
+        rows = [{
+            **values, 'password_hash': password_hash, 'is_active': True, 'is_admin': False,
+            'token_epoch': 0, 'created_at': now
+        } for (_, values, _, _), password_hash in zip(chunk, hashes[start:start + chunk_size])]
+        for (line_number, values, _, invite_code), user_id in zip(chunk, _insert_chunk(rows)):
+            if user_id is None:
+                results.append({
+                    'line': line_number, 'username': values['username'], 'status': 'error',
+                    'error': 'Nome de usuário ou email já cadastrado'
+                })
+                continue
+            user = User(id=user_id, username=values['username'], token_epoch=0)
+            results.append({
+                'line': line_number,
+                'username': values['username'],
+                'status': 'created',
+                'user_id': user_id,
+                'token': user.generate_token(),
+                'invite_code': invite_code
+            })
+
+    results.sort(key=lambda result: result['line'])
+    created = sum(1 for result in results if result['status'] == 'created')
+    return {'created': created, 'failed': len(results) - created, 'results': results}
+
+def iter_json_members(data):
+    """(número, registro) de uma lista JSON de membros (ou {"members": [...]})"""
+    if isinstance(data, dict):
+        data = data.get('members')
+    if not isinstance(data, list):
+        raise ValueError('Envie uma lista de membros')
+    for number, record in enumerate(data, start=1):
+        yield number, record if isinstance(record, dict) else ValueError('Cada membro deve ser um objeto JSON')
+
+@click.command('provision-members')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, show_default=True, help='Usuários por lote')
+def provision_members_command(path, chunk_size):
+    """Cadastra membros de um arquivo CSV ou JSON"""
+    with open(path, 'rb') as stream:
+        if path.lower().endswith('.json'):
+            records = list(iter_json_members(json.load(stream)))
+        else:
+            records = list(iter_csv(stream))
+    result = provision_members(records, chunk_size)
+    for row in result['results']:
+        if row['status'] == 'created':
+            invite = f" convite={row['invite_code']}" if row['invite_code'] else ''
+            click.echo(f"linha {row['line']}: {row['username']} criado (id {row['user_id']}){invite}")
+        else:
+            click.echo(f"linha {row['line']}: {row.get('username') or '-'} erro: {row['error']}")
+    click.echo(f"{result['created']} membros criados, {result['failed']} com erro.")
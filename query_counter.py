@@ -0,0 +1,23 @@
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUERY_COUNT_HEADER = 'X-Query-Count'
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+def get_query_count():
+    """Número de consultas SQL executadas na requisição atual"""
+    return g.get('query_count', 0) if has_request_context() else 0
+
+def init_query_counter(app):
+    """Conta as consultas de cada requisição e expõe o total no header X-Query-Count"""
+    if not event.contains(Engine, 'before_cursor_execute', _count_query):
+        event.listen(Engine, 'before_cursor_execute', _count_query)
+
+    @app.after_request
+    def add_query_count_header(response):
+        response.headers[QUERY_COUNT_HEADER] = str(get_query_count())
+        return response
@@ -0,0 +1,197 @@
+from flask import current_app, g, request, jsonify
+from collections import OrderedDict
+from functools import wraps
+import math
+import sqlite3
+import threading
+import time
+
+def _decide(states):
+    """(permitido, espera) para buckets (chave, fichas, capacidade, recarga) já recarregados"""
+    denied = [(1 - tokens) / rate for _, tokens, _, rate in states if tokens < 1]
+    return not denied, max(denied, default=0)
+
+class MemoryBuckets:
+    """Token buckets em memória, limitados a maxsize chaves
+
+    Cada chave guarda só as fichas, o instante da última leitura e a regra;
+    a recarga é calculada na consulta, em O(1). Buckets que ficaram cheios de novo são
+    equivalentes a não existir e saem primeiro; acima de maxsize, o menos
+    usado recentemente é descartado.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # chave -> (fichas, instante, capacidade, recarga por segundo)
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, per_seconds, now=None):
+        """Consome uma ficha; retorna (permitido, segundos até a próxima ficha)"""
+        return self.consume_all([(key, capacity, per_seconds)], now)
+
+    def consume_all(self, limits, now=None):
+        """Consome uma ficha de cada bucket, só se todos tiverem ficha
+
+        limits são triplas (chave, capacidade, segundos); retorna (permitido,
+        segundos até a próxima ficha do bucket que recusou).
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            states = []
+            for key, capacity, per_seconds in limits:
+                rate = capacity / per_seconds
+                tokens, updated, _, _ = self._buckets.pop(key, (capacity, now, capacity, rate))
+                states.append((key, min(capacity, tokens + (now - updated) * rate), capacity, rate))
+            allowed, retry_after = _decide(states)
+            for key, tokens, capacity, rate in states:
+                self._buckets[key] = (tokens - 1 if allowed else tokens, now, capacity, rate)
+            self._expire(now)
+            return allowed, retry_after
+
+    def _expire(self, now):
+        # Remove do início (menos recentes) os buckets já recarregados
+        while self._buckets:
+            key, (tokens, updated, capacity, rate) = next(iter(self._buckets.items()))
+            if len(self._buckets) <= self.maxsize and tokens + (now - updated) * rate < capacity:
+                break
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+class SQLiteBuckets:
+    """Token buckets num arquivo SQLite compartilhado pelos workers do host
+
+    Cada consumo é uma transação IMMEDIATE curta (leitura e escrita da
+    chave); linhas paradas por mais de max_idle segundos são removidas
+    periodicamente. Usa um arquivo próprio, fora do banco da aplicação.
+    """
+
+    def __init__(self, path, max_idle=3600, prune_every=1000):
+        self.path = path
+        self.max_idle = max_idle
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._calls = 0
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit_bucket '
+                '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def consume(self, key, capacity, per_seconds, now=None):
+        return self.consume_all([(key, capacity, per_seconds)], now)
+
+    def consume_all(self, limits, now=None):
+        # Relógio de parede: o instante é comparado entre processos
+        now = time.time() if now is None else now
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            states = []
+            for key, capacity, per_seconds in limits:
+                rate = capacity / per_seconds
+                row = connection.execute(
+                    'SELECT tokens, updated FROM rate_limit_bucket WHERE key = ?', (key,)
+                ).fetchone()
+                tokens, updated = row if row else (capacity, now)
+                states.append((key, min(capacity, tokens + max(0, now - updated) * rate), capacity, rate))
+            allowed, retry_after = _decide(states)
+            # Recusada, nada é gravado: a recarga é recalculada a partir da linha antiga
+            if allowed:
+                connection.executemany(
+                    'INSERT INTO rate_limit_bucket (key, tokens, updated) VALUES (?, ?, ?) '
+                    'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                    [(key, tokens - 1, now) for key, tokens, _, _ in states]
+                )
+            self._calls += 1
+            if self._calls % self.prune_every == 0:
+                connection.execute('DELETE FROM rate_limit_bucket WHERE updated < ?', (now - self.max_idle,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+# Regras padrão: (fichas, em segundos) por IP e por nome de usuário
+DEFAULT_RULES = {
+    'ip': (20, 60),
+    'username': (5, 60),
+}
+
+buckets = MemoryBuckets()
+
+def _client_ip():
+    """IP do cliente segundo os RATE_LIMIT_PROXY_HOPS proxies confiáveis
+
+    Cada proxy acrescenta ao fim do X-Forwarded-For o endereço de quem o
+    chamou; as entradas anteriores vêm do cliente e podem ser forjadas.
+    """
+    hops = current_app.config.get('RATE_LIMIT_PROXY_HOPS', 0)
+    if hops > 0:
+        forwarded = request.headers.getlist('X-Forwarded-For')
+        route = [address.strip() for value in forwarded for address in value.split(',') if address.strip()]
+        if len(route) >= hops:
+            return route[-hops]
+    return request.remote_addr
+
+def _username():
+    """Usuário autenticado ou o username/email enviado no corpo"""
+    current_user = g.get('current_user')
+    if current_user is not None:
+        return str(current_user.id)
+    data = request.get_json(silent=True) or {}
+    username = data.get('username') or data.get('email')
+    return username.strip().lower() if isinstance(username, str) and username.strip() else None
+
+def too_many_requests(retry_after):
+    """429 com Retry-After em segundos inteiros"""
+    response = jsonify({'message': 'Muitas tentativas, tente novamente mais tarde'})
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response, 429
+
+def rate_limited(name):
+    """Limita a rota por IP e por nome de usuário com token buckets
+
+    Em rotas autenticadas, deve ficar abaixo de @token_required (o limite por
+    usuário passa a usar o id do usuário autenticado).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if current_app.config.get('RATE_LIMIT_ENABLED', True):
+                rules = {**DEFAULT_RULES, **current_app.config.get('RATE_LIMIT_RULES', {})}
+                limits = []
+                for scope, value in (('ip', _client_ip()), ('username', _username())):
+                    if value is not None:
+                        capacity, per_seconds = rules[scope]
+                        limits.append((f'{name}:{scope}:{value}', capacity, per_seconds))
+                # Nenhum bucket é cobrado se algum deles recusar a requisição
+                allowed, retry_after = buckets.consume_all(limits)
+                if not allowed:
+                    return too_many_requests(retry_after)
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
+
+def init_rate_limit(app):
+    """Escolhe o backend dos buckets
+
+    RATE_LIMIT_BACKEND='memory' (padrão, por processo) ou 'sqlite', que
+    compartilha os limites entre os workers do host no arquivo
+    RATE_LIMIT_SQLITE_PATH. RATE_LIMIT_RULES sobrescreve as regras padrão e
+    RATE_LIMIT_PROXY_HOPS indica quantos proxies confiáveis ficam à frente.
+    """
+    global buckets
+    if app.config.get('RATE_LIMIT_BACKEND', 'memory') == 'sqlite':
+        buckets = SQLiteBuckets(app.config['RATE_LIMIT_SQLITE_PATH'])
+    else:
+        buckets = MemoryBuckets(app.config.get('RATE_LIMIT_MAX_KEYS', 10000))
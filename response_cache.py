@@ -0,0 +1,157 @@
+from flask import g, request, Response
+from collections import OrderedDict
+from functools import wraps
+import threading
+import time
+from src.models.versions import write_listeners
+
+class ResponseCache:
+    """Cache LRU com TTL para respostas de endpoints agregados
+
+    Cada entrada registra as tabelas lidas e o usuário; escritas nessas
+    tabelas invalidam apenas as entradas afetadas. Misses concorrentes para
+    a mesma chave calculam o valor uma única vez.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # chave -> (expira_em, tabelas, user_id, valor)
+        self._by_table = {}  # tabela -> {chave: user_id}
+        self._generations = {}  # tabela -> contador de invalidações
+        self._inflight = {}  # chave -> threading.Event
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _remove(self, key):
+        _, tables, _, _ = self._entries.pop(key)
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.pop(key, None)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[3]
+
+    def get_or_compute(self, key, tables, user_id, compute):
+        """Retorna o valor em cache ou calcula (uma vez por chave) e armazena
+
+        compute() retorna (valor, armazenar); armazenar=False não guarda o valor.
+        """
+        while True:
+            with self._lock:
+                value = self._get(key)
+                if value is not None:
+                    self.hits += 1
+                    return value
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    self.misses += 1
+                    waiter = self._inflight[key] = threading.Event()
+                    generations = tuple(self._generations.get(table, 0) for table in tables)
+                    break
+            # Outra requisição já está calculando: aguarda e tenta de novo
+            waiter.wait()
+
+        try:
+            value, store = compute()
+            with self._lock:
+                # Não armazena se houve escrita nas tabelas durante o cálculo
+                current = tuple(self._generations.get(table, 0) for table in tables)
+                if store and current == generations:
+                    if key in self._entries:
+                        self._remove(key)
+                    self._entries[key] = (time.monotonic() + self.ttl, tables, user_id, value)
+                    for table in tables:
+                        self._by_table.setdefault(table, {})[key] = user_id
+                    while len(self._entries) > self.maxsize:
+                        self._remove(next(iter(self._entries)))
+                        self.evictions += 1
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            waiter.set()
+
+    def invalidate(self, written):
+        """Remove entradas que leram as tabelas escritas
+
+        written contém pares (tabela, user_id); user_id None afeta todos os
+        usuários, senão apenas as entradas desse usuário e as globais.
+        """
+        with self._lock:
+            for table, user_id in written:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                keys = self._by_table.get(table)
+                if not keys:
+                    continue
+                stale = [
+                    key for key, owner in keys.items()
+                    if user_id is None or owner is None or owner == user_id
+                ]
+                for key in stale:
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+response_cache = ResponseCache()
+write_listeners.append(response_cache.invalidate)
+
+def cached(*tables, per_user=False):
+    """Guarda em cache a resposta 200 da view, por endpoint, argumentos e usuário
+
+    Em rotas autenticadas, deve ficar abaixo de @token_required.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            user_id = g.current_user.id if per_user else None
+            key = (request.endpoint, tuple(sorted(kwargs.items())),
+                   tuple(sorted(request.args.items(multi=True))), user_id)
+
+            def compute():
+                response = f(*args, **kwargs)
+                if isinstance(response, tuple) or response.status_code != 200:
+                    return response, False
+                return (response.get_data(), response.mimetype), True
+
+            value = response_cache.get_or_compute(key, tables, user_id, compute)
+            if isinstance(value, tuple) and len(value) == 2 and isinstance(value[0], bytes):
+                return Response(value[0], mimetype=value[1])
+            return value
+        return decorated
+    return decorator
+
+def init_response_cache(app):
+    """Aplica o tamanho e o TTL configurados (RESPONSE_CACHE_SIZE/RESPONSE_CACHE_TTL)"""
+    response_cache.maxsize = app.config.get('RESPONSE_CACHE_SIZE', response_cache.maxsize)
+    response_cache.ttl = app.config.get('RESPONSE_CACHE_TTL', response_cache.ttl)
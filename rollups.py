@@ -0,0 +1,259 @@
+from src.models.user import db
+from src.models.shooting import TrainingSession, CompetitionScore
+from sqlalchemy.dialects.sqlite import insert
+from datetime import date, datetime, timedelta
+import click
+
+BUCKETS = ('day', 'week', 'month')
+
+# Orçamento de pontos por série: nenhuma série passa de MAX_POINTS pontos.
+# Um intervalo que não cabe no bucket pedido (ou no dia, sem bucket) passa
+# ao próximo bucket mais grosso (day, week, month); acima de MAX_POINTS
+# meses, só os meses mais recentes entram. O bucket e o início efetivos
+# voltam na resposta.
+MAX_POINTS = 370
+
+class TrainingRollup(db.Model):
+    """Totais de sessões de treinamento de cada usuário por dia, semana e mês"""
+    __tablename__ = 'user_training_rollup'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    bucket = db.Column(db.String(5), primary_key=True)  # day, week ou month
+    bucket_start = db.Column(db.Date, primary_key=True)
+    sessions = db.Column(db.Integer, nullable=False, default=0)
+    shots = db.Column(db.Integer, nullable=False, default=0)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    scored_sessions = db.Column(db.Integer, nullable=False, default=0)  # Sessões com pontuação
+    scored_shots = db.Column(db.Integer, nullable=False, default=0)  # Disparos das sessões com acertos
+
+class CompetitionScoreRollup(db.Model):
+    """Totais de pontuações de cada usuário por competição por dia, semana e mês"""
+    __tablename__ = 'user_competition_score_rollup'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    competition_id = db.Column(db.Integer, db.ForeignKey('competition.id'), primary_key=True)
+    bucket = db.Column(db.String(5), primary_key=True)
+    bucket_start = db.Column(db.Date, primary_key=True)
+    scores = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+TRAINING_FIELDS = ('sessions', 'shots', 'hits', 'score_sum', 'scored_sessions', 'scored_shots')
+COMPETITION_FIELDS = ('scores', 'score_sum')
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+def bucket_start(bucket, day):
+    """Início do bucket que contém o dia (semanas começam na segunda-feira)"""
+    day = _as_date(day)
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+def next_bucket(bucket, start):
+    """Início do bucket seguinte"""
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    if bucket == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+def iter_buckets(bucket, start, end):
+    """Itera os inícios de bucket entre start e end (inclusive)"""
+    current = bucket_start(bucket, start)
+    while current <= end:
+        yield current
+        current = next_bucket(bucket, current)
+
+def count_buckets(bucket, start, end):
+    """Quantidade de pontos de uma série, sem iterar"""
+    first, last = bucket_start(bucket, start), bucket_start(bucket, end)
+    if last < first:
+        return 0
+    if bucket == 'week':
+        return (last - first).days // 7 + 1
+    if bucket == 'month':
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    return (last - first).days + 1
+
+def choose_bucket(start, end, max_points=MAX_POINTS, finest='day'):
+    """Bucket mais fino, a partir de finest, cuja série cabe em max_points
+
+    Se nenhum couber, o mais grosso.
+    """
+    for bucket in BUCKETS[BUCKETS.index(finest):]:
+        if count_buckets(bucket, start, end) <= max_points:
+            return bucket
+    return BUCKETS[-1]
+
+def _months_before(day, months):
+    """Primeiro dia do mês months meses antes do mês de day"""
+    index = day.year * 12 + day.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+def _upsert(model, fields, key, deltas):
+    table = model.__table__
+    stmt = insert(table).values(**key, **deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={name: table.c[name] + stmt.excluded[name] for name in fields}
+    )
+    db.session.execute(stmt)
+
+def apply_training_rollups(values_list, sign=1):
+    """Soma (ou subtrai) sessões nos buckets de dia, semana e mês"""
+    totals = {}
+    for values in values_list:
+        for bucket in BUCKETS:
+            key = (values['user_id'], bucket, bucket_start(bucket, values['date']))
+            row = totals.setdefault(key, dict.fromkeys(TRAINING_FIELDS, 0))
+            row['sessions'] += sign
+            row['shots'] += sign * values['shots']
+            if values['hits'] is not None:
+                row['hits'] += sign * values['hits']
+                row['scored_shots'] += sign * values['shots']
+            if values['score'] is not None:
+                row['score_sum'] += sign * values['score']
+                row['scored_sessions'] += sign
+    for (user_id, bucket, start), deltas in totals.items():
+        _upsert(TrainingRollup, TRAINING_FIELDS, {'user_id': user_id, 'bucket': bucket, 'bucket_start': start}, deltas)
+
+def apply_competition_score_rollups(user_id, competition_id, score, score_date, sign=1):
+    """Soma (ou subtrai) uma pontuação nos buckets da competição"""
+    for bucket in BUCKETS:
+        _upsert(
+            CompetitionScoreRollup, COMPETITION_FIELDS,
+            {'user_id': user_id, 'competition_id': competition_id, 'bucket': bucket,
+             'bucket_start': bucket_start(bucket, score_date)},
+            {'scores': sign, 'score_sum': sign * score}
+        )
+
+def rebuild_rollups():
+    """Reconstrói as tabelas de rollup a partir das tabelas de origem"""
+    TrainingRollup.query.delete()
+    CompetitionScoreRollup.query.delete()
+
+    # Totais diários calculados no banco; semanas e meses derivam deles
+    days = db.session.query(
+        TrainingSession.user_id,
+        TrainingSession.date,
+        db.func.count(TrainingSession.id),
+        db.func.coalesce(db.func.sum(TrainingSession.shots_fired), 0),
+        db.func.coalesce(db.func.sum(TrainingSession.hits), 0),
+        db.func.coalesce(db.func.sum(TrainingSession.score), 0.0),
+        db.func.count(TrainingSession.score),
+        db.func.coalesce(db.func.sum(
+            db.case((TrainingSession.hits.isnot(None), TrainingSession.shots_fired), else_=0)
+        ), 0)
+    ).group_by(TrainingSession.user_id, TrainingSession.date).all()
+    totals = {}
+    for user_id, session_date, *values in days:
+        for bucket in BUCKETS:
+            key = (user_id, bucket, bucket_start(bucket, session_date))
+            row = totals.setdefault(key, dict.fromkeys(TRAINING_FIELDS, 0))
+            for name, value in zip(TRAINING_FIELDS, values):
+                row[name] += value
+    db.session.add_all(
+        TrainingRollup(user_id=user_id, bucket=bucket, bucket_start=start, **values)
+        for (user_id, bucket, start), values in totals.items()
+    )
+
+    days = db.session.query(
+        CompetitionScore.user_id,
+        CompetitionScore.competition_id,
+        CompetitionScore.date,
+        db.func.count(CompetitionScore.id),
+        db.func.coalesce(db.func.sum(CompetitionScore.score), 0.0)
+    ).group_by(CompetitionScore.user_id, CompetitionScore.competition_id, CompetitionScore.date).all()
+    totals = {}
+    for user_id, competition_id, score_date, *values in days:
+        for bucket in BUCKETS:
+            key = (user_id, competition_id, bucket, bucket_start(bucket, score_date))
+            row = totals.setdefault(key, dict.fromkeys(COMPETITION_FIELDS, 0))
+            for name, value in zip(COMPETITION_FIELDS, values):
+                row[name] += value
+    db.session.add_all(
+        CompetitionScoreRollup(
+            user_id=user_id, competition_id=competition_id, bucket=bucket, bucket_start=start, **values
+        )
+        for (user_id, competition_id, bucket, start), values in totals.items()
+    )
+    db.session.commit()
+
+def ensure_rollups():
+    """Popula os rollups na primeira execução sobre um banco existente"""
+    if TrainingRollup.query.first() is None and TrainingSession.query.first() is not None:
+        rebuild_rollups()
+    elif CompetitionScoreRollup.query.first() is None and CompetitionScore.query.first() is not None:
+        rebuild_rollups()
+
+def _series(rows, bucket, start, end, empty, point):
+    by_start = {row.bucket_start: row for row in rows}
+    series = []
+    for current in iter_buckets(bucket, start, end):
+        row = by_start.get(current)
+        series.append(point(current, row) if row else dict(empty, date=current.isoformat()))
+    return series
+
+def training_series(user_id, bucket, start, end):
+    """Série de treinos do usuário por bucket, um ponto por bucket (inclusive vazios)"""
+    rows = TrainingRollup.query.filter(
+        TrainingRollup.user_id == user_id,
+        TrainingRollup.bucket == bucket,
+        TrainingRollup.bucket_start >= bucket_start(bucket, start),
+        TrainingRollup.bucket_start <= end
+    ).all()
+    return _series(rows, bucket, start, end, {
+        'sessions': 0, 'shots': 0, 'hits': 0, 'accuracy': None, 'avg_score': None
+    }, lambda current, row: {
+        'date': current.isoformat(),
+        'sessions': row.sessions,
+        'shots': row.shots,
+        'hits': row.hits,
+        'accuracy': round(row.hits / row.scored_shots * 100, 2) if row.scored_shots > 0 else None,
+        'avg_score': round(row.score_sum / row.scored_sessions, 2) if row.scored_sessions > 0 else None
+    })
+
+def competition_series(user_id, competition_id, bucket, start, end):
+    """Série de pontuações do usuário em uma competição por bucket"""
+    rows = CompetitionScoreRollup.query.filter(
+        CompetitionScoreRollup.user_id == user_id,
+        CompetitionScoreRollup.competition_id == competition_id,
+        CompetitionScoreRollup.bucket == bucket,
+        CompetitionScoreRollup.bucket_start >= bucket_start(bucket, start),
+        CompetitionScoreRollup.bucket_start <= end
+    ).all()
+    return _series(rows, bucket, start, end, {
+        'scores': 0, 'avg_score': None
+    }, lambda current, row: {
+        'date': current.isoformat(),
+        'scores': row.scores,
+        'avg_score': round(row.score_sum / row.scores, 2) if row.scores > 0 else None
+    })
+
+def parse_range(args, default_days=90):
+    """Lê ?from=&to=&bucket= e retorna (bucket, início, fim) efetivos
+
+    O bucket pedido (day sem o parâmetro) é o mais fino aceito; a série
+    respeita o orçamento de MAX_POINTS pontos.
+    """
+    end = date.fromisoformat(args['to']) if args.get('to') else datetime.utcnow().date()
+    start = date.fromisoformat(args['from']) if args.get('from') else end - timedelta(days=default_days)
+    if start > end:
+        raise ValueError('Parâmetro from deve ser anterior a to')
+    bucket = args.get('bucket') or BUCKETS[0]
+    if bucket not in BUCKETS:
+        raise ValueError('Bucket deve ser day, week ou month')
+    bucket = choose_bucket(start, end, finest=bucket)
+    if count_buckets(bucket, start, end) > MAX_POINTS:
+        start = _months_before(end, MAX_POINTS - 1)
+    return bucket, start, end
+
+@click.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recalcula as tabelas de rollup diário, semanal e mensal"""
+    rebuild_rollups()
+    click.echo('Rollups reconstruídos.')
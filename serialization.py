@@ -0,0 +1,15 @@
+from sqlalchemy.orm import joinedload
+from src.models.shooting import TrainingSession, CompetitionScore, UserProgress
+
+# Relacionamentos acessados por to_dict() de cada modelo. As rotas de listagem
+# carregam tudo numa única consulta (JOIN) em vez de um SELECT extra por linha.
+TO_DICT_RELATIONSHIPS = {
+    TrainingSession: ('weapon',),
+    CompetitionScore: ('competition',),
+    UserProgress: ('current_level',),
+}
+
+def eager(query, model):
+    """Aplica à consulta o carregamento antecipado exigido por model.to_dict()"""
+    names = TO_DICT_RELATIONSHIPS.get(model, ())
+    return query.options(*[joinedload(getattr(model, name)) for name in names])
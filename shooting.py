@@ -3,6 +3,11 @@ from datetime import datetime
 
 class Weapon(db.Model):
     """Modelo para armas do acervo"""
+    __table_args__ = (
+        db.Index('ix_weapon_caliber', 'caliber'),
+        db.Index('ix_weapon_owner', 'owner'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)  # Nome/modelo da arma
     caliber = db.Column(db.String(20), nullable=False)  # Calibre (.22LR, 9mm, .38SPL, etc.)
@@ -51,6 +56,11 @@ class Competition(db.Model):
 
 class CompetitionScore(db.Model):
     """Modelo para pontuações em competições"""
+    __table_args__ = (
+        # Filtro por usuário e competição ordenado por data; score/stage cobrem ranking e evolução
+        db.Index('ix_competition_score_user_competition_date', 'user_id', 'competition_id', 'date', 'score', 'stage'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     competition_id = db.Column(db.Integer, db.ForeignKey('competition.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -78,6 +88,11 @@ class CompetitionScore(db.Model):
 
 class Level(db.Model):
     """Modelo para níveis de progressão"""
+    __table_args__ = (
+        db.Index('ix_level_order', 'order'),
+        db.Index('ix_level_min_score', 'min_score'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False, unique=True)
     message = db.Column(db.String(200), nullable=False)  # Mensagem motivacional
@@ -103,12 +118,20 @@ class Level(db.Model):
 
 class TrainingSession(db.Model):
     """Modelo para sessões de treinamento"""
+    __table_args__ = (
+        # Listagens do usuário ordenadas por (date, id), com ou sem filtro por arma
+        db.Index('ix_training_session_user_date_id', 'user_id', 'date', 'id'),
+        db.Index('ix_training_session_user_weapon_date_id', 'user_id', 'weapon_id', 'date', 'id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     weapon_id = db.Column(db.Integer, db.ForeignKey('weapon.id'), nullable=False)
     shots_fired = db.Column(db.Integer, nullable=False)  # Número de disparos
-    hits = db.Column(db.Integer, nullable=False)  # Número de acertos
-    score = db.Column(db.Float, nullable=False)  # Pontuação obtida
+    # Acertos e pontuação ficam nulos em sessões importadas sem esses dados,
+    # que não entram na precisão nem na média de pontuação
+    hits = db.Column(db.Integer)  # Número de acertos
+    score = db.Column(db.Float)  # Pontuação obtida
     notes = db.Column(db.Text)  # Observações
     duration_minutes = db.Column(db.Integer)  # Duração em minutos
     date = db.Column(db.Date, nullable=False)
@@ -116,7 +139,9 @@ class TrainingSession(db.Model):
     
     @property
     def accuracy(self):
-        """Calcula a precisão da sessão"""
+        """Calcula a precisão da sessão (None sem acertos registrados)"""
+        if self.hits is None:
+            return None
         if self.shots_fired == 0:
             return 0
         return (self.hits / self.shots_fired) * 100
@@ -142,22 +167,27 @@ class TrainingSession(db.Model):
 
 class UserProgress(db.Model):
     """Modelo para progresso do usuário"""
+    __table_args__ = (
+        db.Index('ix_user_progress_user_id', 'user_id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     current_level_id = db.Column(db.Integer, db.ForeignKey('level.id'), nullable=False)
     total_sessions = db.Column(db.Integer, default=0)
     total_shots = db.Column(db.Integer, default=0)
     total_hits = db.Column(db.Integer, default=0)
+    scored_shots = db.Column(db.Integer, default=0)  # Disparos das sessões com acertos registrados
     average_score = db.Column(db.Float, default=0.0)
     last_session_date = db.Column(db.Date)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     @property
     def accuracy(self):
-        """Calcula a precisão geral"""
-        if self.total_shots == 0:
+        """Calcula a precisão geral sobre as sessões com acertos registrados"""
+        if not self.scored_shots:
             return 0
-        return (self.total_hits / self.total_shots) * 100
+        return (self.total_hits / self.scored_shots) * 100
     
     def __repr__(self):
         return f'<UserProgress User:{self.user_id} Level:{self.current_level.name}>'
@@ -0,0 +1,123 @@
+from flask import Response, request, send_file
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele, só os .br gerados no build são usados
+    brotli = None
+
+# Arquivos do Vite com hash no nome (ex.: assets/index-4f3a9c1b.js) nunca mudam
+HASHED_ASSET = re.compile(r'(^|/)assets/.+[-.][A-Za-z0-9_-]{8,}\.\w+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+# Tipos que valem a pena comprimir
+COMPRESSIBLE = re.compile(r'^(text/|application/(javascript|json|xml|manifest\+json)|image/svg\+xml)')
+MIN_COMPRESS_SIZE = 1024
+
+# Arquivos até este tamanho ficam em memória; os maiores são lidos do disco
+MAX_MEMORY_SIZE = 1024 * 1024
+
+# Preferência do servidor entre as codificações aceitas
+ENCODINGS = ('br', 'gzip')
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+class StaticAsset:
+    """Arquivo do frontend com as variantes comprimidas já prontas"""
+    __slots__ = ('path', 'mimetype', 'etag', 'cache_control', 'variants')
+
+    def __init__(self, path, mimetype, etag, cache_control, variants):
+        self.path = path
+        self.mimetype = mimetype
+        self.etag = etag
+        self.cache_control = cache_control
+        self.variants = variants  # codificação -> bytes (memória) ou caminho no disco
+
+def _compress(encoding, data):
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(data)
+    return None
+
+def _load(path, relative):
+    mimetype = mimetypes.guess_type(relative)[0] or 'application/octet-stream'
+    size = os.path.getsize(path)
+    in_memory = size <= MAX_MEMORY_SIZE
+    digest = hashlib.sha1()
+    with open(path, 'rb') as stream:
+        data = stream.read() if in_memory else None
+        if data is not None:
+            digest.update(data)
+        else:
+            for block in iter(lambda: stream.read(1024 * 1024), b''):
+                digest.update(block)
+
+    variants = {'identity': data if in_memory else path}
+    for encoding in ENCODINGS:
+        precompressed = path + SUFFIXES[encoding]
+        if os.path.isfile(precompressed):
+            variants[encoding] = precompressed
+        elif in_memory and size >= MIN_COMPRESS_SIZE and COMPRESSIBLE.match(mimetype):
+            compressed = _compress(encoding, data)
+            if compressed is not None and len(compressed) < size:
+                variants[encoding] = compressed
+
+    cache_control = IMMUTABLE if HASHED_ASSET.search(relative) else REVALIDATE
+    return StaticAsset(relative, mimetype, digest.hexdigest()[:20], cache_control, variants)
+
+class StaticManifest:
+    """Manifesto da pasta static montado na inicialização
+
+    Cada requisição vira uma consulta no dicionário, sem stat no disco;
+    a variante (br, gzip ou sem compressão) é escolhida pelo Accept-Encoding.
+    """
+
+    def __init__(self):
+        self.assets = {}
+
+    def build(self, folder):
+        assets = {}
+        if folder and os.path.isdir(folder):
+            for root, _, files in os.walk(folder):
+                names = set(files)
+                for name in files:
+                    # As variantes pré-comprimidas entram junto do arquivo original
+                    if any(name.endswith(suffix) and name[:-len(suffix)] in names for suffix in SUFFIXES.values()):
+                        continue
+                    path = os.path.join(root, name)
+                    relative = os.path.relpath(path, folder).replace(os.sep, '/')
+                    assets[relative] = _load(path, relative)
+        self.assets = assets
+        return len(assets)
+
+    def get(self, path):
+        return self.assets.get(path)
+
+def _choose_encoding(asset):
+    for encoding in ENCODINGS:
+        if encoding in asset.variants and request.accept_encodings[encoding]:
+            return encoding
+    return 'identity'
+
+def serve_asset(asset):
+    """Resposta do arquivo na melhor codificação aceita, com ETag e Cache-Control"""
+    encoding = _choose_encoding(asset)
+    body = asset.variants[encoding]
+    etag = asset.etag if encoding == 'identity' else f'{asset.etag}-{encoding}'
+
+    if isinstance(body, bytes):
+        response = Response(body, mimetype=asset.mimetype)
+        response.set_etag(etag)
+        response.make_conditional(request)
+    else:
+        response = send_file(body, mimetype=asset.mimetype, etag=etag, conditional=True)
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = asset.cache_control
+    response.vary.add('Accept-Encoding')
+    return response
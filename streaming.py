@@ -0,0 +1,161 @@
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+import csv
+import io
+import json
+import math
+import re
+import zipfile
+
+# Bytes acumulados antes de enviar um pedaço da resposta
+CHUNK_SIZE = 64 * 1024
+
+def _serialize(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def _chunks(pieces):
+    """Agrupa pedaços pequenos em blocos de até CHUNK_SIZE bytes
+
+    O primeiro pedaço é enviado imediatamente, antes de a consulta terminar.
+    """
+    buffer, size = [], 0
+    first = True
+    for piece in pieces:
+        if isinstance(piece, str):
+            piece = piece.encode('utf-8')
+        buffer.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE or first:
+            first = False
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+def csv_stream(columns, rows):
+    """Gera um CSV com cabeçalho a partir de dicionários, linha a linha"""
+    def pieces():
+        line = io.StringIO()
+        writer = csv.writer(line)
+        # BOM para o Excel reconhecer UTF-8
+        yield '\ufeff'
+        for values in ([columns], ([_serialize(row.get(name)) for name in columns] for row in rows)):
+            for value in values:
+                writer.writerow(value)
+                yield line.getvalue()
+                line.seek(0)
+                line.truncate()
+    return _chunks(pieces())
+
+def ndjson_stream(columns, rows):
+    """Gera um objeto JSON por linha"""
+    return _chunks(
+        json.dumps({name: _serialize(row.get(name)) for name in columns}, ensure_ascii=False) + '\n'
+        for row in rows
+    )
+
+class _StreamBuffer:
+    """Arquivo somente escrita e sem seek; o zipfile grava descritores de dados"""
+
+    def __init__(self):
+        self.pieces = []
+
+    def write(self, data):
+        self.pieces.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        pieces, self.pieces = self.pieces, []
+        return pieces
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+# Caracteres de controle que o XML 1.0 não aceita nem escapados
+_XML_ILLEGAL = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+def _xlsx_cell(value):
+    value = _serialize(value)
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)) and math.isfinite(value):
+        return f'<c><v>{value}</v></c>'
+    text = _XML_ILLEGAL.sub('', str(value))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+def xlsx_stream(columns, rows, sheet_name='Dados'):
+    """Gera uma planilha XLSX mínima sem manter as linhas em memória
+
+    O ZIP é escrito em modo streaming (sem seek) e cada linha vira uma
+    <row> com strings inline, dispensando a tabela de strings compartilhadas.
+    """
+    def pieces():
+        buffer = _StreamBuffer()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, content in _XLSX_PARTS.items():
+                archive.writestr(name, content)
+            archive.writestr('xl/workbook.xml', (
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                f'<sheets><sheet name="{escape(sheet_name)}" sheetId="1" r:id="rId1"/></sheets>'
+                '</workbook>'
+            ))
+            yield from buffer.drain()
+
+            with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+                sheet.write((
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                    '<row>' + ''.join(_xlsx_cell(name) for name in columns) + '</row>'
+                ).encode('utf-8'))
+                for row in rows:
+                    sheet.write(
+                        ('<row>' + ''.join(_xlsx_cell(row.get(name)) for name in columns) + '</row>').encode('utf-8')
+                    )
+                    yield from buffer.drain()
+                sheet.write(b'</sheetData></worksheet>')
+            yield from buffer.drain()
+        yield from buffer.drain()
+    return _chunks(pieces())
+
+# formato -> (gerador, mimetype, extensão)
+FORMATS = {
+    'csv': (csv_stream, 'text/csv; charset=utf-8', 'csv'),
+    'ndjson': (ndjson_stream, 'application/x-ndjson', 'ndjson'),
+    'xlsx': (xlsx_stream, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
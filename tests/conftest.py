@@ -0,0 +1,119 @@
+import os
+import sys
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Na aplicação implantada os módulos ficam em src/models, src/routes e
+# src/utils; aqui estão todos na raiz do repositório
+for name, path in (('src', []), ('src.models', [ROOT]), ('src.routes', [ROOT]), ('src.utils', [ROOT])):
+    if name not in sys.modules:
+        package = types.ModuleType(name)
+        package.__path__ = path
+        sys.modules[name] = package
+
+from flask import Flask
+from src.models.user import db, User
+from src.models.shooting import Weapon, Competition, Level
+from src.models.migrations import run_migrations
+from src.models.training_stats import ensure_training_stats
+from src.models.rollups import ensure_rollups
+from src.models.compliance import ensure_habitualidade
+from src.models.leaderboard import ensure_leaderboards, leaderboards
+from src.models.progress import level_thresholds
+from src.routes.auth import auth_bp
+from src.routes.weapons import weapons_bp
+from src.routes.competitions import competitions_bp
+from src.routes.levels import levels_bp
+from src.routes.training import training_bp
+from src.routes.dashboard import dashboard_bp
+from src.routes.export import export_bp
+from src.routes.habitualidade import habitualidade_bp
+from src.utils.query_counter import init_query_counter
+from src.utils.response_cache import response_cache
+from src.utils.auth_cache import auth_cache
+from src.utils.password_hashing import init_password_hashing
+from src.utils.rate_limit import init_rate_limit
+
+@pytest.fixture
+def app():
+    """Aplicação com os blueprints da API sobre um banco SQLite em memória migrado"""
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SECRET_KEY='test-secret-key',
+        SQLALCHEMY_DATABASE_URI='sqlite://',
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        PASSWORD_HASH_METHOD='pbkdf2:sha256:1000',
+        RATE_LIMIT_ENABLED=False
+    )
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    for blueprint in (weapons_bp, competitions_bp, levels_bp, training_bp, dashboard_bp, export_bp, habitualidade_bp):
+        app.register_blueprint(blueprint, url_prefix='/api')
+    db.init_app(app)
+    init_query_counter(app)
+    init_password_hashing(app)
+    init_rate_limit(app)
+
+    # Caches de processo: nada pode sobrar do banco do teste anterior
+    response_cache.clear()
+    auth_cache.clear()
+    leaderboards._versions = None
+    level_thresholds._version = None
+
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+        ensure_training_stats()
+        ensure_rollups()
+        ensure_habitualidade()
+        ensure_leaderboards()
+    # Sem contexto ativo: cada requisição do cliente de teste tem o seu próprio g
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+@pytest.fixture
+def context(app):
+    """Contexto da aplicação para testes que usam o banco fora de requisições"""
+    with app.app_context():
+        yield app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def users(app):
+    """Administrador e atirador com armas, níveis e uma competição cadastrados"""
+    with app.app_context():
+        return _add_users()
+
+def _add_users():
+    admin = User(username='admin', email='admin@example.com', full_name='Administrador', is_admin=True)
+    admin.set_password('Admin123')
+    shooter = User(username='atirador', email='atirador@example.com', full_name='Atirador Teste')
+    shooter.set_password('Atirador123')
+    db.session.add_all([admin, shooter])
+    db.session.flush()
+
+    db.session.add_all([
+        Weapon(name='Glock G22', caliber='.40', owner='JST', user_id=shooter.id),
+        Weapon(name='CBC 7022', caliber='.22LR', owner='Old', user_id=admin.id),
+        Competition(name='Copa Regional', description='Etapa estadual'),
+        Level(name='Sem Nível', message='Vai perder seu CR, agiliza!', min_score=0, order=0),
+        Level(name='Nível I', message='Você pode mais do que isso, bora!', min_score=50, order=1),
+    ])
+    db.session.commit()
+    return {'admin': admin.id, 'shooter': shooter.id}
+
+@pytest.fixture
+def headers(app, users):
+    """Headers de autenticação de cada usuário de users"""
+    with app.app_context():
+        return {
+            role: {'Authorization': f'Bearer {db.session.get(User, user_id).generate_token()}'}
+            for role, user_id in users.items()
+        }
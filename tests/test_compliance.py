@@ -0,0 +1,31 @@
+from datetime import date
+
+from src.models.user import db
+from src.models.shooting import Weapon, TrainingSession
+from src.models.compliance import UserWeaponMonthlySessions, apply_habitualidade, rebuild_habitualidade
+
+def test_rebuild_counts_sessions_per_user_weapon_and_month(context, users):
+    weapon = Weapon.query.filter_by(user_id=users['shooter']).first()
+    days = (date(2024, 1, 3), date(2024, 1, 31), date(2024, 2, 1), date(2024, 2, 29))
+    values = [
+        {'user_id': user_id, 'weapon_id': weapon.id, 'shots_fired': 10, 'hits': 8, 'score': 80.0, 'date': day}
+        for user_id in (users['shooter'], users['admin']) for day in days
+    ]
+    db.session.add_all(TrainingSession(**row) for row in values)
+    db.session.commit()
+
+    rebuild_habitualidade()
+    rebuilt = {
+        (row.user_id, row.weapon_id, row.month): row.sessions for row in UserWeaponMonthlySessions.query
+    }
+    assert rebuilt == {
+        (user_id, weapon.id, month): 2
+        for user_id in (users['shooter'], users['admin']) for month in (date(2024, 1, 1), date(2024, 2, 1))
+    }
+
+    # O caminho incremental grava o mesmo mês que a reconstrução
+    apply_habitualidade([values[0]])
+    db.session.commit()
+    row = db.session.get(UserWeaponMonthlySessions, (users['shooter'], weapon.id, date(2024, 1, 1)))
+    assert row.sessions == 3
+    assert UserWeaponMonthlySessions.query.count() == 4
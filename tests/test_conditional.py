@@ -0,0 +1,49 @@
+from src.models.shooting import Weapon
+
+def get(client, url, headers=None, etag=None):
+    headers = dict(headers or {})
+    if etag:
+        headers['If-None-Match'] = etag
+    return client.get(url, headers=headers)
+
+def test_unchanged_table_returns_304(client, users):
+    first = get(client, '/api/weapons')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    cached = get(client, '/api/weapons', etag=etag)
+    assert cached.status_code == 304
+    assert cached.data == b''
+    assert cached.headers['ETag'] == etag
+
+def test_write_changes_the_etag(client, users):
+    etag = get(client, '/api/weapons').headers['ETag']
+    created = client.post('/api/weapons', json={'name': 'Taurus TS9', 'caliber': '9mm', 'owner': 'Fer'})
+    assert created.status_code == 201
+
+    response = get(client, '/api/weapons', etag=etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert 'Taurus TS9' in {weapon['name'] for weapon in response.get_json()['data']}
+
+def test_etag_is_per_user(client, users, headers):
+    admin = get(client, '/api/training-sessions/stats', headers['admin']).headers['ETag']
+    shooter = get(client, '/api/training-sessions/stats', headers['shooter']).headers['ETag']
+    assert admin != shooter
+    assert get(client, '/api/training-sessions/stats', headers['shooter'], etag=admin).status_code == 200
+
+def test_shared_table_write_refreshes_other_users(app, client, users, headers):
+    with app.app_context():
+        weapon_id = Weapon.query.filter_by(user_id=users['shooter']).first().id
+    client.post('/api/training-sessions', headers=headers['admin'], json={
+        'weapon_id': weapon_id, 'shots_fired': 50, 'hits': 45, 'score': 90, 'date': '2024-03-01'
+    })
+    first = get(client, '/api/training-sessions/stats', headers['admin'])
+    assert get(client, '/api/training-sessions/stats', headers['admin'], etag=first.headers['ETag']).status_code == 304
+
+    # Arma cadastrada pelo outro usuário, renomeada sem autenticação
+    assert client.put(f'/api/weapons/{weapon_id}', json={'name': 'Glock G23'}).status_code == 200
+
+    response = get(client, '/api/training-sessions/stats', headers['admin'], etag=first.headers['ETag'])
+    assert response.status_code == 200
+    assert response.get_json()['data']['by_weapon'][0]['weapon_name'] == 'Glock G23'
@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+import zipfile
+from datetime import date
+
+import pytest
+from openpyxl import load_workbook
+
+from src.models.user import db
+from src.models.shooting import Weapon, TrainingSession
+from src.routes.export import TRAINING_COLUMNS
+
+NOTES = ('Vento forte <rajadas> & chuva', 'Linha com\tTAB\ne quebra', 'Controle \x01\x0b removido', None)
+
+@pytest.fixture
+def sessions(app, users):
+    with app.app_context():
+        weapon = Weapon.query.filter_by(user_id=users['shooter']).first()
+        for number, notes in enumerate(NOTES, start=1):
+            db.session.add(TrainingSession(
+                user_id=users['shooter'], weapon_id=weapon.id, shots_fired=50, hits=40 + number,
+                score=80.5 + number, notes=notes, date=date(2024, 2, number)
+            ))
+        db.session.commit()
+
+def export(client, headers, export_format):
+    response = client.get(f'/api/export/training-sessions?format={export_format}', headers=headers)
+    assert response.status_code == 200
+    return response
+
+def test_xlsx_export_is_a_valid_workbook(client, headers, sessions):
+    response = export(client, headers['shooter'], 'xlsx')
+    assert response.mimetype == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+    archive = zipfile.ZipFile(io.BytesIO(response.data))
+    assert archive.testzip() is None
+    rows = list(load_workbook(io.BytesIO(response.data), read_only=True).active.iter_rows(values_only=True))
+
+    assert rows[0] == TRAINING_COLUMNS
+    assert len(rows) == len(NOTES) + 1
+    data = [dict(zip(TRAINING_COLUMNS, row)) for row in rows[1:]]
+    # Mais recentes primeiro; números continuam numéricos
+    assert [row['date'] for row in data] == ['2024-02-04', '2024-02-03', '2024-02-02', '2024-02-01']
+    assert data[-1]['score'] == 81.5 and data[-1]['hits'] == 41
+    assert data[-1]['notes'] == NOTES[0]
+    assert data[-2]['notes'] == NOTES[1]
+    assert data[-3]['notes'] == 'Controle  removido'
+    assert data[0]['notes'] is None
+
+def test_csv_and_ndjson_exports_have_the_same_rows(client, headers, sessions):
+    text = export(client, headers['shooter'], 'csv').data.decode('utf-8-sig')
+    csv_rows = list(csv.DictReader(io.StringIO(text)))
+    ndjson_rows = [json.loads(line) for line in export(client, headers['shooter'], 'ndjson').data.splitlines()]
+
+    assert len(csv_rows) == len(ndjson_rows) == len(NOTES)
+    assert [row['id'] for row in csv_rows] == [str(row['id']) for row in ndjson_rows]
+    assert ndjson_rows[-1]['notes'] == NOTES[0]
+
+def test_unknown_format_is_rejected(client, headers, sessions):
+    response = client.get('/api/export/training-sessions?format=pdf', headers=headers['shooter'])
+    assert response.status_code == 400
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from src.models.user import db
+from src.models.shooting import Competition
+from src.models.leaderboard import CompetitionLeaderboard, apply_competition_score, leaderboards
+
+def test_sync_reads_rows_committed_with_an_old_timestamp(context, users):
+    competition_id = Competition.query.first().id
+    apply_competition_score(users['shooter'], competition_id, 180.0)
+    db.session.commit()
+    assert leaderboards.query(competition_id, users['shooter'])[:2] == (1, 1)
+
+    # Transação que começou há muito tempo e só agora fez commit
+    apply_competition_score(users['admin'], competition_id, 195.0)
+    CompetitionLeaderboard.query.filter_by(user_id=users['admin']).update({'updated_at': datetime(2000, 1, 1)})
+    db.session.commit()
+
+    total, rank, top, _ = leaderboards.query(competition_id, users['shooter'])
+    assert (total, rank) == (2, 2)
+    assert top[0][1:] == (users['admin'], 195.0)
+
+def test_each_write_gets_a_higher_sequence(context, users):
+    competition_id = Competition.query.first().id
+    seqs = []
+    for score in (150.0, 160.0, 170.0):
+        apply_competition_score(users['shooter'], competition_id, score)
+        db.session.commit()
+        seqs.append(CompetitionLeaderboard.query.filter_by(user_id=users['shooter']).one().seq)
+    assert seqs == sorted(seqs) and len(set(seqs)) == 3
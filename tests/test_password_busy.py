@@ -0,0 +1,37 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.password_hashing import init_password_hashing, password_hasher
+
+def test_full_hashing_queue_returns_503_and_keeps_other_routes_responsive(app, client, users):
+    app.config.update(SERVER_THREADS=4, PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=2, PASSWORD_HASH_TIMEOUT=0.5)
+    init_password_hashing(app)
+
+    # O único worker de hashing fica ocupado e as duas vagas da fila são tomadas
+    release = threading.Event()
+    password_hasher._current()[0].submit(release.wait)
+    waiting = [threading.Thread(target=password_hasher.hash, args=('senha',)) for _ in range(2)]
+    for thread in waiting:
+        thread.start()
+    try:
+        deadline = time.monotonic() + 2
+        while password_hasher._slots._value and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        login = client.post('/api/auth/login', json={'username': 'atirador', 'password': 'Atirador123'})
+        assert login.status_code == 503
+        assert login.headers['Retry-After']
+        assert client.get('/api/weapons').status_code == 200
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+        for thread in waiting:
+            thread.join()
+
+def test_pending_limit_must_leave_request_threads_free(app):
+    app.config.update(SERVER_THREADS=8, PASSWORD_HASH_MAX_PENDING=8)
+    with pytest.raises(ValueError, match='SERVER_THREADS'):
+        init_password_hashing(app)
@@ -0,0 +1,36 @@
+import threading
+
+import pytest
+from werkzeug.security import check_password_hash
+
+from src.utils.password_hashing import PasswordHasher, PasswordHashingBusy
+
+def test_hash_many_keeps_the_order():
+    hasher = PasswordHasher('pbkdf2:sha256:1000', workers=2, max_pending=4)
+    passwords = [f'senha{number}' for number in range(10)]
+    hashes = hasher.hash_many(passwords)
+    assert all(check_password_hash(hashed, password) for hashed, password in zip(hashes, passwords))
+    assert all(hasher.prefix == hashed.split('$', 1)[0] for hashed in hashes)
+
+def test_hash_many_leaves_slots_for_single_requests():
+    hasher = PasswordHasher('pbkdf2:sha256:1000', workers=1, max_pending=2, timeout=5)
+    release = threading.Event()
+    started = threading.Event()
+    hasher._current()[0].submit(lambda: (started.set(), release.wait()))
+    started.wait()
+
+    batch = threading.Thread(target=hasher.hash_many, args=(['a', 'b', 'c'],))
+    batch.start()
+    try:
+        # O lote ocupa uma vaga (workers=1); a outra continua livre
+        assert hasher._slots.acquire(timeout=1)
+        hasher._slots.release()
+    finally:
+        release.set()
+        batch.join()
+
+def test_hash_many_fails_fast_when_the_queue_is_full():
+    hasher = PasswordHasher('pbkdf2:sha256:1000', workers=1, max_pending=1, timeout=0.1)
+    assert hasher._slots.acquire(blocking=False)
+    with pytest.raises(PasswordHashingBusy):
+        hasher.hash_many(['a', 'b'])
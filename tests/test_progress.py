@@ -0,0 +1,59 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from src.models.user import db
+from src.models.shooting import Level
+from src.models.progress import level_thresholds
+
+@contextmanager
+def recorded_statements():
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+def test_level_lookups_check_the_version_once_per_context(app, users):
+    with app.app_context():
+        with recorded_statements() as statements:
+            assert level_thresholds.for_score(60)['name'] == 'Nível I'
+            for _ in range(10):
+                level_thresholds.all()
+                level_thresholds.first()
+                level_thresholds.for_score(10)
+                level_thresholds.after(0)
+        assert sum('table_versions' in statement for statement in statements) == 1
+
+    with app.app_context():
+        with recorded_statements() as statements:
+            level_thresholds.for_score(60)
+            level_thresholds.for_score(60)
+        assert len(statements) == 1 and 'table_versions' in statements[0]
+
+def test_level_write_invalidates_the_thresholds(app, users):
+    with app.app_context():
+        assert level_thresholds.for_score(120)['name'] == 'Nível I'
+        db.session.add(Level(name='Nível II', message='Quase lá', min_score=100, order=2))
+        db.session.commit()
+        assert level_thresholds.for_score(120)['name'] == 'Nível II'
+
+def test_level_write_from_another_process_is_seen_in_the_next_context(app, users):
+    with app.app_context():
+        assert level_thresholds.for_score(120)['name'] == 'Nível I'
+        # Escrita fora da sessão ORM, como a de outro processo: só a versão muda
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "INSERT INTO level (name, message, min_score, \"order\") VALUES ('Nível II', 'Quase lá', 100, 2)"
+            )
+            connection.exec_driver_sql(
+                "INSERT INTO table_versions (name, version, updated_at) VALUES ('level', 100, CURRENT_TIMESTAMP) "
+                "ON CONFLICT (name) DO UPDATE SET version = version + 100"
+            )
+        assert level_thresholds.for_score(120)['name'] == 'Nível I'
+
+    with app.app_context():
+        assert level_thresholds.for_score(120)['name'] == 'Nível II'
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from src.models.user import User
+from src.routes import auth
+
+def csv_body(count, start=0):
+    lines = ['username,email,full_name']
+    lines += [f'membro{number},membro{number}@clube.com,Membro {number}' for number in range(start, start + count)]
+    return '\n'.join(lines) + '\n'
+
+def post_csv(client, headers, body):
+    return client.post('/api/auth/users/bulk', headers={**headers, 'Content-Type': 'text/csv'}, data=body)
+
+def test_bulk_creates_members_with_invite_codes(app, client, headers):
+    response = client.post('/api/auth/users/bulk', headers=headers['admin'], json=[
+        {'username': 'membro1', 'email': 'membro1@clube.com', 'full_name': 'Membro 1'},
+        {'username': 'membro2', 'email': 'membro2@clube.com', 'full_name': 'Membro 2', 'password': 'Senha123'},
+        {'username': 'atirador', 'email': 'novo@clube.com', 'full_name': 'Repetido'},
+    ])
+    assert response.status_code == 201
+    result = response.get_json()
+    assert (result['created'], result['failed']) == (2, 1)
+    first, second, duplicate = result['results']
+    assert first['invite_code'] and second['invite_code'] is None
+    assert duplicate['error'] == 'Nome de usuário já existe'
+
+    login = client.post('/api/auth/login', json={'username': 'membro1', 'password': first['invite_code']})
+    assert login.status_code == 200
+
+def test_bulk_is_restricted_to_admins(client, headers):
+    assert post_csv(client, headers['shooter'], csv_body(1)).status_code == 403
+
+def test_bulk_stops_reading_after_max_members(app, client, headers, monkeypatch):
+    monkeypatch.setattr(auth, 'MAX_MEMBERS', 3)
+    response = post_csv(client, headers['admin'], csv_body(10))
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Máximo de 3 membros por requisição'
+    with app.app_context():
+        assert User.query.count() == 2
+
+def test_bulk_rejects_oversized_bodies(client, headers, monkeypatch):
+    monkeypatch.setattr(auth, 'MAX_REQUEST_BYTES', 200)
+    response = post_csv(client, headers['admin'], csv_body(10))
+    assert response.status_code == 413
+    assert response.get_json()['message'] == f'Máximo de {auth.MAX_MEMBERS} membros por requisição'
+    members = [{'username': f'membro{n}', 'email': f'membro{n}@clube.com', 'full_name': 'M'} for n in range(10)]
+    response = client.post('/api/auth/users/bulk', headers=headers['admin'], data=json.dumps(members),
+                           content_type='application/json')
+    assert response.status_code == 413
+    assert response.get_json()['message'] == f'Máximo de {auth.MAX_MEMBERS} membros por requisição'
+
+def test_conflicting_chunk_falls_back_to_row_errors(app, monkeypatch):
+    from src.models import provisioning
+    from src.models.user import db
+
+    records = [(number, {'username': f'membro{number}', 'email': f'membro{number}@clube.com',
+                         'full_name': f'Membro {number}', 'password': 'Senha123'}) for number in range(1, 6)]
+    existing = provisioning._existing
+
+    def race(usernames, emails):
+        # Outro cadastro grava membro4 entre a verificação e a inserção
+        taken = existing(usernames, emails)
+        user = User(username='membro4', email='outro@clube.com', full_name='Concorrente')
+        user.password_hash = 'x'
+        db.session.add(user)
+        db.session.commit()
+        return taken
+
+    monkeypatch.setattr(provisioning, '_existing', race)
+    with app.app_context():
+        result = provisioning.provision_members(records, chunk_size=2)
+        assert (result['created'], result['failed']) == (4, 1)
+        assert [row['status'] for row in result['results']] == ['created', 'created', 'created', 'error', 'created']
+        assert result['results'][3]['error'] == 'Nome de usuário ou email já cadastrado'
+        assert User.query.count() == 5
@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+import pytest
+
+from src.models.user import db
+from src.models.shooting import Weapon, Competition, CompetitionScore, TrainingSession
+from src.utils.query_counter import QUERY_COUNT_HEADER
+
+def add_rows(user_id, count, start):
+    """count sessões (cada uma com uma arma nova) e pontuações do usuário"""
+    competition = Competition.query.first()
+    for number in range(start, start + count):
+        weapon = Weapon(name=f'Arma {number}', caliber='9mm', owner='JST', user_id=user_id)
+        db.session.add(weapon)
+        db.session.flush()
+        day = date(2024, 1, 1) + timedelta(days=number)
+        db.session.add(TrainingSession(
+            user_id=user_id, weapon_id=weapon.id, shots_fired=50, hits=40, score=80.0 + number, date=day
+        ))
+        db.session.add(CompetitionScore(
+            competition_id=competition.id, user_id=user_id, score=150.0 + number, stage='1', date=day
+        ))
+    db.session.commit()
+
+def query_count(client, url, headers):
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return int(response.headers[QUERY_COUNT_HEADER])
+
+@pytest.mark.parametrize('url', [
+    '/api/training-sessions?per_page=50',
+    '/api/training-sessions?after=&per_page=50',
+    '/api/training-sessions/recent?limit=50',
+    '/api/competitions/{competition_id}/scores',
+])
+def test_list_queries_do_not_grow_with_rows(app, client, users, headers, url):
+    shooter = headers['shooter']
+    with app.app_context():
+        url = url.format(competition_id=Competition.query.first().id)
+        add_rows(users['shooter'], 2, start=0)
+    query_count(client, url, shooter)  # aquece o cache de autenticação
+    few = query_count(client, url, shooter)
+
+    with app.app_context():
+        add_rows(users['shooter'], 20, start=2)
+    many = query_count(client, url, shooter)
+    assert many == few
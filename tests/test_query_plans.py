@@ -0,0 +1,27 @@
+import re
+
+import pytest
+
+from src.models.user import db
+from src.models.migrations import (
+    MIGRATIONS, TABLE_SCAN, explain, get_schema_version, route_queries, run_migrations
+)
+
+def test_migrations_reach_the_latest_version(context):
+    with db.engine.connect() as connection:
+        assert get_schema_version(connection) == MIGRATIONS[-1][0]
+    assert run_migrations() == []
+
+def test_migrations_can_be_replayed_over_an_existing_schema(context):
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('PRAGMA user_version = 0')
+    assert [version for version, _ in run_migrations()] == [version for version, _, _ in MIGRATIONS]
+
+# Tabelas que crescem com o uso: nem a varredura de um índice inteiro é aceita
+HOT_TABLE_SCAN = re.compile(r'^SCAN (training_session|competition_score)\b')
+
+@pytest.mark.parametrize('route', list(route_queries()))
+def test_route_query_uses_an_index(context, route):
+    plan = explain(route_queries()[route])
+    assert not [line for line in plan if TABLE_SCAN.match(line)], plan
+    assert not [line for line in plan if HOT_TABLE_SCAN.match(line)], plan
@@ -0,0 +1,91 @@
+import pytest
+
+from src.utils import rate_limit
+from src.utils.rate_limit import MemoryBuckets, SQLiteBuckets
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def buckets(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteBuckets(str(tmp_path / 'rate_limit.db'))
+    return MemoryBuckets()
+
+def test_bucket_refuses_when_empty_and_refills(buckets):
+    for _ in range(3):
+        assert buckets.consume('login:ip:1', 3, 60, now=100) == (True, 0)
+    allowed, retry_after = buckets.consume('login:ip:1', 3, 60, now=100)
+    assert not allowed
+    assert retry_after == pytest.approx(20)
+
+    # Uma ficha a cada 20 s
+    assert buckets.consume('login:ip:1', 3, 60, now=120)[0]
+    assert not buckets.consume('login:ip:1', 3, 60, now=121)[0]
+
+def test_consume_all_charges_nothing_when_any_bucket_refuses(buckets):
+    limits = [('login:ip:1', 10, 60), ('login:username:ana', 1, 60)]
+    assert buckets.consume_all(limits, now=0) == (True, 0)
+    for _ in range(3):
+        allowed, retry_after = buckets.consume_all(limits, now=1)
+        assert not allowed
+        assert retry_after == pytest.approx(59)
+
+    # O bucket do IP continua com as fichas que as tentativas recusadas não gastaram
+    for _ in range(9):
+        assert buckets.consume('login:ip:1', 10, 60, now=1)[0]
+    assert not buckets.consume('login:ip:1', 10, 60, now=1)[0]
+
+def test_memory_buckets_expire_refilled_and_least_recent_keys():
+    buckets = MemoryBuckets(maxsize=2)
+    buckets.consume('a', 2, 10, now=0)
+    buckets.consume('b', 2, 10, now=0)
+    buckets.consume('c', 2, 10, now=1)
+    assert len(buckets) == 2
+
+    # Depois de recarregados, os buckets são descartados na próxima consulta
+    buckets.consume('d', 2, 10, now=100)
+    assert len(buckets) == 1
+
+def test_sqlite_buckets_prune_idle_rows(tmp_path):
+    buckets = SQLiteBuckets(str(tmp_path / 'rate_limit.db'), max_idle=60, prune_every=2)
+    buckets.consume('old', 5, 60, now=0)
+    buckets.consume('new', 5, 60, now=1000)
+    keys = [key for key, in buckets._connect().execute('SELECT key FROM rate_limit_bucket')]
+    assert keys == ['new']
+
+def test_sqlite_buckets_are_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'rate_limit.db')
+    first, second = SQLiteBuckets(path), SQLiteBuckets(path)
+    assert first.consume('login:ip:1', 1, 60, now=0)[0]
+    assert not second.consume('login:ip:1', 1, 60, now=0)[0]
+
+@pytest.fixture
+def limited(app):
+    app.config['RATE_LIMIT_ENABLED'] = True
+    app.config['RATE_LIMIT_RULES'] = {'ip': (3, 60), 'username': (2, 60)}
+    rate_limit.init_rate_limit(app)
+    return app
+
+def login(client, username, **kwargs):
+    return client.post('/api/auth/login', json={'username': username, 'password': 'errada'}, **kwargs)
+
+def test_login_returns_429_with_retry_after(limited, client, users):
+    assert [login(client, 'atirador').status_code for _ in range(3)] == [401, 401, 429]
+    response = login(client, 'atirador')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) == 30
+
+def test_refused_username_does_not_spend_ip_tokens(limited, client, users):
+    assert [login(client, 'atirador').status_code for _ in range(4)] == [401, 401, 429, 429]
+    # Restou uma ficha para o IP: as tentativas recusadas pelo usuário não contaram
+    assert login(client, 'admin').status_code == 401
+    assert login(client, 'outro').status_code == 429
+
+def test_forwarded_for_counts_only_with_trusted_proxies(limited, client, users):
+    limited.config['RATE_LIMIT_PROXY_HOPS'] = 1
+    codes = [
+        login(client, f'user{i}', headers={'X-Forwarded-For': f'203.0.113.{i}, 198.51.100.7'}).status_code
+        for i in range(4)
+    ]
+    assert codes == [401, 401, 401, 429]
+
+    other = login(client, 'user9', headers={'X-Forwarded-For': '198.51.100.8'})
+    assert other.status_code == 401
@@ -0,0 +1,37 @@
+from datetime import date
+
+import pytest
+
+from src.models.rollups import MAX_POINTS, count_buckets, parse_range
+
+@pytest.mark.parametrize('args, bucket, start', [
+    ({'from': '2024-01-01', 'to': '2024-12-31', 'bucket': 'day'}, 'day', date(2024, 1, 1)),
+    ({'from': '2022-01-01', 'to': '2024-12-31', 'bucket': 'day'}, 'week', date(2022, 1, 1)),
+    ({'from': '2022-01-01', 'to': '2024-12-31'}, 'week', date(2022, 1, 1)),
+    ({'from': '2010-01-01', 'to': '2024-12-31', 'bucket': 'week'}, 'month', date(2010, 1, 1)),
+    ({'from': '2022-01-01', 'to': '2024-12-31', 'bucket': 'month'}, 'month', date(2022, 1, 1)),
+    # Acima de MAX_POINTS meses ficam só os meses mais recentes
+    ({'from': '1950-01-01', 'to': '2024-12-31', 'bucket': 'day'}, 'month', date(1994, 3, 1)),
+])
+def test_range_coarsens_bucket_to_fit_the_point_budget(args, bucket, start):
+    assert parse_range(args) == (bucket, start, date(2024, 12, 31))
+    assert count_buckets(bucket, start, date(2024, 12, 31)) <= MAX_POINTS
+
+@pytest.mark.parametrize('args', [
+    {'from': '2024-02-01', 'to': '2024-01-01'},
+    {'from': '2024-01-01', 'to': '2024-02-01', 'bucket': 'year'},
+])
+def test_range_rejects_invalid_parameters(args):
+    with pytest.raises(ValueError):
+        parse_range(args)
+
+def test_multi_year_daily_evolution_returns_weekly_series(client, headers):
+    response = client.get(
+        '/api/training-sessions/evolution?from=2021-01-01&to=2024-12-31&bucket=day',
+        headers=headers['shooter']
+    )
+
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert (data['bucket'], data['from'], data['to']) == ('week', '2021-01-01', '2024-12-31')
+    assert len(data['evolution']) == count_buckets('week', date(2021, 1, 1), date(2024, 12, 31)) <= MAX_POINTS
@@ -0,0 +1,29 @@
+from datetime import date, timedelta
+
+from src.models.user import db
+from src.models.shooting import TrainingSession, Weapon
+
+def test_cursor_pages_cover_every_session_once(app, client, users, headers):
+    with app.app_context():
+        weapon_id = Weapon.query.filter_by(user_id=users['shooter']).one().id
+        # Datas repetidas: o cursor desempata pelo id
+        db.session.add_all(
+            TrainingSession(user_id=users['shooter'], weapon_id=weapon_id, shots_fired=50, hits=40,
+                            score=80.0, date=date(2024, 1, 1) + timedelta(days=number // 3))
+            for number in range(45)
+        )
+        db.session.commit()
+
+    ids, after, pages = [], '', 0
+    while after is not None:
+        response = client.get(
+            '/api/training-sessions', query_string={'after': after, 'per_page': 20}, headers=headers['shooter']
+        )
+        assert response.status_code == 200
+        data = response.get_json()['data']
+        ids += [session['id'] for session in data['sessions']]
+        after = data['pagination']['next_cursor']
+        pages += 1
+
+    assert pages == 3
+    assert len(ids) == len(set(ids)) == 45
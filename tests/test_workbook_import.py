@@ -0,0 +1,125 @@
+import io
+from datetime import date, datetime
+
+import pytest
+from openpyxl import Workbook
+
+from src.models.shooting import CompetitionScore, Level, TrainingSession, UserProgress
+from src.models.progress import rebuild_progress
+from src.models.training_stats import rebuild_training_stats
+from src.models.workbook_import import import_workbook
+
+def workbook(**sheets):
+    book = Workbook()
+    book.remove(book.active)
+    for title, rows in sheets.items():
+        sheet = book.create_sheet(title)
+        for row in rows:
+            sheet.append(row)
+    stream = io.BytesIO()
+    book.save(stream)
+    stream.seek(0)
+    return stream
+
+RANKING = [
+    ('Histórico Ranking Etapas', 1, 2, 3),
+    ('Western', 85, 73, None),
+    ('Steel Gauge', None, None, 147),
+]
+
+def test_ranking_dates_come_from_the_results_sheet(context, users):
+    stream = workbook(**{
+        'Histórico Ranking': RANKING,
+        'RESULTADOS': [
+            ('Data', 'Competição', 'Tipo', 'Equipamento', 'Calibre', 'Pontuação'),
+            (datetime(2024, 3, 9), 'Western', 'Etapa', None, None, 85),
+            ('20/04/2024', 'Steel Gauge', 'Etapa', None, None, 147),
+        ],
+    })
+    result = import_workbook(stream, users['shooter'])['competition_scores']
+
+    assert (result['inserted'], result['failed']) == (2, 1)
+    assert result['errors'] == [{
+        'line': 2, 'stage': '2', 'error': 'Pontuação 73 de Western sem data correspondente em RESULTADOS'
+    }]
+    dates = {score.score: score.date for score in CompetitionScore.query.filter_by(user_id=users['shooter'])}
+    assert dates == {85.0: date(2024, 3, 9), 147.0: date(2024, 4, 20)}
+
+def test_ranking_without_results_sheet_imports_nothing(context, users):
+    result = import_workbook(workbook(**{'Histórico Ranking': RANKING}), users['shooter'])['competition_scores']
+    assert (result['inserted'], result['failed']) == (0, 3)
+    assert CompetitionScore.query.count() == 0
+
+def test_levels_read_thresholds_from_the_sheet(context, users):
+    stream = workbook(**{'Níveis': [
+        ('Nível', 'Msg', 'Pontuação Mínima'),
+        ('Nível I', 'Nova mensagem', None),
+        ('Nível II', 'Está bom, falta pouco para o topo!', 100),
+        ('Nível III', 'Sem pontuação', None),
+        ('Nível IV', 'Fora de ordem', 80),
+        ('Nível V', 'Pontuação inválida', 'alta'),
+    ]})
+    result = import_workbook(stream, users['admin'], include_levels=True)['levels']
+
+    assert (result['created'], result['updated'], result['failed']) == (1, 1, 3)
+    assert [error['line'] for error in result['errors']] == [4, 5, 6]
+    levels = {level.name: (level.min_score, level.order, level.message) for level in Level.query}
+    assert levels['Nível I'] == (50, 1, 'Nova mensagem')
+    assert levels['Nível II'] == (100, 2, 'Está bom, falta pouco para o topo!')
+    assert 'Nível III' not in levels and 'Nível IV' not in levels
+
+LANCAMENTOS = ('Data', 'Equipamento', 'Calibre', 'N. DE TIROS', 'Clube', 'Tipo', 'HORA')
+
+def _scored_sessions(client, headers):
+    weapon_id = client.get('/api/weapons', headers=headers).get_json()['data'][0]['id']
+    for score, hits in ((70, 40), (90, 44)):
+        response = client.post('/api/training-sessions', headers=headers, json={
+            'weapon_id': weapon_id, 'shots_fired': 50, 'hits': hits, 'score': score, 'date': '2024-05-01'
+        })
+        assert response.status_code == 201
+
+def test_training_without_scores_keeps_average_and_level(context, client, users, headers):
+    _scored_sessions(client, headers['shooter'])
+    before = client.get('/api/training-sessions/stats', headers=headers['shooter']).get_json()['data']['general']
+
+    stream = workbook(**{'Lançamentos': [
+        LANCAMENTOS,
+        (datetime(2024, 6, 1), 'Glock G22', '.40', 30, 'Clube', 'Treino', None),
+        (datetime(2024, 6, 8), 'Glock G22', '.40', 50, 'Clube', 'Treino', None),
+    ]})
+    result = import_workbook(stream, users['shooter'])['training_sessions']
+    assert (result['inserted'], result['failed']) == (2, 0)
+
+    imported = TrainingSession.query.filter(TrainingSession.date >= date(2024, 6, 1)).all()
+    assert [(session.hits, session.score, session.accuracy) for session in imported] == [(None, None, None)] * 2
+
+    progress = UserProgress.query.filter_by(user_id=users['shooter']).one()
+    assert progress.total_sessions == 4
+    assert progress.average_score == 80
+    assert progress.accuracy == 84
+    assert progress.current_level.name == 'Nível I'
+
+    after = client.get('/api/training-sessions/stats', headers=headers['shooter']).get_json()['data']['general']
+    assert after['total_sessions'] == before['total_sessions'] + 2
+    assert after['total_shots'] == before['total_shots'] + 80
+    assert (after['avg_score'], after['avg_accuracy']) == (before['avg_score'], before['avg_accuracy']) == (80, 84)
+
+    # Os agregados incrementais batem com o recálculo a partir das sessões
+    assert rebuild_training_stats() == {}
+    assert rebuild_progress() == {}
+
+def test_training_reads_scores_from_the_sheet(context, users):
+    stream = workbook(**{'Lançamentos': [
+        LANCAMENTOS + ('Acertos', 'Pontuação'),
+        (datetime(2024, 6, 1), 'Glock G22', '.40', 30, 'Clube', 'Treino', None, 27, 88.5),
+        (datetime(2024, 6, 8), 'Glock G22', '.40', 30, 'Clube', 'Treino', None, None, None),
+        (datetime(2024, 6, 9), 'Glock G22', '.40', 30, 'Clube', 'Treino', None, 'muitos', None),
+    ]})
+    result = import_workbook(stream, users['shooter'])['training_sessions']
+
+    assert (result['inserted'], result['failed']) == (2, 1)
+    assert result['errors'] == [{'line': 4, 'error': 'Campos Acertos e Pontuação devem ser numéricos'}]
+    sessions = TrainingSession.query.order_by(TrainingSession.date).all()
+    assert [(session.hits, session.score) for session in sessions] == [(27, 88.5), (None, None)]
+    progress = UserProgress.query.filter_by(user_id=users['shooter']).one()
+    assert (progress.average_score, progress.accuracy) == (88.5, 90)
@@ -1,26 +1,50 @@
 from flask import Blueprint, request, jsonify
 from src.models.shooting import db, TrainingSession, Weapon
-from datetime import datetime, timedelta
+from src.models.serialization import eager
+from src.models.training_stats import (
+    UserTrainingTotals, UserWeaponTrainingTotals, apply_training_session, session_values
+)
+from src.models.training_import import (
+    DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE, import_training_sessions, iter_csv, iter_ndjson
+)
+from src.models.rollups import parse_range, training_series
+from src.routes.auth import token_required
+from src.utils.conditional import conditional
+from src.utils.response_cache import cached
+from src.utils.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_after
+from datetime import date, datetime, timedelta
 from sqlalchemy import desc, func
 
 training_bp = Blueprint('training', __name__)
 
+# Limite de itens por página no modo cursor
+MAX_PER_PAGE = 100
+
+# Sessões exibidas no gráfico de evolução das estatísticas
+EVOLUTION_SESSIONS = 7
+
 @training_bp.route('/training-sessions', methods=['GET'])
-def get_training_sessions():
-    """Listar sessões de treinamento"""
+@token_required
+@conditional('training_session', 'weapon', per_user=True)
+def get_training_sessions(current_user):
+    """Listar sessões de treinamento do usuário"""
     try:
-        page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         weapon_id = request.args.get('weapon_id', type=int)
         
-        query = TrainingSession.query
+        query = eager(TrainingSession.query, TrainingSession).filter_by(user_id=current_user.id)
         
         if weapon_id:
             query = query.filter_by(weapon_id=weapon_id)
         
-        sessions = query.order_by(desc(TrainingSession.date)).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        # Modo cursor (?after=<cursor>): paginação por chave (date, id), sem OFFSET
+        if 'after' in request.args:
+            return _get_training_sessions_after(query, request.args.get('after'), per_page)
+        
+        page = request.args.get('page', 1, type=int)
+        sessions = query.order_by(
+            desc(TrainingSession.date), desc(TrainingSession.id)
+        ).paginate(page=page, per_page=per_page, error_out=False)
         
         return jsonify({
             'success': True,
@@ -43,8 +67,52 @@ def get_training_sessions():
             'error': str(e)
         }), 500
 
+def _get_training_sessions_after(query, cursor, per_page):
+    """Página de sessões a partir de um cursor opaco"""
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    
+    # O total é opcional: exige um COUNT(*) completo
+    total = query.count() if request.args.get('include_total', 'false').lower() == 'true' else None
+    
+    if cursor:
+        try:
+            after_date, after_id = decode_cursor(cursor, date, int)
+        except InvalidCursor as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        query = query.filter(keyset_after(
+            (TrainingSession.date, TrainingSession.id), (after_date, after_id)
+        ))
+    
+    # Busca uma linha a mais para saber se existe próxima página
+    rows = query.order_by(
+        desc(TrainingSession.date), desc(TrainingSession.id)
+    ).limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    
+    pagination = {
+        'per_page': per_page,
+        'after': cursor or None,
+        'next_cursor': encode_cursor(rows[-1].date, rows[-1].id) if has_next else None,
+        'has_next': has_next
+    }
+    if total is not None:
+        pagination['total'] = total
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'sessions': [session.to_dict() for session in rows],
+            'pagination': pagination
+        }
+    })
+
 @training_bp.route('/training-sessions', methods=['POST'])
-def create_training_session():
+@token_required
+def create_training_session(current_user):
     """Criar nova sessão de treinamento"""
     try:
         data = request.get_json()
@@ -64,6 +132,7 @@ def create_training_session():
             }), 404
         
         session = TrainingSession(
+            user_id=current_user.id,
             weapon_id=data['weapon_id'],
             shots_fired=data.get('shots_fired', 0),
             hits=data.get('hits', 0),
@@ -74,6 +143,7 @@ def create_training_session():
         )
         
         db.session.add(session)
+        apply_training_session(session_values(session))
         db.session.commit()
         
         return jsonify({
@@ -88,11 +158,48 @@ def create_training_session():
             'error': str(e)
         }), 500
 
+@training_bp.route('/training-sessions/bulk', methods=['POST'])
+@token_required
+def bulk_import_training_sessions(current_user):
+    """Importar sessões de treinamento em lote (NDJSON ou CSV via streaming)"""
+    try:
+        import_format = request.args.get('format')
+        if not import_format:
+            import_format = 'csv' if request.mimetype in ('text/csv', 'application/csv') else 'ndjson'
+        
+        if import_format not in ('csv', 'ndjson'):
+            return jsonify({
+                'success': False,
+                'error': 'Formato deve ser csv ou ndjson'
+            }), 400
+        
+        chunk_size = request.args.get('chunk_size', DEFAULT_CHUNK_SIZE, type=int)
+        chunk_size = max(1, min(chunk_size, MAX_CHUNK_SIZE))
+        
+        records = iter_csv(request.stream) if import_format == 'csv' else iter_ndjson(request.stream)
+        result = import_training_sessions(records, current_user.id, chunk_size=chunk_size)
+        
+        return jsonify({
+            'success': result['failed'] == 0,
+            'data': result
+        }), 200 if result['inserted'] or not result['failed'] else 400
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @training_bp.route('/training-sessions/<int:session_id>', methods=['GET'])
-def get_training_session(session_id):
+@token_required
+@conditional('training_session', 'weapon', per_user=True)
+def get_training_session(current_user, session_id):
     """Obter sessão de treinamento específica"""
     try:
-        session = TrainingSession.query.get_or_404(session_id)
+        session = eager(TrainingSession.query, TrainingSession).filter_by(
+            id=session_id, user_id=current_user.id
+        ).first_or_404()
         return jsonify({
             'success': True,
             'data': session.to_dict()
@@ -104,11 +211,13 @@ def get_training_session(session_id):
         }), 500
 
 @training_bp.route('/training-sessions/<int:session_id>', methods=['PUT'])
-def update_training_session(session_id):
+@token_required
+def update_training_session(current_user, session_id):
     """Atualizar sessão de treinamento"""
     try:
-        session = TrainingSession.query.get_or_404(session_id)
+        session = TrainingSession.query.filter_by(id=session_id, user_id=current_user.id).first_or_404()
         data = request.get_json()
+        previous = session_values(session)
         
         # Atualizar campos se fornecidos
         if 'shots_fired' in data:
@@ -124,6 +233,8 @@ def update_training_session(session_id):
         if 'date' in data:
             session.date = datetime.fromisoformat(data['date'])
         
+        apply_training_session(previous, -1)
+        apply_training_session(session_values(session))
         db.session.commit()
         
         return jsonify({
@@ -139,11 +250,15 @@ def update_training_session(session_id):
         }), 500
 
 @training_bp.route('/training-sessions/<int:session_id>', methods=['DELETE'])
-def delete_training_session(session_id):
+@token_required
+def delete_training_session(current_user, session_id):
     """Deletar sessão de treinamento"""
     try:
-        session = TrainingSession.query.get_or_404(session_id)
+        session = TrainingSession.query.filter_by(id=session_id, user_id=current_user.id).first_or_404()
+        values = session_values(session)
+        # Removida antes dos agregados para que a última data já a desconsidere
         db.session.delete(session)
+        apply_training_session(values, -1)
         db.session.commit()
         
         return jsonify({
@@ -158,65 +273,123 @@ def delete_training_session(session_id):
             'error': str(e)
         }), 500
 
+def recent_sessions_query(user_id):
+    """Sessões do usuário, mais recentes primeiro, com a arma já carregada"""
+    return eager(TrainingSession.query, TrainingSession).filter_by(
+        user_id=user_id
+    ).order_by(desc(TrainingSession.date))
+
+def training_stats_data(user_id, recent_sessions=None):
+    """Monta as estatísticas de treinamento do usuário
+
+    recent_sessions permite reaproveitar sessões já carregadas (mais recentes
+    primeiro) para o gráfico de evolução, evitando outra consulta.
+    """
+    # Estatísticas gerais (linha agregada do usuário, leitura por chave primária)
+    totals = db.session.get(UserTrainingTotals, user_id)
+    total_sessions = totals.sessions if totals else 0
+    total_shots = totals.shots if totals else 0
+    total_hits = totals.hits if totals else 0
+    # Sessões importadas sem acertos ou pontuação ficam fora das médias
+    scored_shots = totals.scored_shots if totals else 0
+    scored_sessions = totals.scored_sessions if totals else 0
+    avg_accuracy = (total_hits / scored_shots * 100) if scored_shots > 0 else 0
+    avg_score = (totals.score_sum / scored_sessions) if scored_sessions > 0 else 0
+    
+    # Estatísticas por arma
+    weapon_stats = db.session.query(
+        Weapon.name,
+        Weapon.caliber,
+        UserWeaponTrainingTotals.sessions,
+        UserWeaponTrainingTotals.shots,
+        UserWeaponTrainingTotals.hits,
+        UserWeaponTrainingTotals.score_sum,
+        UserWeaponTrainingTotals.scored_sessions,
+        UserWeaponTrainingTotals.scored_shots
+    ).join(Weapon, Weapon.id == UserWeaponTrainingTotals.weapon_id).filter(
+        UserWeaponTrainingTotals.user_id == user_id,
+        UserWeaponTrainingTotals.sessions > 0
+    ).all()
+    
+    weapon_data = []
+    for weapon_name, caliber, sessions, shots, hits, score_sum, scored_sessions, scored_shots in weapon_stats:
+        accuracy = (hits / scored_shots * 100) if scored_shots > 0 else 0
+        weapon_avg_score = score_sum / scored_sessions if scored_sessions > 0 else 0
+        weapon_data.append({
+            'weapon_name': weapon_name,
+            'caliber': caliber,
+            'sessions': sessions,
+            'shots': shots or 0,
+            'hits': hits or 0,
+            'accuracy': round(accuracy, 2),
+            'avg_score': round(weapon_avg_score, 2)
+        })
+    
+    # Últimas sessões para gráfico de evolução
+    if recent_sessions is None:
+        recent_sessions = TrainingSession.query.filter_by(user_id=user_id).order_by(
+            desc(TrainingSession.date)
+        ).limit(EVOLUTION_SESSIONS).all()
+    
+    evolution_data = []
+    for session in reversed(recent_sessions):
+        evolution_data.append({
+            'date': session.date.strftime('%Y-%m-%d') if session.date else None,
+            'accuracy': session.accuracy,
+            'score': session.score
+        })
+    
+    return {
+        'general': {
+            'total_sessions': total_sessions,
+            'total_shots': total_shots,
+            'total_hits': total_hits,
+            'avg_accuracy': round(avg_accuracy, 2),
+            'avg_score': round(avg_score, 2)
+        },
+        'by_weapon': weapon_data,
+        'evolution': evolution_data
+    }
+
 @training_bp.route('/training-sessions/stats', methods=['GET'])
-def get_training_stats():
-    """Obter estatísticas de treinamento"""
+@token_required
+@conditional('training_session', 'weapon', per_user=True)
+@cached('training_session', 'weapon', per_user=True)
+def get_training_stats(current_user):
+    """Obter estatísticas de treinamento do usuário"""
     try:
-        # Estatísticas gerais
-        total_sessions = TrainingSession.query.count()
-        total_shots = db.session.query(func.sum(TrainingSession.shots_fired)).scalar() or 0
-        total_hits = db.session.query(func.sum(TrainingSession.hits)).scalar() or 0
-        avg_accuracy = (total_hits / total_shots * 100) if total_shots > 0 else 0
-        avg_score = db.session.query(func.avg(TrainingSession.score)).scalar() or 0
-        
-        # Estatísticas por arma
-        weapon_stats = db.session.query(
-            Weapon.name,
-            Weapon.caliber,
-            func.count(TrainingSession.id).label('sessions'),
-            func.sum(TrainingSession.shots_fired).label('shots'),
-            func.sum(TrainingSession.hits).label('hits'),
-            func.avg(TrainingSession.score).label('avg_score')
-        ).join(TrainingSession).group_by(Weapon.id).all()
-        
-        weapon_data = []
-        for weapon_name, caliber, sessions, shots, hits, avg_score in weapon_stats:
-            accuracy = (hits / shots * 100) if shots > 0 else 0
-            weapon_data.append({
-                'weapon_name': weapon_name,
-                'caliber': caliber,
-                'sessions': sessions,
-                'shots': shots or 0,
-                'hits': hits or 0,
-                'accuracy': round(accuracy, 2),
-                'avg_score': round(avg_score, 2) if avg_score else 0
-            })
-        
-        # Últimas 7 sessões para gráfico de evolução
-        recent_sessions = TrainingSession.query.order_by(
-            desc(TrainingSession.date)
-        ).limit(7).all()
+        return jsonify({
+            'success': True,
+            'data': training_stats_data(current_user.id)
+        })
         
-        evolution_data = []
-        for session in reversed(recent_sessions):
-            evolution_data.append({
-                'date': session.date.strftime('%Y-%m-%d') if session.date else None,
-                'accuracy': session.accuracy,
-                'score': session.score
-            })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@training_bp.route('/training-sessions/evolution', methods=['GET'])
+@token_required
+@conditional('training_session', per_user=True)
+def get_training_evolution(current_user):
+    """Obter evolução de treinos agregada por dia, semana ou mês"""
+    try:
+        try:
+            bucket, start, end = parse_range(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
         
         return jsonify({
             'success': True,
             'data': {
-                'general': {
-                    'total_sessions': total_sessions,
-                    'total_shots': total_shots,
-                    'total_hits': total_hits,
-                    'avg_accuracy': round(avg_accuracy, 2),
-                    'avg_score': round(avg_score, 2)
-                },
-                'by_weapon': weapon_data,
-                'evolution': evolution_data
+                'bucket': bucket,
+                'from': start.isoformat(),
+                'to': end.isoformat(),
+                'evolution': training_series(current_user.id, bucket, start, end)
             }
         })
         
@@ -227,13 +400,13 @@ def get_training_stats():
         }), 500
 
 @training_bp.route('/training-sessions/recent', methods=['GET'])
-def get_recent_sessions():
-    """Obter sessões recentes"""
+@token_required
+@conditional('training_session', 'weapon', per_user=True)
+def get_recent_sessions(current_user):
+    """Obter sessões recentes do usuário"""
     try:
         limit = request.args.get('limit', 5, type=int)
-        sessions = TrainingSession.query.order_by(
-            desc(TrainingSession.date)
-        ).limit(limit).all()
+        sessions = recent_sessions_query(current_user.id).limit(limit).all()
         
         return jsonify({
             'success': True,
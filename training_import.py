@@ -0,0 +1,157 @@
+from src.models.user import db
+from src.models.shooting import TrainingSession, Weapon
+from src.models.training_stats import apply_training_batch
+from src.models.versions import bump
+from datetime import date, datetime
+import csv
+import io
+import json
+
+# Linhas inseridas por transação
+DEFAULT_CHUNK_SIZE = 1000
+MAX_CHUNK_SIZE = 10000
+
+# Quantidade máxima de erros detalhados na resposta (o total é sempre contado)
+MAX_REPORTED_ERRORS = 1000
+
+class RowError(ValueError):
+    """Linha de importação inválida"""
+
+def iter_ndjson(stream):
+    """Itera (número da linha, registro) de um stream NDJSON"""
+    for line_number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8'), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, RowError('JSON inválido')
+            continue
+        if not isinstance(record, dict):
+            yield line_number, RowError('Cada linha deve ser um objeto JSON')
+            continue
+        yield line_number, record
+
+def iter_csv(stream):
+    """Itera (número da linha, registro) de um stream CSV com cabeçalho"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+    for record in reader:
+        if None in record:
+            yield reader.line_num, RowError('Quantidade de colunas inválida')
+            continue
+        yield reader.line_num, {k: v for k, v in record.items() if v not in (None, '')}
+
+def _to_int(record, field, required=False):
+    value = record.get(field)
+    if value is None:
+        if required:
+            raise RowError(f'Campo {field} é obrigatório')
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise RowError(f'Campo {field} deve ser inteiro')
+    if number < 0:
+        raise RowError(f'Campo {field} não pode ser negativo')
+    return number
+
+def parse_row(record, weapon_ids, user_id, require_score=True):
+    """Valida um registro e retorna os valores para o INSERT
+
+    require_score=False aceita registros sem acertos ou pontuação, gravados
+    como NULL e deixados fora das médias.
+    """
+    weapon_id = _to_int(record, 'weapon_id', required=True)
+    if weapon_id not in weapon_ids:
+        raise RowError('Arma não encontrada')
+
+    shots_fired = _to_int(record, 'shots_fired') or 0
+    hits = _to_int(record, 'hits')
+    if hits is None and require_score:
+        hits = 0
+    if hits is not None and hits > shots_fired:
+        raise RowError('Acertos não podem exceder disparos')
+
+    if record.get('score') is None:
+        if require_score:
+            raise RowError('Campo score é obrigatório')
+        score = None
+    else:
+        try:
+            score = float(record['score'])
+        except (TypeError, ValueError):
+            raise RowError('Campo score deve ser numérico')
+
+    try:
+        session_date = date.fromisoformat(str(record['date'])[:10]) if record.get('date') else datetime.utcnow().date()
+    except ValueError:
+        raise RowError('Campo date deve estar no formato AAAA-MM-DD')
+
+    return {
+        'user_id': user_id,
+        'weapon_id': weapon_id,
+        'shots_fired': shots_fired,
+        'hits': hits,
+        'score': score,
+        'notes': record.get('notes', ''),
+        'duration_minutes': _to_int(record, 'duration_minutes'),
+        'date': session_date,
+        'created_at': datetime.utcnow()
+    }
+
+def _flush(rows, line_numbers, result, user_id):
+    """Insere um lote (executemany) e atualiza os agregados numa única transação"""
+    if not rows:
+        return
+    try:
+        db.session.execute(TrainingSession.__table__.insert(), rows)
+        bump(TrainingSession.__tablename__, user_id=user_id)
+        apply_training_batch([{
+            'user_id': row['user_id'],
+            'weapon_id': row['weapon_id'],
+            'shots': row['shots_fired'],
+            'hits': row['hits'],
+            'score': row['score'],
+            'date': row['date'],
+        } for row in rows])
+        db.session.commit()
+        result['inserted'] += len(rows)
+    except Exception as e:
+        db.session.rollback()
+        for line_number in line_numbers:
+            _add_error(result, line_number, f'Erro ao gravar lote: {e}')
+
+def _add_error(result, line_number, message):
+    result['failed'] += 1
+    if len(result['errors']) < MAX_REPORTED_ERRORS:
+        result['errors'].append({'line': line_number, 'error': message})
+    else:
+        result['errors_truncated'] = True
+
+def import_training_sessions(records, user_id, chunk_size=DEFAULT_CHUNK_SIZE, require_score=True):
+    """Importa sessões em lotes a partir de um iterador de (linha, registro)
+
+    Cada lote é gravado em sua própria transação; a memória usada é
+    proporcional ao tamanho do lote, não ao tamanho do arquivo.
+    require_score é repassado a parse_row.
+    """
+    weapon_ids = {weapon_id for (weapon_id,) in db.session.query(Weapon.id)}
+    result = {'inserted': 0, 'failed': 0, 'errors': [], 'errors_truncated': False}
+
+    rows, line_numbers = [], []
+    for line_number, record in records:
+        if isinstance(record, RowError):
+            _add_error(result, line_number, str(record))
+            continue
+        try:
+            rows.append(parse_row(record, weapon_ids, user_id, require_score))
+            line_numbers.append(line_number)
+        except RowError as e:
+            _add_error(result, line_number, str(e))
+            continue
+        if len(rows) >= chunk_size:
+            _flush(rows, line_numbers, result, user_id)
+            rows, line_numbers = [], []
+    _flush(rows, line_numbers, result, user_id)
+    return result
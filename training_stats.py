@@ -0,0 +1,195 @@
+from src.models.user import db
+from src.models.shooting import TrainingSession
+from src.models.rollups import apply_training_rollups
+from src.models.compliance import apply_habitualidade
+from src.models.progress import apply_progress
+from sqlalchemy.dialects.sqlite import insert
+from datetime import datetime
+import click
+
+class UserTrainingTotals(db.Model):
+    """Totais das sessões de treinamento de cada usuário"""
+    __tablename__ = 'user_training_totals'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    sessions = db.Column(db.Integer, nullable=False, default=0)
+    shots = db.Column(db.Integer, nullable=False, default=0)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    scored_sessions = db.Column(db.Integer, nullable=False, default=0)  # Sessões com pontuação
+    scored_shots = db.Column(db.Integer, nullable=False, default=0)  # Disparos das sessões com acertos
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class UserWeaponTrainingTotals(db.Model):
+    """Totais das sessões de treinamento de cada usuário por arma"""
+    __tablename__ = 'user_weapon_training_totals'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    weapon_id = db.Column(db.Integer, db.ForeignKey('weapon.id', ondelete='CASCADE'), primary_key=True)
+    sessions = db.Column(db.Integer, nullable=False, default=0)
+    shots = db.Column(db.Integer, nullable=False, default=0)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    scored_sessions = db.Column(db.Integer, nullable=False, default=0)  # Sessões com pontuação
+    scored_shots = db.Column(db.Integer, nullable=False, default=0)  # Disparos das sessões com acertos
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Campos comparados na reconstrução. Sessões sem pontuação ou sem acertos
+# (importadas da planilha) ficam fora de scored_sessions e scored_shots,
+# os divisores da média de pontuação e da precisão.
+FIELDS = ('sessions', 'shots', 'hits', 'score_sum', 'scored_sessions', 'scored_shots')
+
+def session_values(session):
+    """Captura os valores de uma sessão que alimentam os agregados"""
+    return {
+        'user_id': session.user_id,
+        'weapon_id': session.weapon_id,
+        'shots': session.shots_fired or 0,
+        'hits': session.hits,
+        'score': session.score,
+        'date': session.date,
+    }
+
+def _deltas(values, sign):
+    """Converte os valores de uma sessão em incrementos para as linhas agregadas"""
+    return {
+        'sessions': sign,
+        'shots': sign * values['shots'],
+        'hits': sign * (values['hits'] or 0),
+        'score_sum': sign * (values['score'] or 0.0),
+        'scored_sessions': sign if values['score'] is not None else 0,
+        'scored_shots': sign * values['shots'] if values['hits'] is not None else 0,
+    }
+
+def _upsert(model, key, deltas, returning=False):
+    """Soma os incrementos em uma linha agregada, criando-a se necessário
+
+    returning=True devolve os totais já somados, na ordem de FIELDS.
+    """
+    table = model.__table__
+    stmt = insert(table).values(**key, **deltas, updated_at=datetime.utcnow())
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={
+            **{name: table.c[name] + stmt.excluded[name] for name in FIELDS},
+            'updated_at': stmt.excluded.updated_at,
+        }
+    )
+    if returning:
+        return db.session.execute(stmt.returning(*(table.c[name] for name in FIELDS))).one()
+    db.session.execute(stmt)
+
+def apply_training_session(values, sign=1):
+    """Aplica uma sessão aos agregados na transação corrente (sem commit)
+
+    sign=1 soma a sessão, sign=-1 remove.
+    """
+    deltas = _deltas(values, sign)
+    totals = _upsert(UserTrainingTotals, {'user_id': values['user_id']}, deltas, returning=True)
+    _upsert(UserWeaponTrainingTotals, {'user_id': values['user_id'], 'weapon_id': values['weapon_id']}, deltas)
+    apply_training_rollups([values], sign)
+    apply_habitualidade([values], sign)
+    apply_progress(values['user_id'], totals, values['date'] if sign > 0 else None)
+
+def apply_training_batch(values_list):
+    """Soma um lote de sessões aos agregados com um upsert por usuário e arma"""
+    values_list = list(values_list)
+    by_user = {}
+    by_weapon = {}
+    newest = {}
+    for values in values_list:
+        deltas = _deltas(values, 1)
+        newest[values['user_id']] = max(newest.get(values['user_id'], values['date']), values['date'])
+        user = by_user.setdefault(values['user_id'], dict.fromkeys(FIELDS, 0))
+        weapon = by_weapon.setdefault((values['user_id'], values['weapon_id']), dict.fromkeys(FIELDS, 0))
+        for name in FIELDS:
+            user[name] += deltas[name]
+            weapon[name] += deltas[name]
+    for user_id, deltas in by_user.items():
+        totals = _upsert(UserTrainingTotals, {'user_id': user_id}, deltas, returning=True)
+        apply_progress(user_id, totals, newest[user_id])
+    for (user_id, weapon_id), deltas in by_weapon.items():
+        _upsert(UserWeaponTrainingTotals, {'user_id': user_id, 'weapon_id': weapon_id}, deltas)
+    apply_training_rollups(values_list)
+    apply_habitualidade(values_list)
+
+def _aggregate_columns():
+    return (
+        db.func.count(TrainingSession.id),
+        db.func.coalesce(db.func.sum(TrainingSession.shots_fired), 0),
+        db.func.coalesce(db.func.sum(TrainingSession.hits), 0),
+        db.func.coalesce(db.func.sum(TrainingSession.score), 0.0),
+        db.func.count(TrainingSession.score),
+        db.func.coalesce(db.func.sum(
+            db.case((TrainingSession.hits.isnot(None), TrainingSession.shots_fired), else_=0)
+        ), 0)
+    )
+
+def compute_training_stats():
+    """Recalcula os agregados por usuário e por (usuário, arma) a partir das sessões"""
+    by_user = db.session.query(
+        TrainingSession.user_id, *_aggregate_columns()
+    ).group_by(TrainingSession.user_id).all()
+    by_weapon = db.session.query(
+        TrainingSession.user_id, TrainingSession.weapon_id, *_aggregate_columns()
+    ).group_by(TrainingSession.user_id, TrainingSession.weapon_id).all()
+    return (
+        {row[0]: dict(zip(FIELDS, row[1:])) for row in by_user},
+        {(row[0], row[1]): dict(zip(FIELDS, row[2:])) for row in by_weapon}
+    )
+
+def _drift(expected, stored):
+    """Lista os campos divergentes entre o valor recalculado e o armazenado"""
+    diffs = {}
+    for name in FIELDS:
+        want = expected.get(name, 0) if expected else 0
+        have = getattr(stored, name, 0) if stored else 0
+        if abs((want or 0) - (have or 0)) > 1e-6:
+            diffs[name] = {'stored': have, 'expected': want}
+    return diffs
+
+def rebuild_training_stats():
+    """Reconstrói os agregados do zero e retorna as divergências encontradas"""
+    by_user, by_weapon = compute_training_stats()
+
+    drift = {}
+    stored_users = {row.user_id: row for row in UserTrainingTotals.query.all()}
+    for user_id in sorted(set(stored_users) | set(by_user)):
+        diffs = _drift(by_user.get(user_id), stored_users.get(user_id))
+        if diffs:
+            drift.setdefault('by_user', {})[user_id] = diffs
+
+    stored_weapons = {(row.user_id, row.weapon_id): row for row in UserWeaponTrainingTotals.query.all()}
+    for key in sorted(set(stored_weapons) | set(by_weapon)):
+        diffs = _drift(by_weapon.get(key), stored_weapons.get(key))
+        if diffs:
+            drift.setdefault('by_weapon', {})[key] = diffs
+
+    UserWeaponTrainingTotals.query.delete()
+    UserTrainingTotals.query.delete()
+    for user_id, values in by_user.items():
+        db.session.add(UserTrainingTotals(user_id=user_id, **values))
+    for (user_id, weapon_id), values in by_weapon.items():
+        db.session.add(UserWeaponTrainingTotals(user_id=user_id, weapon_id=weapon_id, **values))
+    db.session.commit()
+    return drift
+
+def ensure_training_stats():
+    """Popula os agregados na primeira execução sobre um banco existente"""
+    if UserTrainingTotals.query.first() is None and TrainingSession.query.first() is not None:
+        rebuild_training_stats()
+
+@click.command('rebuild-training-stats')
+def rebuild_training_stats_command():
+    """Recalcula as tabelas de estatísticas de treino e mostra as divergências"""
+    drift = rebuild_training_stats()
+    if not drift:
+        click.echo('Estatísticas de treino consistentes.')
+        return
+    for user_id, fields in drift.get('by_user', {}).items():
+        for name, diffs in fields.items():
+            click.echo(f"user {user_id}.{name}: armazenado={diffs['stored']} esperado={diffs['expected']}")
+    for (user_id, weapon_id), fields in drift.get('by_weapon', {}).items():
+        for name, diffs in fields.items():
+            click.echo(f"user {user_id} weapon {weapon_id}.{name}: armazenado={diffs['stored']} esperado={diffs['expected']}")
+    click.echo('Estatísticas de treino reconstruídas.')
@@ -1,8 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import jwt
 from flask import current_app
+from src.utils.password_hashing import password_hasher
 
 db = SQLAlchemy()
 
@@ -22,6 +22,7 @@ class User(db.Model):
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime, nullable=True)
+    token_epoch = db.Column(db.Integer, nullable=False, default=0)  # Incrementada para revogar tokens
     
     # Relacionamentos
     training_sessions = db.relationship('TrainingSession', backref='user', lazy=True)
@@ -29,18 +30,23 @@ class User(db.Model):
     user_progress = db.relationship('UserProgress', backref='user', lazy=True)
     
     def set_password(self, password):
-        """Define a senha do usuário com hash"""
-        self.password_hash = generate_password_hash(password)
+        """Define a senha do usuário com hash (no executor de hashing)"""
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        """Verifica se a senha está correta"""
-        return check_password_hash(self.password_hash, password)
+        """Verifica se a senha está correta (no executor de hashing)"""
+        return password_hasher.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """Indica se o hash usa parâmetros diferentes dos configurados"""
+        return password_hasher.needs_rehash(self.password_hash)
     
     def generate_token(self):
         """Gera token JWT para o usuário"""
         payload = {
             'user_id': self.id,
             'username': self.username,
+            'epoch': self.token_epoch or 0,
             'exp': datetime.utcnow().timestamp() + 86400  # 24 horas
         }
         return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
@@ -50,7 +56,11 @@ class User(db.Model):
         """Verifica e decodifica token JWT"""
         try:
             payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-            return User.query.get(payload['user_id'])
+            user = User.query.get(payload['user_id'])
+            # Tokens emitidos antes da última revogação não valem mais
+            if user and (user.token_epoch or 0) != payload.get('epoch', 0):
+                return None
+            return user
         except jwt.ExpiredSignatureError:
             return None
         except jwt.InvalidTokenError:
@@ -0,0 +1,16 @@
+import re
+
+def validate_email(email):
+    """Valida formato do email"""
+    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+    return re.match(pattern, email) is not None
+
+def validate_password(password):
+    """Valida força da senha"""
+    if len(password) < 6:
+        return False, "Senha deve ter pelo menos 6 caracteres"
+    if not re.search(r'[A-Za-z]', password):
+        return False, "Senha deve conter pelo menos uma letra"
+    if not re.search(r'[0-9]', password):
+        return False, "Senha deve conter pelo menos um número"
+    return True, "Senha válida"
@@ -0,0 +1,93 @@
+from src.models.user import db
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+class TableVersion(db.Model):
+    """Contador de versão por tabela, incrementado a cada escrita"""
+    __tablename__ = 'table_versions'
+
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Tabelas cujas linhas pertencem a um único usuário: só nelas o user_id da
+# escrita restringe a invalidação. Nas tabelas de referência (weapon,
+# competition, level...) o user_id indica apenas quem cadastrou, e no
+# leaderboard a linha de um usuário muda a posição dos demais: a escrita
+# afeta as respostas de todos os usuários.
+PER_USER_TABLES = frozenset({
+    'training_session',
+    'competition_score',
+    'user_progress',
+    'user_training_totals',
+    'user_weapon_training_totals',
+    'user_training_rollup',
+    'user_competition_score_rollup',
+    'user_weapon_monthly_sessions',
+})
+
+def write_owner(table, user_id):
+    """user_id usado na invalidação: None (todos os usuários) fora de PER_USER_TABLES"""
+    return user_id if table in PER_USER_TABLES else None
+
+def bump_versions(connection, tables):
+    """Incrementa a versão das tabelas na transação da conexão informada"""
+    table = TableVersion.__table__
+    now = datetime.utcnow()
+    for name in sorted(set(tables)):
+        stmt = insert(table).values(name=name, version=1, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['name'],
+            set_={'version': table.c.version + 1, 'updated_at': now}
+        )
+        connection.execute(stmt)
+    if has_request_context():
+        g.written_tables = g.get('written_tables', set()) | set(tables)
+
+def bump(*tables, user_id=None):
+    """Incrementa versões para escritas feitas fora do ORM (INSERT em lote)"""
+    bump_versions(db.session.connection(), tables)
+    _pending_writes(db.session()).update((name, write_owner(name, user_id)) for name in tables)
+
+def get_versions(tables):
+    """Retorna ({tabela: versão}, última modificação) numa única consulta"""
+    rows = db.session.query(TableVersion).filter(TableVersion.name.in_(tables)).all()
+    versions = {name: 0 for name in tables}
+    last_modified = None
+    for row in rows:
+        versions[row.name] = row.version
+        if last_modified is None or row.updated_at > last_modified:
+            last_modified = row.updated_at
+    return versions, last_modified
+
+# Funções chamadas após cada commit com o conjunto de (tabela, user_id) escritos
+write_listeners = []
+
+def _pending_writes(session):
+    return session.info.setdefault('written_tables', set())
+
+@event.listens_for(Session, 'after_flush')
+def _bump_flushed_tables(session, flush_context):
+    written = {
+        (obj.__table__.name, write_owner(obj.__table__.name, getattr(obj, 'user_id', None)))
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if hasattr(obj, '__table__') and obj.__table__.name != TableVersion.__tablename__
+        and (obj in session.new or obj in session.deleted or session.is_modified(obj))
+    }
+    if written:
+        bump_versions(session.connection(), {name for name, _ in written})
+        _pending_writes(session).update(written)
+
+@event.listens_for(Session, 'after_commit')
+def _notify_writes(session):
+    written = session.info.pop('written_tables', None)
+    if written:
+        for listener in write_listeners:
+            listener(written)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_writes(session):
+    session.info.pop('written_tables', None)
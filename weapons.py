@@ -1,10 +1,13 @@
 from flask import Blueprint, request, jsonify
 from src.models.shooting import db, Weapon
+from src.utils.conditional import conditional
+from src.utils.response_cache import cached
 from datetime import datetime
 
 weapons_bp = Blueprint('weapons', __name__)
 
 @weapons_bp.route('/weapons', methods=['GET'])
+@conditional('weapon')
 def get_weapons():
     """Listar todas as armas"""
     try:
@@ -20,6 +23,7 @@ def get_weapons():
         }), 500
 
 @weapons_bp.route('/weapons/<int:weapon_id>', methods=['GET'])
+@conditional('weapon')
 def get_weapon(weapon_id):
     """Obter uma arma específica"""
     try:
@@ -119,6 +123,7 @@ def delete_weapon(weapon_id):
         }), 500
 
 @weapons_bp.route('/weapons/by-caliber/<caliber>', methods=['GET'])
+@conditional('weapon')
 def get_weapons_by_caliber(caliber):
     """Listar armas por calibre"""
     try:
@@ -134,6 +139,7 @@ def get_weapons_by_caliber(caliber):
         }), 500
 
 @weapons_bp.route('/weapons/by-owner/<owner>', methods=['GET'])
+@conditional('weapon')
 def get_weapons_by_owner(owner):
     """Listar armas por proprietário"""
     try:
@@ -149,6 +155,8 @@ def get_weapons_by_owner(owner):
         }), 500
 
 @weapons_bp.route('/weapons/stats', methods=['GET'])
+@conditional('weapon')
+@cached('weapon')
 def get_weapons_stats():
     """Obter estatísticas das armas"""
     try:
@@ -0,0 +1,381 @@
+from src.models.user import db, User
+from src.models.shooting import Weapon, Competition, CompetitionScore, Level, TrainingSession
+from src.models.rollups import apply_competition_score_rollups
+from src.models.leaderboard import apply_competition_score, refresh_competition_score
+from src.models.training_import import DEFAULT_CHUNK_SIZE, RowError, import_training_sessions
+from src.models.versions import bump
+from datetime import date, datetime, time
+from openpyxl import load_workbook
+import click
+
+# Abas da planilha HABITUALIDADE usadas na importação
+ACERVO_SHEET = 'ACERVO'
+TRAINING_SHEET = 'Lançamentos'
+RANKING_SHEET = 'Histórico Ranking'
+RESULTS_SHEET = 'RESULTADOS'
+LEVELS_SHEET = 'Níveis'
+
+# Colunas opcionais da aba Lançamentos; sem elas a sessão é importada sem
+# acertos ou pontuação e fica fora da precisão e da média
+TRAINING_HITS_COLUMN = 'Acertos'
+TRAINING_SCORE_COLUMN = 'Pontuação'
+
+# Coluna opcional da aba Níveis; obrigatória para cadastrar um nível novo
+LEVEL_MIN_SCORE_COLUMN = 'Pontuação Mínima'
+
+def _text(value):
+    """Normaliza o valor de uma célula para texto (ou None se vazia)"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, time):
+        value = value.strftime('%H:%M')
+    value = str(value).strip()
+    return value or None
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = _text(value)
+    if not value:
+        raise RowError('Campo Data é obrigatório')
+    for parse in (date.fromisoformat, lambda v: datetime.strptime(v, '%d/%m/%Y').date()):
+        try:
+            return parse(value[:10])
+        except ValueError:
+            continue
+    raise RowError('Campo Data deve estar no formato DD/MM/AAAA')
+
+def _sheet(workbook, name):
+    """Aba pelo nome, ignorando maiúsculas e espaços"""
+    for sheet in workbook.worksheets:
+        if sheet.title.strip().casefold() == name.casefold():
+            return sheet
+    return None
+
+def iter_sheet(sheet, *required):
+    """Itera (número da linha, {cabeçalho: valor}) a partir da linha de cabeçalho
+
+    O cabeçalho é a primeira linha que contém todas as colunas exigidas;
+    linhas vazias são ignoradas. As linhas são lidas em streaming.
+    """
+    header = None
+    for row_number, row in enumerate(sheet.iter_rows(values_only=True), start=1):
+        if header is None:
+            names = [_text(value) for value in row]
+            if all(name in names for name in required):
+                header = names
+            continue
+        if all(value is None for value in row):
+            continue
+        yield row_number, {name: value for name, value in zip(header, row) if name}
+
+def _weapon_key(name, caliber):
+    return (name or '').casefold(), (caliber or '').casefold()
+
+def import_weapons(workbook, user_id):
+    """Cadastra as armas do ACERVO que ainda não existem; retorna {(nome, calibre): id}"""
+    weapons = {_weapon_key(name, caliber): weapon_id for weapon_id, name, caliber in
+               db.session.query(Weapon.id, Weapon.name, Weapon.caliber)}
+    sheet = _sheet(workbook, ACERVO_SHEET)
+    if sheet is None:
+        return weapons, 0
+
+    rows = {}
+    for _, record in iter_sheet(sheet, 'Equipamento', 'Calibre'):
+        name, caliber = _text(record.get('Equipamento')), _text(record.get('Calibre'))
+        if not name or not caliber or _weapon_key(name, caliber) in weapons:
+            continue
+        rows[_weapon_key(name, caliber)] = {
+            'name': name,
+            'caliber': caliber,
+            'owner': name.split(' - ')[0] if ' - ' in name else '-',
+            'user_id': user_id,
+            'created_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        }
+    if rows:
+        db.session.execute(Weapon.__table__.insert(), list(rows.values()))
+        bump(Weapon.__tablename__)
+        db.session.commit()
+        weapons.update({_weapon_key(name, caliber): weapon_id for weapon_id, name, caliber in
+                        db.session.query(Weapon.id, Weapon.name, Weapon.caliber)})
+    return weapons, len(rows)
+
+def _training_key(record):
+    return (record['date'], record['weapon_id'], record['shots_fired'], record['notes'])
+
+def iter_training_records(workbook, weapons):
+    """Converte as linhas de Lançamentos em registros para import_training_sessions"""
+    sheet = _sheet(workbook, TRAINING_SHEET)
+    if sheet is None:
+        return
+    for row_number, record in iter_sheet(sheet, 'Data', 'Equipamento', 'Calibre'):
+        try:
+            name, caliber = _text(record.get('Equipamento')), _text(record.get('Calibre'))
+            weapon_id = weapons.get(_weapon_key(name, caliber))
+            if weapon_id is None:
+                raise RowError(f'Arma {name} ({caliber}) não encontrada no acervo')
+            try:
+                shots = _number(record.get('N. DE TIROS'))
+            except ValueError:
+                raise RowError('Campo N. DE TIROS deve ser numérico')
+            try:
+                hits = _number(record.get(TRAINING_HITS_COLUMN))
+                score = _number(record.get(TRAINING_SCORE_COLUMN))
+            except ValueError:
+                raise RowError(f'Campos {TRAINING_HITS_COLUMN} e {TRAINING_SCORE_COLUMN} devem ser numéricos')
+            yield row_number, {
+                'date': _date(record.get('Data')).isoformat(),
+                'weapon_id': weapon_id,
+                'shots_fired': int(shots) if shots is not None else 0,
+                'hits': int(hits) if hits is not None else None,
+                'score': score,
+                'notes': ' / '.join(filter(None, (
+                    _text(record.get('Clube')), _text(record.get('Tipo')), _text(record.get('HORA'))
+                )))
+            }
+        except RowError as e:
+            yield row_number, e
+
+def skip_existing(records, user_id, result):
+    """Descarta registros já importados, comparando contagens por chave natural
+
+    Uma linha repetida n vezes na planilha só é inserida se o banco tiver
+    menos de n sessões iguais, o que torna a reimportação idempotente.
+    """
+    existing = {}
+    for session_date, weapon_id, shots_fired, notes, count in db.session.query(
+        TrainingSession.date, TrainingSession.weapon_id, TrainingSession.shots_fired,
+        TrainingSession.notes, db.func.count(TrainingSession.id)
+    ).filter(TrainingSession.user_id == user_id).group_by(
+        TrainingSession.date, TrainingSession.weapon_id, TrainingSession.shots_fired, TrainingSession.notes
+    ):
+        existing[(session_date.isoformat(), weapon_id, shots_fired, notes or '')] = count
+
+    for line_number, record in records:
+        if not isinstance(record, RowError):
+            key = _training_key(record)
+            if existing.get(key, 0) > 0:
+                existing[key] -= 1
+                result['skipped'] += 1
+                continue
+        yield line_number, record
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    value = _text(value)
+    return float(value.replace(',', '.')) if value else None
+
+def result_dates(workbook):
+    """Datas da aba RESULTADOS por (competição, pontuação), na ordem da planilha"""
+    dates = {}
+    sheet = _sheet(workbook, RESULTS_SHEET)
+    if sheet is None:
+        return dates
+    for _, record in iter_sheet(sheet, 'Data', 'Competição', 'Pontuação'):
+        name = _text(record.get('Competição'))
+        try:
+            score = _number(record.get('Pontuação'))
+            result_date = _date(record.get('Data'))
+        except (RowError, ValueError):
+            continue
+        if name and score is not None:
+            dates.setdefault((name.casefold(), score), []).append(result_date)
+    return dates
+
+def import_ranking(workbook, user_id):
+    """Importa o Histórico Ranking: uma competição por linha, uma pontuação por etapa (coluna)
+
+    O Histórico Ranking não tem datas: a data de cada pontuação nova vem da
+    linha da aba RESULTADOS com a mesma competição e pontuação. Pontuações
+    sem resultado correspondente não são importadas e ficam em errors.
+    """
+    result = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'competitions_created': 0, 'failed': 0, 'errors': []}
+    sheet = _sheet(workbook, RANKING_SHEET)
+    if sheet is None:
+        return result
+    dates = result_dates(workbook)
+
+    competitions = {name: competition_id for competition_id, name in db.session.query(Competition.id, Competition.name)}
+    existing = {
+        (competition_id, stage): (score_id, score, score_date)
+        for score_id, competition_id, stage, score, score_date in db.session.query(
+            CompetitionScore.id, CompetitionScore.competition_id, CompetitionScore.stage,
+            CompetitionScore.score, CompetitionScore.date
+        ).filter(CompetitionScore.user_id == user_id)
+    }
+
+    inserts = []
+    for row_number, record in iter_sheet(sheet, 'Histórico Ranking Etapas'):
+        name = _text(record.pop('Histórico Ranking Etapas', None))
+        if not name:
+            continue
+        scores = [(stage, float(score)) for stage, score in record.items() if isinstance(score, (int, float))]
+        if name not in competitions:
+            competition = Competition(name=name, description='Importada da planilha de habitualidade')
+            db.session.add(competition)
+            db.session.flush()
+            competitions[name] = competition.id
+            result['competitions_created'] += 1
+        competition_id = competitions[name]
+
+        for stage, score in scores:
+            current = existing.get((competition_id, stage))
+            if current is None:
+                # Uma data da aba RESULTADOS por pontuação, na ordem em que aparecem
+                score_dates = dates.get((name.casefold(), score))
+                if not score_dates:
+                    result['failed'] += 1
+                    result['errors'].append({
+                        'line': row_number,
+                        'stage': stage,
+                        'error': f'Pontuação {score:g} de {name} sem data correspondente em {RESULTS_SHEET}'
+                    })
+                    continue
+                score_date = score_dates.pop(0)
+                inserts.append({
+                    'competition_id': competition_id, 'user_id': user_id, 'score': score,
+                    'stage': stage, 'date': score_date, 'created_at': datetime.utcnow()
+                })
+                apply_competition_score_rollups(user_id, competition_id, score, score_date)
+                apply_competition_score(user_id, competition_id, score)
+                result['inserted'] += 1
+            elif current[1] != score:
+                score_id, previous, score_date = current
+                db.session.execute(CompetitionScore.__table__.update().where(
+                    CompetitionScore.id == score_id
+                ).values(score=score))
+                apply_competition_score_rollups(user_id, competition_id, previous, score_date, -1)
+                apply_competition_score_rollups(user_id, competition_id, score, score_date)
+                refresh_competition_score(user_id, competition_id)
+                result['updated'] += 1
+            else:
+                result['unchanged'] += 1
+
+    if inserts:
+        db.session.execute(CompetitionScore.__table__.insert(), inserts)
+    if inserts or result['updated']:
+        bump(CompetitionScore.__tablename__, user_id=user_id)
+    db.session.commit()
+    return result
+
+def _threshold_error(levels, order, min_score):
+    """Erro se min_score não ficar entre as pontuações dos níveis vizinhos (pela ordem)"""
+    below = [level.min_score for level in levels.values() if level.order < order]
+    above = [level.min_score for level in levels.values() if level.order > order]
+    if (below and min_score <= max(below)) or (above and min_score >= min(above)):
+        return f'{LEVEL_MIN_SCORE_COLUMN} deve ficar entre a dos níveis vizinhos'
+    return None
+
+def import_levels(workbook):
+    """Atualiza os níveis da aba Níveis e cadastra os níveis novos ao final
+
+    A pontuação mínima vem da coluna Pontuação Mínima. Ela é opcional para
+    níveis já cadastrados (só a mensagem é atualizada), mas um nível novo sem
+    ela, ou com um valor fora da ordem dos níveis, é recusado e fica em errors.
+    """
+    result = {'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+    sheet = _sheet(workbook, LEVELS_SHEET)
+    if sheet is None:
+        return result
+
+    def reject(row_number, error):
+        result['failed'] += 1
+        result['errors'].append({'line': row_number, 'error': error})
+
+    levels = {level.name: level for level in Level.query.order_by(Level.order).all()}
+    order = max((level.order for level in levels.values()), default=-1)
+    for row_number, record in iter_sheet(sheet, 'Nível', 'Msg'):
+        name, message = _text(record.get('Nível')), _text(record.get('Msg'))
+        if not name or not message:
+            continue
+        try:
+            min_score = _number(record.get(LEVEL_MIN_SCORE_COLUMN))
+        except ValueError:
+            reject(row_number, f'Campo {LEVEL_MIN_SCORE_COLUMN} deve ser numérico')
+            continue
+
+        level = levels.get(name)
+        if level is None:
+            if min_score is None:
+                reject(row_number, f'Nível {name} novo sem {LEVEL_MIN_SCORE_COLUMN}')
+                continue
+            error = _threshold_error(levels, order + 1, min_score)
+            if error:
+                reject(row_number, error)
+                continue
+            order += 1
+            levels[name] = Level(name=name, message=message, min_score=min_score, order=order)
+            db.session.add(levels[name])
+            result['created'] += 1
+            continue
+
+        if min_score is not None and min_score != level.min_score:
+            error = _threshold_error(levels, level.order, min_score)
+            if error:
+                reject(row_number, error)
+                continue
+        changed = level.message != message or (min_score is not None and min_score != level.min_score)
+        if changed:
+            level.message = message
+            if min_score is not None:
+                level.min_score = min_score
+            result['updated'] += 1
+    db.session.commit()
+    return result
+
+def import_workbook(stream, user_id, include_levels=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Importa a planilha HABITUALIDADE para o usuário
+
+    A planilha é aberta em modo somente leitura e cada aba é percorrida em
+    streaming; as sessões de treino são gravadas em lotes de chunk_size.
+    Reimportar a mesma planilha não duplica registros.
+    """
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        weapons, weapons_created = import_weapons(workbook, user_id)
+
+        training = {'skipped': 0}
+        records = skip_existing(iter_training_records(workbook, weapons), user_id, training)
+        training.update(import_training_sessions(records, user_id, chunk_size=chunk_size, require_score=False))
+
+        return {
+            'weapons_created': weapons_created,
+            'training_sessions': training,
+            'competition_scores': import_ranking(workbook, user_id),
+            'levels': import_levels(workbook) if include_levels else None
+        }
+    finally:
+        workbook.close()
+
+@click.command('import-habitualidade')
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', 'username', required=True, help='Usuário que receberá os registros')
+@click.option('--levels/--no-levels', default=True, help='Importar também a aba Níveis')
+def import_habitualidade_command(paths, username, levels):
+    """Importa uma ou mais planilhas HABITUALIDADE (.xlsx) para um usuário"""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f'Usuário {username} não encontrado')
+    for path in paths:
+        with open(path, 'rb') as stream:
+            result = import_workbook(stream, user.id, include_levels=levels)
+        training = result['training_sessions']
+        scores = result['competition_scores']
+        click.echo(
+            f"{path}: {result['weapons_created']} armas, {training['inserted']} treinos "
+            f"({training['skipped']} já importados, {training['failed']} com erro), "
+            f"{scores['inserted']} pontuações novas, {scores['updated']} atualizadas "
+            f"({scores['failed']} sem data)"
+        )
+        for error in training['errors'][:20]:
+            click.echo(f"  linha {error['line']}: {error['error']}")
+        for error in scores['errors'][:20]:
+            click.echo(f"  {RANKING_SHEET}, linha {error['line']}, etapa {error['stage']}: {error['error']}")
+        for error in (result['levels'] or {}).get('errors', [])[:20]:
+            click.echo(f"  {LEVELS_SHEET}, linha {error['line']}: {error['error']}")